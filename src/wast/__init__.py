@@ -9,27 +9,34 @@ In addition to what is here, ``wast`` also exposed the following public modules:
 
     While ``wast`` is not at version 1.0.0, it does not guarantee API stability.
 """
-from ._config import Config
-from ._exceptions import BaseWastException
-from ._steps import (
-    DefaultsAlreadySetException,
-    MismatchedNumberOfParametersException,
-    ParameterConflictException,
-    Step,
-    StepRunner,
-    StepWithArtifacts,
-    StepWithCleanup,
-    StepWithDependentSetup,
-    StepWithSetup,
-    build_parameters,
-    managed_step,
-    parametrize,
-    register_managed_step,
-    register_step,
-    register_step_group,
-    set_defaults,
-    step,
-)
+
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from ._config import Config
+    from ._exceptions import BaseWastException
+    from ._steps import (
+        DefaultsAlreadySetException,
+        MismatchedNumberOfParametersException,
+        ParameterConflictException,
+        Step,
+        StepRunner,
+        StepWithArtifacts,
+        StepWithCleanup,
+        StepWithDependentSetup,
+        StepWithSetup,
+        build_parameters,
+        managed_step,
+        register_managed_step,
+        register_step,
+        register_step_group,
+        set_defaults,
+        step,
+    )
+
+    # mypy otherwise confuses it with the module of the same name
+    from ._steps.parametrize import parametrize
 
 # XXX: The order here is important, it declares the order in which the entries
 #      are documented in the public docs.
@@ -54,3 +61,34 @@ __all__ = [
     "MismatchedNumberOfParametersException",
     "ParameterConflictException",
 ]
+
+# The module defining each entry of the public API. They are imported lazily,
+# so that the client talking to a wast server does not pay for them
+_MODULES = {
+    "Config": "._config",
+    "BaseWastException": "._exceptions",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name == "__version__":
+        # Looking up the version scans the metadata of all installed
+        # distributions, only do it when it is needed
+        # pylint: disable-next=import-outside-toplevel
+        from importlib.metadata import version
+
+        value = version("wast")
+    elif name in __all__:
+        value = getattr(
+            importlib.import_module(_MODULES.get(name, "._steps"), __name__),
+            name,
+        )
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted([*globals(), *__all__])
@@ -1,19 +1,28 @@
 import importlib.util
 import logging
+import sys
 from argparse import (
+    SUPPRESS,
+    Action,
     ArgumentParser,
     BooleanOptionalAction,
     Namespace,
     _AppendAction,
+    _VersionAction,
 )
 from contextvars import copy_context
-from importlib.metadata import version
-from typing import Any, List, Optional
+from typing import TYPE_CHECKING, Any, List, Optional
 
-from . import _pipeline
+from ._client import DEFAULT_CACHE_PATH
+from ._completion import SHELLS, get_completion_script
 from ._config import Config
 from ._exceptions import BaseWastException, FailedPipelineException
+from ._listing import list_steps
 from ._logging import setup_logging
+from ._step_index import StepIndex
+
+if TYPE_CHECKING:
+    from ._pipeline import Pipeline
 
 LOGGER = logging.getLogger(__name__)
 
@@ -36,10 +45,61 @@ class _SplitAppendAction(_AppendAction):
         )
 
 
+class _LazyVersionAction(_VersionAction):
+    def __call__(
+        self,
+        parser: ArgumentParser,
+        namespace: Namespace,
+        values: Any,
+        option_string: Optional[str] = None,
+    ) -> None:
+        # The version is only looked up when needed, as it is slow to get
+        # pylint: disable-next=import-outside-toplevel,no-name-in-module
+        from . import __version__
+
+        self.version = f"%(prog)s {__version__}"
+        super().__call__(parser, namespace, values, option_string)
+
+
+class _CompletionAction(Action):
+    def __init__(self, option_strings: List[str], dest: str, **kwargs: Any):
+        super().__init__(
+            option_strings, dest, nargs=1, default=SUPPRESS, **kwargs
+        )
+
+    def __call__(
+        self,
+        parser: ArgumentParser,
+        namespace: Namespace,
+        values: Any,
+        option_string: Optional[str] = None,
+    ) -> None:
+        options = sorted(
+            option
+            for action in parser._actions  # pylint: disable=protected-access
+            for option in action.option_strings
+        )
+        print(
+            get_completion_script(
+                values[0], options, parser.get_default("cache_path")
+            ),
+            end="",
+        )
+        parser.exit()
+
+
 def _parse_args(args: Optional[List[str]] = None) -> Namespace:
     parser = ArgumentParser()
+    parser.add_argument("--version", action=_LazyVersionAction)
     parser.add_argument(
-        "--version", action="version", version=f"%(prog)s {version('wast')}"
+        "--completion",
+        action=_CompletionAction,
+        choices=SHELLS,
+        help=(
+            "Output the script to source to enable shell completion, which"
+            " completes step names from the last time the pipeline definition"
+            " was loaded"
+        ),
     )
 
     parser.add_argument("--config", default="./wastfile.py")
@@ -76,6 +136,24 @@ def _parse_args(args: Optional[List[str]] = None) -> Namespace:
         action="store_true",
         help="When listing, also show step dependencies",
     )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "Keep running, and rerun steps whose inputs changed, along with"
+            " the steps depending on them, whenever files change"
+        ),
+    )
+    parser.add_argument(
+        "--server",
+        action="store_true",
+        help=(
+            "Keep running and serve the invocations of wast made from the"
+            " same directory with the same cache path, keeping the pipeline"
+            " definition loaded and the environments verified in memory."
+            " The definition is reloaded whenever it changes"
+        ),
+    )
     parser.add_argument(
         "-v", "--verbose", action="count", default=0, help="Be more verbose"
     )
@@ -92,6 +170,17 @@ def _parse_args(args: Optional[List[str]] = None) -> Namespace:
         ),
         default=1,
     )
+    parser.add_argument(
+        "--cores",
+        type=int,
+        help=(
+            "Number of cores to share between the steps running in parallel,"
+            " for steps that can use multiple ones. 0 uses the number of cpus"
+            " on the machine (default: the number of cpus if some steps"
+            " declare how many cores they can use, unlimited otherwise)"
+        ),
+        default=None,
+    )
 
     group = parser.add_mutually_exclusive_group()
     group.add_argument(
@@ -113,6 +202,66 @@ def _parse_args(args: Optional[List[str]] = None) -> Namespace:
         help="Stop at the first error",
     )
 
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="Explain why steps declaring inputs are not up to date",
+    )
+    parser.add_argument(
+        "--wheelhouse",
+        action="store_true",
+        help=(
+            "Fetch the dependencies of managed steps once in a local"
+            " wheelhouse, and install them from there without accessing"
+            " the index"
+        ),
+    )
+    parser.add_argument(
+        "--venv-templates",
+        action="store_true",
+        help=(
+            "Build the environment of steps with the same interpreter and"
+            " dependencies once, and clone it for each of them"
+        ),
+    )
+    parser.add_argument(
+        "--fast-venvs",
+        action="store_true",
+        help=(
+            "Create environments without installing pip in each of them, and"
+            " share a single pip instead"
+        ),
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["threads", "asyncio"],
+        default="threads",
+        help=(
+            "How to run steps. 'asyncio' runs all commands on a single event"
+            " loop, and kills running commands on failure with --fail-fast"
+            " (default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--output-buffer-size",
+        type=int,
+        default=8,
+        help=(
+            "How many MiB of output to keep in memory per step when running"
+            " steps in parallel, before spilling it to disk"
+            " (default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--live-output",
+        action="store_true",
+        help=(
+            "When running steps in parallel, stream their output as it comes,"
+            " prefixing each line with the name of the step, instead of"
+            " showing it once each step finishes"
+        ),
+    )
+
     parser.add_argument(
         "-c",
         "--clean",
@@ -131,7 +280,7 @@ def _parse_args(args: Optional[List[str]] = None) -> Namespace:
     parser.add_argument(
         "--cache-path",
         help="Directory where to store the persistent cache (default: %(default)s)",
-        default="./.wast",
+        default=DEFAULT_CACHE_PATH,
     )
     parser.add_argument(
         "--skip-missing-interpreters",
@@ -142,15 +291,20 @@ def _parse_args(args: Optional[List[str]] = None) -> Namespace:
     return parser.parse_args(args)
 
 
-def _load_user_config(
-    pipeline: _pipeline.Pipeline, config_file: str
-) -> _pipeline.Pipeline:
-    _pipeline.set_pipeline(pipeline)
+def _load_user_config(pipeline: "Pipeline", config_file: str) -> "Pipeline":
+    # The pipeline, and everything needed to run steps, is only imported
+    # when the definition has to be loaded, listing steps from the step index
+    # does not need it
+    # pylint: disable-next=import-outside-toplevel,cyclic-import
+    from ._pipeline import set_pipeline
+
+    set_pipeline(pipeline)
 
     spec = importlib.util.spec_from_file_location("wastfile", config_file)
     assert spec is not None
     assert spec.loader is not None
     module = importlib.util.module_from_spec(spec)
+    modules_before = set(sys.modules)
 
     try:
         spec.loader.exec_module(module)
@@ -172,9 +326,44 @@ def _load_user_config(
             f"Unable to load {config_file}: {exc}"
         ) from exc
 
+    pipeline.definition_path = config_file
+    pipeline.definition_modules = set(sys.modules) - modules_before
+    return pipeline
+
+
+def _load_pipeline(config: Config, pipeline_config: str) -> "Pipeline":
+    # pylint: disable-next=import-outside-toplevel,cyclic-import
+    from ._pipeline import Pipeline
+
+    context = copy_context()
+    pipeline = context.run(
+        _load_user_config, Pipeline(config), pipeline_config
+    )
+    LOGGER.debug("Pipeline definition found at %s", pipeline_config)
+    pipeline.save_step_index()
     return pipeline
 
 
+def _run_pipeline(
+    pipeline: "Pipeline",
+    steps: Optional[List[str]],
+    only_steps: Optional[List[str]],
+    except_steps: Optional[List[str]],
+    clean: bool,
+    list_only: bool,
+    list_dependencies: bool,
+    watch: bool,
+) -> None:
+    if list_only or list_dependencies:
+        pipeline.list_all_steps(
+            steps, only_steps, except_steps, list_dependencies
+        )
+    elif watch:
+        pipeline.watch(steps, only_steps, except_steps, clean=clean)
+    else:
+        pipeline.execute(steps, only_steps, except_steps, clean=clean)
+
+
 def _execute_pipeline(
     config: Config,
     pipeline_config: str,
@@ -184,52 +373,86 @@ def _execute_pipeline(
     clean: bool,
     list_only: bool,
     list_dependencies: bool,
+    watch: bool,
 ) -> None:
-    pipeline = _pipeline.Pipeline(config)
-
-    context = copy_context()
-    pipeline = context.run(_load_user_config, pipeline, pipeline_config)
-    LOGGER.debug("Pipeline definition found at %s", pipeline_config)
-
     if list_only or list_dependencies:
-        pipeline.list_all_steps(
-            steps, only_steps, except_steps, list_dependencies
+        indexed_steps = StepIndex(config.step_index_path).get_steps(
+            pipeline_config
         )
-        return
+        if indexed_steps is not None:
+            LOGGER.debug("Using the cached steps of %s", pipeline_config)
+            list_steps(
+                indexed_steps,
+                steps,
+                only_steps,
+                except_steps,
+                list_dependencies,
+                config.colors,
+            )
+            return
 
-    pipeline.execute(steps, only_steps, except_steps, clean=clean)
+    _run_pipeline(
+        _load_pipeline(config, pipeline_config),
+        steps,
+        only_steps,
+        except_steps,
+        clean,
+        list_only,
+        list_dependencies,
+        watch,
+    )
 
 
-def main(sys_args: Optional[List[str]] = None) -> None:
-    args = _parse_args(sys_args)
-    verbosity = args.verbose - args.quiet
-    config = Config(
+def _create_config(args: Namespace) -> Config:
+    return Config(
         args.cache_path,
-        verbosity,
+        args.verbose - args.quiet,
         args.colors,
         args.jobs,
         args.skip_missing_interpreters,
         args.no_setup,
         args.setup_only,
         args.fail_fast,
+        args.explain,
+        args.wheelhouse,
+        args.venv_templates,
+        args.fast_venvs,
+        args.engine,
+        args.output_buffer_size * 1024 * 1024,
+        args.live_output,
+        args.cores,
     )
-    setup_logging(logging.INFO - 10 * verbosity, config.colors)
+
+
+def _log_exception(exc: BaseWastException, verbosity: int) -> None:
+    if verbosity >= 1 and not isinstance(exc, FailedPipelineException):
+        LOGGER.debug(exc, exc_info=exc)
+    LOGGER.error("%s", exc)
+
+
+def main(sys_args: Optional[List[str]] = None) -> None:
+    args = _parse_args(sys_args)
+    config = _create_config(args)
+    setup_logging(logging.INFO - 10 * config.verbosity, config.colors)
 
     try:
-        _execute_pipeline(
-            config,
-            args.config,
-            args.steps,
-            args.only_steps,
-            args.except_steps,
-            args.clean,
-            args.list_only,
-            args.list_dependencies,
-        )
+        if args.server:
+            # pylint: disable-next=import-outside-toplevel,cyclic-import
+            from ._server import serve
+
+            serve(config)
+        else:
+            _execute_pipeline(
+                config,
+                args.config,
+                args.steps,
+                args.only_steps,
+                args.except_steps,
+                args.clean,
+                args.list_only,
+                args.list_dependencies,
+                args.watch,
+            )
     except BaseWastException as exc:
-        if config.verbosity >= 1 and not isinstance(
-            exc, FailedPipelineException
-        ):
-            LOGGER.debug(exc, exc_info=exc)
-        LOGGER.error("%s", exc)
+        _log_exception(exc, config.verbosity)
         raise SystemExit(exc.exit_code) from exc
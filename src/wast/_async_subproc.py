@@ -0,0 +1,167 @@
+import asyncio
+import codecs
+import logging
+import os
+import pty
+import signal
+import subprocess
+import threading
+from concurrent import futures
+from contextlib import suppress
+from typing import Dict, List, Optional, Set
+
+from ._log_capture import WriterProtocol
+from ._subproc import READ_SIZE, PeakMemory, wait_for_process
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CommandScope:
+    """
+    Run the commands of a step on an asyncio event loop.
+
+    This allows cancelling all the commands of a step at once, from the loop,
+    while the step itself runs synchronously in another thread.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._running: Set["futures.Future[int]"] = set()
+
+    def run(
+        self,
+        command: List[str],
+        env: Dict[str, str],
+        stdout: WriterProtocol,
+        stderr: WriterProtocol,
+        peak_memory: Optional[PeakMemory] = None,
+    ) -> int:
+        """
+        Run the command on the event loop and wait for it to finish.
+
+        The most memory the command used is recorded in ``peak_memory``.
+
+        :return: the return code of the command
+        :raise futures.CancelledError: if the scope got cancelled
+        """
+        with self._lock:
+            if self._cancelled:
+                raise futures.CancelledError()
+
+            future = asyncio.run_coroutine_threadsafe(
+                _run_async(command, env, stdout, stderr, peak_memory),
+                self._loop,
+            )
+            self._running.add(future)
+
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                self._running.discard(future)
+
+    def cancel(self) -> None:
+        """
+        Kill all running commands, and prevent new ones from starting.
+        """
+        with self._lock:
+            self._cancelled = True
+            for future in self._running:
+                future.cancel()
+
+
+async def _forward_async(source: int, dest: WriterProtocol) -> None:
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def _read() -> None:
+        try:
+            data = os.read(source, READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            # Ptys raise EIO once the other side is closed
+            data = b""
+
+        if data:
+            dest.write(decoder.decode(data))
+            return
+
+        if remaining := decoder.decode(b"", final=True):
+            dest.write(remaining)
+        loop.remove_reader(source)
+        if not done.done():
+            done.set_result(None)
+
+    os.set_blocking(source, False)
+    loop.add_reader(source, _read)
+    try:
+        await done
+    finally:
+        loop.remove_reader(source)
+
+
+def _wait_async(
+    proc: "subprocess.Popen[bytes]", peak_memory: Optional[PeakMemory]
+) -> "asyncio.Future[int]":
+    # Reap the process from its own thread, like asyncio does by default, but
+    # in a way that tells how much memory it used
+    loop = asyncio.get_running_loop()
+    exited = loop.create_future()
+
+    def _wait() -> None:
+        returncode = wait_for_process(proc, peak_memory)
+        loop.call_soon_threadsafe(exited.set_result, returncode)
+
+    threading.Thread(target=_wait, daemon=True).start()
+    return exited
+
+
+async def _run_async(
+    command: List[str],
+    env: Dict[str, str],
+    stdout: WriterProtocol,
+    stderr: WriterProtocol,
+    peak_memory: Optional[PeakMemory],
+) -> int:
+    # pylint: disable=too-many-arguments
+    p_stdin, c_stdin = pty.openpty()
+    p_stdout, c_stdout = pty.openpty()
+    p_stderr, c_stderr = pty.openpty()
+
+    try:
+        try:
+            # pylint: disable-next=consider-using-with
+            proc = subprocess.Popen(
+                command,
+                env=env,
+                stdin=c_stdin,
+                stdout=c_stdout,
+                stderr=c_stderr,
+                close_fds=True,
+            )
+        finally:
+            for fd in [c_stdin, c_stdout, c_stderr]:
+                os.close(fd)
+
+        exited = _wait_async(proc, peak_memory)
+        try:
+            await asyncio.gather(
+                _forward_async(p_stdout, stdout),
+                _forward_async(p_stderr, stderr),
+            )
+            return await asyncio.shield(exited)
+        except asyncio.CancelledError:
+            LOGGER.debug("Killing command: '%s'", " ".join(command))
+            # Popen.kill() could reap the process before its own thread does
+            if not exited.done():
+                with suppress(ProcessLookupError):
+                    os.kill(proc.pid, signal.SIGKILL)
+            await exited
+            raise
+    finally:
+        for fd in [p_stdin, p_stdout, p_stderr]:
+            os.close(fd)
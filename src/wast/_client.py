@@ -0,0 +1,112 @@
+import json
+import os
+import struct
+import sys
+from typing import IO, List, Optional
+
+# This is the entrypoint of wast, imported on every invocation. It needs to
+# stay as light as possible: talking to a server should not import the rest of
+# wast, which is only loaded when running locally.
+
+# Name of the socket of the server, in the cache directory
+SOCKET_NAME = "server.sock"
+DEFAULT_CACHE_PATH = "./.wast"
+
+# Each message sent by the server is its kind, followed by the length of its
+# data. The exit message contains the exit code instead of a length.
+HEADER = struct.Struct("<BI")
+EXIT = 0
+STDOUT = 1
+STDERR = 2
+# The server can't handle the invocation, which should run locally instead
+FALLBACK = 3
+
+
+def get_socket_path(cache_path: str) -> str:
+    return os.path.join(cache_path, SOCKET_NAME)
+
+
+def _get_cache_path(args: List[str]) -> str:
+    cache_path = DEFAULT_CACHE_PATH
+    for index, arg in enumerate(args):
+        if arg == "--cache-path" and index + 1 < len(args):
+            cache_path = args[index + 1]
+        elif arg.startswith("--cache-path="):
+            cache_path = arg[len("--cache-path=") :]
+    return cache_path
+
+
+def _read_exactly(stream: IO[bytes], size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ConnectionError("The wast server closed the connection")
+    return data
+
+
+def run_on_server(args: List[str]) -> Optional[int]:
+    """
+    Run wast with the given arguments on the server, if one is running.
+
+    The output of the invocation is streamed back as it comes.
+
+    :return: the exit code of the invocation, or :python:`None` if no server
+             is running or it can't handle the invocation.
+    """
+    if "--server" in args:
+        return None
+
+    socket_path = get_socket_path(_get_cache_path(args))
+    if not os.path.exists(socket_path):
+        return None
+
+    # Only needed when a server is running, it imports selectors
+    # pylint: disable-next=import-outside-toplevel
+    import socket
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(socket_path)
+        except OSError:
+            # The server was stopped without cleaning up
+            return None
+
+        request = {
+            "args": args,
+            "cwd": os.getcwd(),
+            "environ": dict(os.environ),
+            "isatty": sys.stdin.isatty(),
+        }
+        connection.sendall(json.dumps(request).encode() + b"\n")
+
+        outputs = {STDOUT: sys.stdout.buffer, STDERR: sys.stderr.buffer}
+        with connection.makefile("rb") as stream:
+            while True:
+                kind, length = HEADER.unpack(
+                    _read_exactly(stream, HEADER.size)
+                )
+                if kind == EXIT:
+                    return int(length)
+                if kind == FALLBACK:
+                    return None
+
+                output = outputs[kind]
+                output.write(_read_exactly(stream, length))
+                output.flush()
+
+
+def main(sys_args: Optional[List[str]] = None) -> None:
+    args = sys.argv[1:] if sys_args is None else sys_args
+
+    try:
+        exit_code = run_on_server(args)
+    except ConnectionError as exc:
+        print(f"wast > {exc}", file=sys.stderr)
+        raise SystemExit(1) from exc
+
+    if exit_code is not None:
+        raise SystemExit(exit_code)
+
+    # pylint: disable-next=import-outside-toplevel,cyclic-import
+    from .__main__ import main as run_locally
+
+    run_locally(args)
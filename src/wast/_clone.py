@@ -0,0 +1,115 @@
+import errno
+import fcntl
+import logging
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# From linux/fs.h, clones a whole file with copy-on-write where supported
+_FICLONE = 0x40049409
+_UNSUPPORTED_ERRORS = {
+    errno.EBADF,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EXDEV,
+    errno.EPERM,
+}
+
+
+def _reflink(source: str, destination: str) -> None:
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "reflinks are only supported on linux")
+
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.unlink(destination)
+            raise
+    shutil.copystat(source, destination)
+
+
+def _copy(source: str, destination: str) -> None:
+    shutil.copy2(source, destination)
+
+
+def clone_tree(source: Path, destination: Path) -> str:
+    """
+    Clone a directory as cheaply as the filesystem allows.
+
+    Files are reflinked if supported, which gives independent copies sharing
+    their storage, then hardlinked, and finally copied. Symlinks are kept as
+    is.
+
+    .. warning::
+
+        Hardlinked files are shared with the source, so they must never be
+        modified in place, but always replaced.
+
+    :param source: the directory to clone
+    :param destination: where to clone it, must not exist
+    :return: the method that ended up being used to clone the files
+    """
+    methods: List[Tuple[str, Callable[[str, str], None]]] = [
+        ("reflink", _reflink),
+        ("hardlink", os.link),
+        ("copy", _copy),
+    ]
+
+    for root, dirs, files in os.walk(source):
+        relative_root = Path(root).relative_to(source)
+        target_root = destination / relative_root
+        target_root.mkdir(parents=True, exist_ok=True)
+
+        for name in dirs + files:
+            src = os.path.join(root, name)
+            dst = str(target_root / name)
+
+            if os.path.islink(src):
+                os.symlink(os.readlink(src), dst)
+                continue
+            if name in dirs:
+                continue
+
+            while True:
+                try:
+                    methods[0][1](src, dst)
+                    break
+                except OSError as exc:
+                    if (
+                        exc.errno not in _UNSUPPORTED_ERRORS
+                        or len(methods) == 1
+                    ):
+                        raise
+                    LOGGER.debug(
+                        "Unable to %s files from %s: %s",
+                        methods[0][0],
+                        source,
+                        exc,
+                    )
+                    methods.pop(0)
+
+    return methods[0][0]
+
+
+def replace_in_file(path: Path, old: str, new: str) -> None:
+    """
+    Replace all occurences of a string in a file, if any.
+
+    The file is replaced instead of being modified in place, to never modify
+    the source of a hardlinked file.
+    """
+    content = path.read_bytes()
+    if old.encode() not in content:
+        return
+
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_bytes(content.replace(old.encode(), new.encode()))
+    shutil.copymode(path, tmp_path)
+    os.replace(tmp_path, path)
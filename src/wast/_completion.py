@@ -0,0 +1,152 @@
+from typing import List
+
+from ._step_index import STEP_NAMES_FILE_NAME
+
+# Options taking step names as values
+STEP_OPTIONS = ["-s", "--step", "-o", "--only", "-e", "--except"]
+SHELLS = ["bash", "fish", "zsh"]
+
+# The completion scripts never run wast itself, they read the names of the
+# steps from the file written next to the step index, which keeps them
+# instantaneous regardless of how expensive loading the pipeline is.
+
+_BASH_SCRIPT = """\
+_wast_step_names() {
+    local cache_path=__CACHE_PATH__ words i
+    read -r -a words <<< "$COMP_LINE"
+    for ((i = 1; i < ${#words[@]}; i++)); do
+        case "${words[i]}" in
+            --cache-path=*) cache_path="${words[i]#--cache-path=}" ;;
+            --cache-path) cache_path="${words[i + 1]}" ;;
+        esac
+    done
+    if [ -r "$cache_path/__NAMES_FILE__" ]; then
+        cat "$cache_path/__NAMES_FILE__"
+    fi
+}
+
+_wast() {
+    # Split the line ourselves, as step names can contain characters bash
+    # considers as word separators, like ':'
+    local line="${COMP_LINE:0:COMP_POINT}" cur prev
+    cur="${line##*[[:space:]]}"
+    line="${line%"$cur"}"
+    line="${line%"${line##*[^[:space:]]}"}"
+    prev="${line##*[[:space:]]}"
+
+    case "$cur" in
+        --step=* | --only=* | --except=*)
+            prev="${cur%%=*}"
+            cur="${cur#*=}"
+            ;;
+    esac
+
+    case "$prev" in
+        __STEP_OPTIONS__)
+            local selected="" name
+            if [[ "$cur" == *,* ]]; then
+                selected="${cur%,*},"
+            fi
+            COMPREPLY=()
+            while IFS= read -r name; do
+                if [[ "$selected$name" == "$cur"* ]]; then
+                    COMPREPLY+=("$selected$name")
+                fi
+            done < <(_wast_step_names)
+            # Bash only replaces what comes after the last word break
+            if [[ "$cur" == *[:=]* ]]; then
+                local prefix="${cur%"${cur##*[:=]}"}"
+                COMPREPLY=("${COMPREPLY[@]#"$prefix"}")
+            fi
+            return
+            ;;
+    esac
+
+    if [[ "$cur" == -* ]]; then
+        COMPREPLY=($(compgen -W "__OPTIONS__" -- "$cur"))
+    fi
+}
+
+complete -o default -F _wast wast
+"""
+
+_ZSH_SCRIPT = """\
+_wast_step_names() {
+    local cache_path=__CACHE_PATH__ i
+    for ((i = 2; i <= $#words; i++)); do
+        case "${words[i]}" in
+            --cache-path=*) cache_path="${words[i]#--cache-path=}" ;;
+            --cache-path) cache_path="${words[i + 1]}" ;;
+        esac
+    done
+    local -a names
+    if [[ -r "$cache_path/__NAMES_FILE__" ]]; then
+        names=("${(@f)$(<"$cache_path/__NAMES_FILE__")}")
+    fi
+    _sequence -s , compadd -Q - "${names[@]}"
+}
+
+_wast() {
+    if [[ "${words[CURRENT - 1]}" == (__ZSH_STEP_OPTIONS__) ]]; then
+        _wast_step_names
+    elif [[ "${words[CURRENT]}" == -* ]]; then
+        compadd - __OPTIONS__
+    else
+        _files
+    fi
+}
+
+compdef _wast wast
+"""
+
+_FISH_SCRIPT = """\
+function __wast_step_names
+    set -l cache_path __CACHE_PATH__
+    set -l tokens (commandline -opc)
+    for i in (seq (count $tokens))
+        switch $tokens[$i]
+            case '--cache-path=*'
+                set cache_path (string replace -- --cache-path= '' $tokens[$i])
+            case --cache-path
+                if test $i -lt (count $tokens)
+                    set cache_path $tokens[(math $i + 1)]
+                end
+        end
+    end
+    set -l selected (string match -r -- '^.*,' (commandline -ct))
+    if test -r $cache_path/__NAMES_FILE__
+        for name in (cat $cache_path/__NAMES_FILE__)
+            echo $selected$name
+        end
+    end
+end
+
+complete -c wast -s s -l step -x -a '(__wast_step_names)'
+complete -c wast -s o -l only -x -a '(__wast_step_names)'
+complete -c wast -s e -l except -x -a '(__wast_step_names)'
+"""
+
+
+def get_completion_script(
+    shell: str, options: List[str], cache_path: str
+) -> str:
+    """
+    Get the script to source in the given shell to enable completion.
+
+    :param shell: one of :py:data:`SHELLS`
+    :param options: all the options wast accepts
+    :param cache_path: the default path to the cache directory
+    """
+    script = {
+        "bash": _BASH_SCRIPT,
+        "fish": _FISH_SCRIPT,
+        "zsh": _ZSH_SCRIPT,
+    }[shell]
+
+    return (
+        script.replace("__CACHE_PATH__", cache_path)
+        .replace("__NAMES_FILE__", STEP_NAMES_FILE_NAME)
+        .replace("__STEP_OPTIONS__", " | ".join(STEP_OPTIONS))
+        .replace("__ZSH_STEP_OPTIONS__", "|".join(STEP_OPTIONS))
+        .replace("__OPTIONS__", " ".join(options))
+    )
@@ -1,5 +1,4 @@
 import logging
-import multiprocessing
 import os
 import random
 import sys
@@ -7,9 +6,36 @@ from pathlib import Path
 from typing import Dict, Optional
 
 from ._exceptions import BaseWastException
+from ._log_capture import DEFAULT_MEMORY_LIMIT
 
 LOGGER = logging.getLogger(__name__)
 
+# XXX: keep this list in sync with the documentation of Config.environ
+_PASSED_ENVIRONMENT = [
+    "URL_CA_BUNDLE",
+    "PATH",
+    "LANG",
+    "LANGUAGE",
+    "LD_LIBRARY_PATH",
+    "PIP_INDEX_URL",
+    "PIP_EXTRA_INDEX_URL",
+    "PYTHONHASHSEED",
+    "REQUESTS_CA_BUNDLE",
+    "SSL_CERT_FILE",
+    "http_proxy",
+    "https_proxy",
+    "no_proxy",
+    "TMPDIR",
+]
+# All the environment variables the configuration depends on
+CONFIG_ENVIRONMENT = [
+    *_PASSED_ENVIRONMENT,
+    "PY_COLORS",
+    "NO_COLOR",
+    "FORCE_COLOR",
+    "GITHUB_ACTION",
+]
+
 
 # This is a config class, it's easier to have everything there...
 # pylint: disable=too-many-instance-attributes
@@ -50,6 +76,16 @@ class Config:
     - Finally, it will look if this is attached to a tty and enable colors if so.
     """
 
+    engine: str
+    """
+    The engine used to run the steps, either ``"threads"`` or ``"asyncio"``.
+
+    With ``"asyncio"``, all commands run by steps are handled by a single
+    event loop, and the commands of running steps are killed as soon as a step
+    fails when running with ``--fail-fast``. Steps themselves still each run
+    in their own thread, as they are synchronous.
+    """
+
     environ: Dict[str, str]
     """
     The environment to use when running commands.
@@ -70,17 +106,73 @@ class Config:
     to a random value and log it to allow repeating the current run.
     """
 
+    explain: bool
+    """
+    Whether to explain why steps declaring inputs are not up to date.
+    """
+
     fail_fast: bool
     """
     Whether to stop enqueuing more jobs after the first failure or not.
     """
 
+    fast_venvs: bool
+    """
+    Whether to create virtual environments without installing pip in them.
+
+    Instead, a single copy of pip, extracted from the one bundled with the
+    interpreter, is shared by all environments. This makes creating an
+    environment much faster. Note that ``setuptools`` is not installed in
+    those environments either.
+    """
+
+    history_path: Path
+    """
+    The path to the file where the outcome and duration of each step is recorded.
+
+    Only the most recent runs of each step are kept. This is used to give
+    a feeling of how long each step usually takes, and to schedule the
+    slowest chains of steps first.
+    """
+
+    live_output: bool
+    """
+    Whether to stream the output of steps as it comes when running in parallel.
+
+    Each line is then prefixed by the name of the step it comes from. By
+    default, the output of each step is captured and only displayed once
+    the step finishes, in order to keep it together.
+    """
+
+    n_cores: Optional[int]
+    """
+    The number of cores shared between the steps running in parallel.
+
+    Steps declaring that they can use multiple cores are granted a part of
+    those, see :py:attr:`StepRunner.jobs`, and steps only start when at least
+    one core is free. 0 will use the number of cpus on the machine as given by
+    :py:func:`os.cpu_count`.
+
+    If :python:`None`, the number of cpus is only shared when some of the steps
+    to run declare how many cores they can use, and only :py:attr:`n_jobs`
+    limits the steps running in parallel otherwise.
+    """
+
     n_jobs: int
     """
     The number of jobs to run in parallel.
 
     0 will use the number of cpus on the machine as given by
-    :py:func:`multiprocessing.cpu_count`.
+    :py:func:`os.cpu_count`.
+    """
+
+    output_buffer_size: int
+    """
+    How many bytes of output to keep in memory per step before spilling it
+    to disk.
+
+    When running multiple jobs in parallel, the output of each step is
+    captured and only displayed once it finishes.
     """
 
     skip_missing_interpreters: bool
@@ -101,6 +193,32 @@ class Config:
     Whether to skip the setup phase of each step.
     """
 
+    step_index_path: Path
+    """
+    The path to the file where the steps resolved from the pipeline
+    definition are cached.
+
+    This allows listing steps without executing the pipeline definition, as
+    long as neither it nor any module it imports changed.
+    """
+
+    venv_templates: bool
+    """
+    Whether to clone the environments of steps from shared templates.
+
+    When enabled, the first environment created for a given interpreter and
+    set of dependencies is kept as a template, and the environments of all
+    other steps with the same interpreter and dependencies are cloned from it,
+    using reflinks or hardlinks when the filesystem supports them.
+    """
+
+    venv_templates_path: Path
+    """
+    The path to where the template environments are stored.
+
+    See :py:attr:`venv_templates`.
+    """
+
     venvs_path: Path
     """
     The path to where the virtual environments are stored.
@@ -114,6 +232,21 @@ class Config:
     positive means more verbose, and thus, negative less.
     """
 
+    wheelhouse: bool
+    """
+    Whether to install the dependencies of managed steps from a local wheelhouse.
+
+    The wheelhouse is filled once per run with the wheels of all the
+    dependencies of managed steps, which are then installed without accessing
+    the index. Once filled, runs with the same dependencies don't need network
+    access anymore.
+    """
+
+    wheelhouse_path: Path
+    """
+    The path to the wheelhouse. See :py:attr:`wheelhouse`.
+    """
+
     def __init__(
         self,
         cache_path: str,
@@ -124,9 +257,22 @@ class Config:
         skip_setup: bool,
         skip_run: bool,
         fail_fast: bool,
+        explain: bool = False,
+        wheelhouse: bool = False,
+        venv_templates: bool = False,
+        fast_venvs: bool = False,
+        engine: str = "threads",
+        output_buffer_size: int = DEFAULT_MEMORY_LIMIT,
+        live_output: bool = False,
+        n_cores: Optional[int] = None,
     ) -> None:
+        # pylint: disable=too-many-locals
         self.cache_path = Path(cache_path).resolve()
         self.venvs_path = self.cache_path / "venvs"
+        self.venv_templates_path = self.cache_path / "venv-templates"
+        self.history_path = self.cache_path / "history.jsonl"
+        self.step_index_path = self.cache_path / "step-index.json"
+        self.wheelhouse_path = self.cache_path / "wheelhouse"
 
         self.verbosity = verbosity
         self.skip_missing_interpreters = skip_missing_interpreters
@@ -135,30 +281,25 @@ class Config:
         self.skip_run = skip_run
 
         self.fail_fast = fail_fast
+        self.explain = explain
+        self.wheelhouse = wheelhouse
+        self.venv_templates = venv_templates
+        self.fast_venvs = fast_venvs
+        self.engine = engine
+        self.output_buffer_size = output_buffer_size
+        self.live_output = live_output
 
         if n_jobs == 0:
-            n_jobs = multiprocessing.cpu_count()
+            n_jobs = os.cpu_count() or 1
         self.n_jobs = n_jobs
 
+        if n_cores == 0:
+            n_cores = os.cpu_count() or 1
+        self.n_cores = n_cores
+
         self.environ = {
-            # XXX: keep this list in sync with the above documentation
             key: os.environ[key]
-            for key in [
-                "URL_CA_BUNDLE",
-                "PATH",
-                "LANG",
-                "LANGUAGE",
-                "LD_LIBRARY_PATH",
-                "PIP_INDEX_URL",
-                "PIP_EXTRA_INDEX_URL",
-                "PYTHONHASHSEED",
-                "REQUESTS_CA_BUNDLE",
-                "SSL_CERT_FILE",
-                "http_proxy",
-                "https_proxy",
-                "no_proxy",
-                "TMPDIR",
-            ]
+            for key in _PASSED_ENVIRONMENT
             if key in os.environ
         }
 
@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+from ._fingerprint import get_file_info
+
+LOGGER = logging.getLogger(__name__)
+
+# Bump this whenever the format of the results changes, to invalidate the
+# existing ones.
+_RESULTS_VERSION = 1
+
+
+def _list_directory(directory: str) -> List[str]:
+    try:
+        # Untracked files are included, as long as they are not ignored
+        output = subprocess.run(
+            [
+                "git",
+                "ls-files",
+                "--cached",
+                "--others",
+                "--exclude-standard",
+                "-z",
+                "--",
+                directory,
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        LOGGER.debug("Unable to list %s with git, walking it", directory)
+    else:
+        return [path for path in output.split("\0") if path]
+
+    files: List[str] = []
+    for root, dirs, filenames in os.walk(directory):
+        dirs[:] = [name for name in dirs if not name.startswith(".")]
+        files.extend(os.path.join(root, name) for name in filenames)
+    return files
+
+
+def expand_files(
+    files: Sequence[str], extensions: Sequence[str], excluded: Path
+) -> List[str]:
+    """
+    Expand the directories in the given files to the files they contain.
+
+    Directories are listed with git when possible, which skips the files it
+    ignores. Otherwise, hidden directories are skipped.
+
+    :param files: the files and directories to expand. Files are kept as is.
+    :param extensions: the extensions of the files to keep in directories.
+    :param excluded: a directory to never consider, e.g. wast's cache.
+    :return: all the files, without duplicates.
+    """
+    excluded_prefix = f"{excluded}{os.sep}"
+    expanded: Dict[str, None] = {}
+
+    for entry in files:
+        if not os.path.isdir(entry):
+            expanded[entry] = None
+            continue
+
+        for path in _list_directory(entry):
+            if (
+                path.endswith(tuple(extensions))
+                and not os.path.abspath(path).startswith(excluded_prefix)
+                and os.path.isfile(path)
+            ):
+                expanded[os.path.normpath(path)] = None
+
+    return list(expanded)
+
+
+class FileResults:
+    """
+    The files a tool previously succeeded on.
+
+    This allows running tools checking files independently of each other only
+    on the files that changed, or that the tool did not succeed on, since
+    the last time. Results are only reused as long as the key, identifying the
+    tool and its configuration, stays the same.
+
+    Checking whether a file changed only needs to hash it if its size or
+    modification time changed.
+
+    :param path: where to store the results
+    :param key: what identifies the tool and its configuration
+    """
+
+    def __init__(self, path: Path, key: str) -> None:
+        self._path = path
+        self._key = key
+        self._passed = self._load()
+
+    def get_pending(self, files: List[str]) -> List[str]:
+        """
+        Get the files the tool needs to run on.
+
+        Those are files that changed, or that did not pass, since the last
+        time.
+        """
+        pending = []
+        for path in files:
+            previous = self._passed.get(path)
+            current = get_file_info(path, previous)
+            if (
+                previous is None
+                or current is None
+                or current["sha256"] != previous["sha256"]
+            ):
+                pending.append(path)
+        return pending
+
+    def record_passed(self, files: List[str]) -> None:
+        """
+        Record that the tool succeeded on the given files, as they are now.
+        """
+        for path in files:
+            info = get_file_info(path, self._passed.get(path))
+            if info is not None:
+                self._passed[path] = info
+
+        # Forget about files that got removed
+        self._passed = {
+            path: info
+            for path, info in self._passed.items()
+            if os.path.exists(path)
+        }
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_name(f".{self._path.name}.tmp")
+        with tmp_path.open("w") as fp:
+            json.dump(
+                {
+                    "version": _RESULTS_VERSION,
+                    "key": self._key,
+                    "files": self._passed,
+                },
+                fp,
+            )
+        os.replace(tmp_path, self._path)
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with self._path.open() as fp:
+                results = json.load(fp)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            LOGGER.debug("Ignoring invalid file results: %s", exc)
+            return {}
+
+        if (
+            not isinstance(results, dict)
+            or results.get("version") != _RESULTS_VERSION
+            or results.get("key") != self._key
+            or not isinstance(results.get("files"), dict)
+        ):
+            return {}
+        passed: Dict[str, Dict[str, Any]] = results["files"]
+        return passed
@@ -0,0 +1,200 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+# Bump this whenever the format of the fingerprints changes, to invalidate
+# the existing ones.
+_FINGERPRINT_VERSION = 1
+# How many files to list explicitly when explaining what changed
+_MAX_FILES_TO_EXPLAIN = 5
+
+Fingerprint = Dict[str, Any]
+
+
+def hash_value(value: Any) -> str:
+    """
+    Hash an arbitrary value, based on its json representation.
+
+    Values that can't be represented in json are hashed based on their
+    :py:func:`repr`.
+    """
+    serialized = json.dumps(value, sort_keys=True, default=repr)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        while chunk := fp.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_file_info(
+    path: str, previous: Optional[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """
+    Get the hash, size and modification time of the given file.
+
+    The hash from the previous information is reused if the size and
+    modification time of the file did not change.
+
+    :return: the information, or :python:`None` if the file can't be read.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    info: Dict[str, Any] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if (
+        previous is not None
+        and previous.get("size") == info["size"]
+        and previous.get("mtime_ns") == info["mtime_ns"]
+    ):
+        info["sha256"] = previous["sha256"]
+    else:
+        try:
+            info["sha256"] = hash_file(path)
+        except OSError:
+            return None
+    return info
+
+
+def hash_files(
+    patterns: List[str],
+    excluded: Path,
+    previous: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Hash all files matching the given glob patterns.
+
+    In order to avoid re-reading files that did not change, the hash from the
+    previous fingerprint is reused if the size and modification time of the
+    file did not change.
+
+    :param patterns: glob patterns of files to hash, relative to the current
+                     directory.
+    :param excluded: a directory to never consider, e.g. wast's cache.
+    :param previous: the previous information about each file.
+    :return: a mapping of each file to its hash, size and modification time.
+    """
+    if previous is None:
+        previous = {}
+
+    excluded_prefix = f"{excluded}{os.sep}"
+    files: Dict[str, Dict[str, Any]] = {}
+
+    for pattern in patterns:
+        for path in glob.iglob(pattern, recursive=True):
+            if path in files or os.path.abspath(path).startswith(
+                excluded_prefix
+            ):
+                continue
+
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Broken symlink, or deleted while we were looking
+                continue
+            if not os.path.isfile(path):
+                continue
+
+            info: Dict[str, Any] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            }
+            old_info = previous.get(path, {})
+            if (
+                old_info.get("size") == info["size"]
+                and old_info.get("mtime_ns") == info["mtime_ns"]
+                and "sha256" in old_info
+            ):
+                info["sha256"] = old_info["sha256"]
+            else:
+                info["sha256"] = hash_file(path)
+
+            files[path] = info
+
+    return dict(sorted(files.items()))
+
+
+def load_fingerprint(path: Path) -> Optional[Fingerprint]:
+    try:
+        with path.open() as fp:
+            fingerprint = json.load(fp)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        LOGGER.debug("Ignoring invalid fingerprint at %s: %s", path, exc)
+        return None
+
+    if (
+        not isinstance(fingerprint, dict)
+        or fingerprint.get("version") != _FINGERPRINT_VERSION
+    ):
+        return None
+    return fingerprint
+
+
+def save_fingerprint(path: Path, fingerprint: Fingerprint) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with tmp_path.open("w") as fp:
+        json.dump({**fingerprint, "version": _FINGERPRINT_VERSION}, fp)
+    os.replace(tmp_path, path)
+
+
+def explain_changes(old: Optional[Fingerprint], new: Fingerprint) -> List[str]:
+    """
+    Explain what differs between two fingerprints.
+
+    :param old: the fingerprint of the last successful run, if any.
+    :param new: the current fingerprint.
+    :return: a list of human readable reasons, empty if nothing changed.
+    """
+    if old is None:
+        return ["no successful run was recorded"]
+
+    reasons = [
+        f"{key} changed"
+        for key in sorted(new.keys())
+        if key not in ["files", "version"] and old.get(key) != new[key]
+    ]
+
+    old_files = {
+        path: info.get("sha256") for path, info in old.get("files", {}).items()
+    }
+    new_files = {
+        path: info["sha256"] for path, info in new.get("files", {}).items()
+    }
+
+    for kind, paths in [
+        ("added", [p for p in new_files if p not in old_files]),
+        ("removed", [p for p in old_files if p not in new_files]),
+        (
+            "modified",
+            [
+                p
+                for p in new_files
+                if p in old_files and old_files[p] != new_files[p]
+            ],
+        ),
+    ]:
+        if not paths:
+            continue
+
+        description = ", ".join(paths[:_MAX_FILES_TO_EXPLAIN])
+        if len(paths) > _MAX_FILES_TO_EXPLAIN:
+            description += (
+                f" and {len(paths) - _MAX_FILES_TO_EXPLAIN} other file(s)"
+            )
+        reasons.append(f"{kind} input files: {description}")
+
+    return reasons
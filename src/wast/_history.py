@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import statistics
+import time
+from collections import deque
+from datetime import timedelta
+from pathlib import Path
+from typing import Deque, Dict, List, NamedTuple, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+# How many entries to keep for each step
+HISTORY_WINDOW = 20
+
+
+class HistoryEntry(NamedTuple):
+    outcome: str
+    duration: float
+    phases: Dict[str, float]
+    timestamp: float
+    # The highest resident memory used by a command of the step, in bytes
+    peak_memory: Optional[int] = None
+
+    def as_dict(self, step: str) -> Dict[str, object]:
+        data: Dict[str, object] = {
+            "step": step,
+            "outcome": self.outcome,
+            "duration": round(self.duration, 3),
+            "phases": {
+                phase: round(duration, 3)
+                for phase, duration in self.phases.items()
+            },
+            "timestamp": round(self.timestamp, 3),
+        }
+        if self.peak_memory is not None:
+            data["peak_memory"] = self.peak_memory
+        return data
+
+
+class TimingHistory:
+    """
+    Keep track of the outcome and time spent in each step during previous runs.
+
+    The history is stored as an append-only file of json lines, one per step
+    run, and only the last :py:data:`HISTORY_WINDOW` entries of each step are
+    kept when it gets compacted.
+    """
+
+    def __init__(self, path: Path, window: int = HISTORY_WINDOW) -> None:
+        self._path = path
+        self._window = window
+        self._n_lines = 0
+        self._entries: Dict[str, Deque[HistoryEntry]] = {}
+        self._unsaved: List[str] = []
+        # Whether the file on disk contains invalid entries to get rid of
+        self._needs_compaction = False
+
+        self._load()
+
+    def get_entries(self, step: str) -> List[HistoryEntry]:
+        return list(self._entries.get(step, []))
+
+    def get_duration(self, step: str) -> Optional[timedelta]:
+        """
+        Get the typical duration of a complete, successful run of the step.
+
+        :param step: the name of the step
+        :return: the median duration, or :python:`None` if there is no such
+                 run in the history.
+        """
+        durations = [
+            entry.duration
+            for entry in self._entries.get(step, [])
+            if entry.outcome == "success" and "run" in entry.phases
+        ]
+        if not durations:
+            return None
+        return timedelta(seconds=statistics.median(durations))
+
+    def get_peak_memory(self, step: str) -> Optional[int]:
+        """
+        Get the most memory the step needed in its recent runs.
+
+        :param step: the name of the step
+        :return: the highest peak memory recorded, in bytes, or :python:`None`
+                 if none was recorded.
+        """
+        return max(
+            (
+                entry.peak_memory
+                for entry in self._entries.get(step, [])
+                if entry.peak_memory is not None
+            ),
+            default=None,
+        )
+
+    def record(
+        self,
+        step: str,
+        outcome: str,
+        duration: timedelta,
+        phases: Dict[str, timedelta],
+        peak_memory: Optional[int] = None,
+    ) -> None:
+        entry = HistoryEntry(
+            outcome,
+            duration.total_seconds(),
+            {phase: d.total_seconds() for phase, d in phases.items()},
+            time.time(),
+            peak_memory,
+        )
+        self._add(step, entry)
+        self._unsaved.append(json.dumps(entry.as_dict(step)))
+
+    def save(self) -> None:
+        if not self._unsaved:
+            return
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Let the file grow up to twice the size of what we keep, in order to
+        # not rewrite it every time.
+        max_lines = 2 * max(
+            sum(len(entries) for entries in self._entries.values()),
+            self._window,
+        )
+        if (
+            self._needs_compaction
+            or self._n_lines + len(self._unsaved) > max_lines
+        ):
+            self._compact()
+        else:
+            with self._path.open("a") as fp:
+                fp.writelines(f"{line}\n" for line in self._unsaved)
+            self._n_lines += len(self._unsaved)
+
+        self._unsaved = []
+
+    def _compact(self) -> None:
+        LOGGER.debug("Compacting the step history at %s", self._path)
+        lines = [
+            json.dumps(entry.as_dict(step))
+            for entry, step in sorted(
+                (
+                    (entry, step)
+                    for step, entries in self._entries.items()
+                    for entry in entries
+                ),
+                key=lambda item: item[0].timestamp,
+            )
+        ]
+
+        # Write to a temporary file first, in order to never leave a
+        # partially written history behind us.
+        tmp_path = self._path.with_name(f".{self._path.name}.tmp")
+        with tmp_path.open("w") as fp:
+            fp.writelines(f"{line}\n" for line in lines)
+        os.replace(tmp_path, self._path)
+        self._n_lines = len(lines)
+        self._needs_compaction = False
+
+    def _add(self, step: str, entry: HistoryEntry) -> None:
+        if step not in self._entries:
+            self._entries[step] = deque(maxlen=self._window)
+        self._entries[step].append(entry)
+
+    def _load(self) -> None:
+        try:
+            with self._path.open() as fp:
+                lines = fp.readlines()
+        except FileNotFoundError:
+            return
+        except OSError as exc:
+            LOGGER.warning(
+                "Unable to read the step history at %s, ignoring it: %s",
+                self._path,
+                exc,
+            )
+            return
+
+        self._n_lines = len(lines)
+        if lines and not lines[-1].endswith("\n"):
+            self._needs_compaction = True
+
+        for line in lines:
+            try:
+                data = json.loads(line)
+                step = str(data["step"])
+                entry = HistoryEntry(
+                    str(data["outcome"]),
+                    float(data["duration"]),
+                    {
+                        str(phase): float(duration)
+                        for phase, duration in data["phases"].items()
+                    },
+                    float(data["timestamp"]),
+                    (
+                        None
+                        if data.get("peak_memory") is None
+                        else int(data["peak_memory"])
+                    ),
+                )
+            except (ValueError, KeyError, TypeError, AttributeError):
+                # This can happen if a previous write got interrupted, there
+                # is not much we can do but ignore it.
+                LOGGER.debug("Ignoring invalid history entry: %s", line)
+                self._needs_compaction = True
+                continue
+
+            self._add(step, entry)
@@ -0,0 +1,170 @@
+import logging
+from collections import deque
+from typing import Dict, List, Optional
+
+from ._exceptions import CyclicStepDependenciesException, UnknownStepsException
+from ._step_index import IndexedStep
+
+LOGGER = logging.getLogger(__name__)
+
+# Resolving and listing steps only needs what is in the step index, and is
+# kept out of the pipeline so that listing them from the index does not have
+# to import everything needed to run them.
+
+
+def _static_order(graph: Dict[str, List[str]]) -> List[str]:
+    # Same order as graphlib.TopologicalSorter(graph).static_order(), which
+    # is not used here as it is the only reason listing would import it.
+    predecessors: Dict[str, int] = {}
+    successors: Dict[str, List[str]] = {}
+    for step, requirements in graph.items():
+        predecessors.setdefault(step, 0)
+        successors.setdefault(step, [])
+        for requirement in requirements:
+            predecessors.setdefault(requirement, 0)
+            successors.setdefault(requirement, []).append(step)
+            predecessors[step] += 1
+
+    order = []
+    ready = [step for step, count in predecessors.items() if count == 0]
+    while ready:
+        order.extend(ready)
+        next_ready = []
+        for step in ready:
+            for successor in successors[step]:
+                predecessors[successor] -= 1
+                if predecessors[successor] == 0:
+                    next_ready.append(successor)
+        ready = next_ready
+
+    if len(order) != len(predecessors):
+        raise CyclicStepDependenciesException(_find_cycle(graph))
+    return order
+
+
+def _find_cycle(graph: Dict[str, List[str]]) -> List[str]:
+    # Like graphlib, report the cycle going from requirements to the steps
+    # requiring them
+    visited = set()
+    for start in graph:
+        if start in visited:
+            continue
+
+        path = [start]
+        on_path = {start: 0}
+        stack = [iter(graph[start])]
+        while stack:
+            requirement = next(stack[-1], None)
+            if requirement is None:
+                stack.pop()
+                visited.add(path[-1])
+                del on_path[path.pop()]
+            elif requirement in on_path:
+                return list(
+                    reversed([*path[on_path[requirement] :], requirement])
+                )
+            elif requirement not in visited:
+                on_path[requirement] = len(path)
+                path.append(requirement)
+                stack.append(iter(graph.get(requirement, [])))
+
+    raise AssertionError("The graph has no cycle")
+
+
+def resolve_execution_order(
+    graph: Dict[str, IndexedStep],
+    steps: Optional[List[str]] = None,
+    only_steps: Optional[List[str]] = None,
+    except_steps: Optional[List[str]] = None,
+) -> List[str]:
+    """
+    Get the steps to run, with their requirements, in a topological order.
+
+    :param graph: all the steps of the pipeline
+    :param steps: the steps requested. Defaults to the ones running by default
+    :param only_steps: only run those steps, ignoring their other requirements
+    :param except_steps: don't run those steps, even if they are required
+    :raise UnknownStepsException: if some of the requested steps don't exist
+    :raise CyclicStepDependenciesException: if steps require each other
+    """
+    assert not (only_steps and except_steps)
+    if only_steps:
+        steps = only_steps
+    if except_steps is None:
+        except_steps = []
+
+    if steps is None:
+        steps = [
+            name
+            for name, step in graph.items()
+            if step.run_by_default and name not in except_steps
+        ]
+
+    selected: Dict[str, List[str]] = {}
+    steps_to_process = deque(steps)
+    unknown_steps = []
+
+    while steps_to_process:
+        step = steps_to_process.pop()
+
+        try:
+            step_info = graph[step]
+        except KeyError:
+            unknown_steps.append(step)
+            continue
+
+        required_steps = step_info.requires
+        if only_steps:
+            required_steps = [r for r in required_steps if r in only_steps]
+        elif except_steps:
+            required_steps = [
+                r for r in required_steps if r not in except_steps
+            ]
+
+        selected[step] = required_steps
+
+        for requirement in required_steps:
+            if requirement not in selected and requirement not in except_steps:
+                steps_to_process.append(requirement)
+
+    if unknown_steps:
+        raise UnknownStepsException(unknown_steps)
+
+    return _static_order(selected)
+
+
+def list_steps(
+    graph: Dict[str, IndexedStep],
+    steps: Optional[List[str]] = None,
+    only_steps: Optional[List[str]] = None,
+    except_steps: Optional[List[str]] = None,
+    show_dependencies: bool = False,
+    colors: bool = False,
+) -> None:
+    """
+    Log all the steps of the pipeline, marking the ones that would run.
+    """
+    # pylint: disable=too-many-arguments
+    all_steps = resolve_execution_order(graph, list(graph.keys()))
+    selected_steps = resolve_execution_order(
+        graph, steps, only_steps, except_steps
+    )
+
+    skipped_color = ""
+    if colors:
+        # pylint: disable-next=import-outside-toplevel
+        from colorama import Fore
+
+        skipped_color = Fore.LIGHTBLACK_EX
+
+    LOGGER.info("Available steps (* means selected, - means skipped):")
+    for step in sorted(all_steps):
+        dep_info = ""
+        if show_dependencies and graph[step].requires:
+            dep_info = " --> " + ", ".join(
+                reversed([s for s in all_steps if s in graph[step].requires])
+            )
+        if step in selected_steps:
+            LOGGER.info("\t* %s%s", step, dep_info)
+        else:
+            LOGGER.info("\t%s- %s%s", skipped_color, step, dep_info)
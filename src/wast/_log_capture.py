@@ -1,4 +1,20 @@
-from typing import List, Protocol, Tuple
+import codecs
+import struct
+import threading
+from typing import IO, Iterator, Optional, Protocol, Tuple, Union
+
+# How much output to keep in memory before spilling it to disk, by default
+DEFAULT_MEMORY_LIMIT = 8 * 1024 * 1024
+# Size of the chunks used when replaying the output
+_CHUNK_SIZE = 64 * 1024
+# Each record is the id of the stream, followed by the length of its data
+_HEADER = struct.Struct("<BI")
+_STDOUT = 1
+_STDERR = 2
+
+# Serializes the lines written by all the live outputs, so that lines of
+# different steps never get mixed
+_OUTPUT_LOCK = threading.Lock()
 
 
 class WriterProtocol(Protocol):
@@ -7,29 +23,181 @@ class WriterProtocol(Protocol):
 
 
 class MemoryPipe:
-    def __init__(self, writer: "PipePlexer") -> None:
+    def __init__(self, writer: "PipePlexer", stream_id: int) -> None:
         self._writer = writer
+        self._stream_id = stream_id
 
     def write(self, data: str) -> int:
-        return self._writer.write(self, data)
+        return self._writer.write(self._stream_id, data)
 
 
 class PipePlexer:
-    def __init__(self) -> None:
-        self.stderr = MemoryPipe(self)
-        self.stdout = MemoryPipe(self)
+    """
+    Capture the output of two streams, keeping the order in which it came.
+
+    The output is stored as a compact sequence of records, each tagged with
+    the stream it came from. Once it gets bigger than the memory limit, it is
+    spilled to a temporary file, so that verbose steps don't use unbounded
+    memory.
+    """
+
+    def __init__(self, memory_limit: int = DEFAULT_MEMORY_LIMIT) -> None:
+        self.stderr = MemoryPipe(self, _STDERR)
+        self.stdout = MemoryPipe(self, _STDOUT)
+
+        self._memory_limit = memory_limit
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self._file: Optional[IO[bytes]] = None
+        # Where the header of the last record is in the buffer, to be able to
+        # merge consecutive writes to the same stream
+        self._last_record: Optional[Tuple[int, int]] = None
 
-        self._buffer: List[Tuple[MemoryPipe, str]] = []
+    def write(self, stream_id: int, data: str) -> int:
+        encoded = data.encode()
+
+        with self._lock:
+            if (
+                self._last_record is not None
+                and self._last_record[0] == stream_id
+            ):
+                _, offset = self._last_record
+                _, length = _HEADER.unpack_from(self._buffer, offset)
+                _HEADER.pack_into(
+                    self._buffer, offset, stream_id, length + len(encoded)
+                )
+            else:
+                self._last_record = stream_id, len(self._buffer)
+                self._buffer += _HEADER.pack(stream_id, len(encoded))
+            self._buffer += encoded
+
+            if len(self._buffer) > self._memory_limit:
+                self._spill()
 
-    def write(self, stream: MemoryPipe, data: str) -> int:
-        self._buffer.append((stream, data))
         return len(data)
 
     def dump(
         self, target_stdout: WriterProtocol, target_stderr: WriterProtocol
     ) -> None:
-        for stream, line in self._buffer:
-            if stream == self.stdout:
-                target_stdout.write(line)
-            else:
-                target_stderr.write(line)
+        targets = {_STDOUT: target_stdout, _STDERR: target_stderr}
+        decoders = {
+            stream_id: codecs.getincrementaldecoder("utf-8")(errors="replace")
+            for stream_id in targets
+        }
+
+        with self._lock:
+            for stream_id, chunk in self._iter_chunks():
+                if data := decoders[stream_id].decode(chunk):
+                    targets[stream_id].write(data)
+
+            for stream_id, decoder in decoders.items():
+                if data := decoder.decode(b"", final=True):
+                    targets[stream_id].write(data)
+
+    def _spill(self) -> None:
+        if self._file is None:
+            # Most steps never need it, don't pay for importing it upfront
+            # pylint: disable=import-outside-toplevel,consider-using-with
+            import tempfile
+
+            self._file = tempfile.TemporaryFile(prefix="wast-output-")
+
+        self._file.write(self._buffer)
+        self._buffer = bytearray()
+        self._last_record = None
+
+    def _iter_chunks(self) -> Iterator[Tuple[int, bytes]]:
+        if self._file is not None:
+            self._file.seek(0)
+            while header := self._file.read(_HEADER.size):
+                stream_id, length = _HEADER.unpack(header)
+                while length > 0:
+                    chunk = self._file.read(min(length, _CHUNK_SIZE))
+                    length -= len(chunk)
+                    yield stream_id, chunk
+            # Keep writing at the end if more output comes
+            self._file.seek(0, 2)
+
+        with memoryview(self._buffer) as view:
+            offset = 0
+            while offset < len(view):
+                stream_id, length = _HEADER.unpack_from(view, offset)
+                offset += _HEADER.size
+                end = offset + length
+                for start in range(offset, end, _CHUNK_SIZE):
+                    yield stream_id, view[
+                        start : min(start + _CHUNK_SIZE, end)
+                    ].tobytes()
+                offset = end
+
+
+class _PrefixedPipe:
+    def __init__(
+        self, target: IO[str], prefix: str, suffix: str, max_line_length: int
+    ) -> None:
+        self._target = target
+        self._prefix = prefix
+        self._suffix = suffix
+        self._max_line_length = max_line_length
+        self._lock = threading.Lock()
+        self._partial_line = ""
+
+    def write(self, data: str) -> int:
+        with self._lock:
+            lines, newline, self._partial_line = (
+                self._partial_line + data
+            ).rpartition("\n")
+            if newline:
+                self._write_lines(lines)
+            # Don't hold back output that never ends a line forever, like
+            # progress bars
+            if len(self._partial_line) > self._max_line_length:
+                self._write_lines(self._partial_line)
+                self._partial_line = ""
+
+        return len(data)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._partial_line:
+                self._write_lines(self._partial_line)
+                self._partial_line = ""
+
+    def _write_lines(self, lines: str) -> None:
+        output = "".join(
+            f"{self._prefix}{line}{self._suffix}\n"
+            for line in lines.split("\n")
+        )
+        with _OUTPUT_LOCK:
+            self._target.write(output)
+            self._target.flush()
+
+
+class LinePrefixer:
+    """
+    Stream the output of two streams live, prefixing each line.
+
+    Only whole lines are written, each in a single write, so that the output
+    of steps running in parallel never gets mixed in the middle of a line.
+    """
+
+    def __init__(
+        self,
+        target_stdout: IO[str],
+        target_stderr: IO[str],
+        prefix: str,
+        suffix: str = "",
+    ) -> None:
+        self.stdout = _PrefixedPipe(target_stdout, prefix, suffix, _CHUNK_SIZE)
+        self.stderr = _PrefixedPipe(target_stderr, prefix, suffix, _CHUNK_SIZE)
+
+    def close(self) -> None:
+        """
+        Write the last lines of output, even if they are incomplete.
+        """
+        self.stdout.close()
+        self.stderr.close()
+
+
+# How the output of a step running in parallel to others is handled
+OutputCapture = Union[PipePlexer, LinePrefixer]
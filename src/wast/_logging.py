@@ -5,23 +5,34 @@ from contextvars import ContextVar
 from types import TracebackType
 from typing import Any, Optional, Tuple, Type, Union, cast
 
-from colorama import Fore, Style, init
-
 from ._log_capture import WriterProtocol
 
 _ContextHandler = ContextVar[logging.Handler]("_ContextHandler")
 
 
+# colorama is only imported when colors are enabled, to not slow down the
+# startup of invocations that don't need them
 class ColorFormatter(logging.Formatter):
-    COLOR_MAPPING = {
-        logging.DEBUG: Fore.CYAN,
-        logging.INFO: Fore.WHITE,
-        logging.WARN: Fore.YELLOW,
-        logging.ERROR: Fore.RED + Style.BRIGHT,
-    }
+    def __init__(self) -> None:
+        # pylint: disable-next=import-outside-toplevel
+        from colorama import Fore, Style
+
+        super().__init__(
+            fmt=(
+                f"{Fore.CYAN}{Style.DIM}wast >{Style.RESET_ALL}"
+                f" %(level_color)s%(message)s{Style.RESET_ALL}"
+            )
+        )
+        self._exception_color = Fore.CYAN
+        self._color_mapping = {
+            logging.DEBUG: Fore.CYAN,
+            logging.INFO: Fore.WHITE,
+            logging.WARN: Fore.YELLOW,
+            logging.ERROR: Fore.RED + Style.BRIGHT,
+        }
 
     def formatMessage(self, record: logging.LogRecord) -> str:
-        cast(Any, record).level_color = self.COLOR_MAPPING[record.levelno]
+        cast(Any, record).level_color = self._color_mapping[record.levelno]
         return super().formatMessage(record)
 
     def formatException(
@@ -32,7 +43,7 @@ class ColorFormatter(logging.Formatter):
         ],
     ) -> str:
         output = super().formatException(ei)
-        output = f"{Fore.CYAN}\nwast > " + "\nwast > ".join(
+        output = f"{self._exception_color}\nwast > " + "\nwast > ".join(
             output.splitlines()
         )
         return output
@@ -67,19 +78,22 @@ def _create_handler(output: WriterProtocol) -> logging.Handler:
 
 def setup_logging(level: int, colors: bool) -> None:
     if colors:
+        # pylint: disable-next=import-outside-toplevel
+        from colorama import init
+
         init(strip=False)
-        formatter: logging.Formatter = ColorFormatter(
-            fmt=(
-                f"{Fore.CYAN}{Style.DIM}wast >{Style.RESET_ALL}"
-                f" %(level_color)s%(message)s{Style.RESET_ALL}"
-            )
-        )
+        formatter: logging.Formatter = ColorFormatter()
     else:
         formatter = NoColorFormatter(fmt="wast > [%(levelname)s] %(message)s")
 
     logger = logging.getLogger()
     logger.setLevel(level)
 
+    # The server sets up logging again for each invocation it serves
+    for previous in logger.handlers[:]:
+        if isinstance(previous, ContextBasedHandler):
+            logger.removeHandler(previous)
+
     handler = ContextBasedHandler()
     handler.setFormatter(formatter)
     logger.addHandler(handler)
@@ -0,0 +1,113 @@
+import logging
+import os
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+_MEMINFO = Path("/proc/meminfo")
+_CGROUP_ROOT = Path("/sys/fs/cgroup")
+_PROC_CGROUP = Path("/proc/self/cgroup")
+
+
+def _read_int(path: Path) -> Optional[int]:
+    try:
+        value = path.read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+
+    # cgroups v2 report an unlimited memory as "max"
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _get_meminfo_available() -> Optional[int]:
+    try:
+        lines = _MEMINFO.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+
+    for line in lines:
+        if line.startswith("MemAvailable:"):
+            # The value is given in kB
+            return int(line.split()[1]) * 1024
+    return None
+
+
+def _get_own_cgroups(root: Path) -> Iterator[Tuple[Path, Path, str, str]]:
+    # Yield where the hierarchy is mounted and the directory of the cgroup we
+    # run in, for cgroups v2 and for the memory controller of cgroups v1,
+    # along with the names of their limit and usage files
+    try:
+        lines = _PROC_CGROUP.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return
+
+    for line in lines:
+        fields = line.split(":", 2)
+        if len(fields) != 3:
+            continue
+
+        hierarchy, controllers, path = fields
+        if hierarchy == "0" and not controllers:
+            mount = root
+            limit_file, usage_file = "memory.max", "memory.current"
+        elif "memory" in controllers.split(","):
+            mount = root / "memory"
+            limit_file = "memory.limit_in_bytes"
+            usage_file = "memory.usage_in_bytes"
+        else:
+            continue
+
+        # In a cgroup namespace, the path can point above the mount
+        cgroup = Path(os.path.normpath(mount / path.lstrip("/")))
+        if mount not in [cgroup, *cgroup.parents]:
+            cgroup = mount
+        yield mount, cgroup, limit_file, usage_file
+
+
+def _get_cgroup_available(root: Path) -> Optional[int]:
+    # Limits set on the parents of our cgroup apply too, e.g. on the slice
+    # containing it. Limits of v1 can be absurdly high when there are none,
+    # which is fine as we take the minimum.
+    available = []
+    for mount, cgroup, limit_file, usage_file in _get_own_cgroups(root):
+        directory = cgroup
+        while True:
+            limit = _read_int(directory / limit_file)
+            usage = _read_int(directory / usage_file)
+            if limit is not None and usage is not None:
+                available.append(max(limit - usage, 0))
+            if directory == mount:
+                break
+            directory = directory.parent
+
+    return min(available, default=None)
+
+
+def get_available_memory(cgroup_root: Path = _CGROUP_ROOT) -> Optional[int]:
+    """
+    Get how much memory can still be used by the steps, in bytes.
+
+    This is the memory the kernel reports as available, further restricted
+    by the limits of the cgroup we run in and of its parents, if any, as
+    found from ``/proc/self/cgroup``.
+
+    :param cgroup_root: where the cgroup hierarchies are mounted
+    :return: the available memory, or :python:`None` if it is unknown, e.g.
+             on platforms not providing ``/proc/meminfo``.
+    """
+    candidates: List[int] = [
+        value
+        for value in [
+            _get_meminfo_available(),
+            _get_cgroup_available(cgroup_root),
+        ]
+        if value is not None
+    ]
+    if not candidates:
+        LOGGER.debug("Unable to tell how much memory is available")
+        return None
+    return min(candidates)
@@ -0,0 +1,121 @@
+import fcntl
+import functools
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+_EXTRACTION_LOCK = threading.Lock()
+
+# Launcher for pip in environments that don't have it installed
+_PIP_SCRIPT = """\
+#!{python}
+import sys
+
+from pip._internal.cli.main import main
+
+if __name__ == "__main__":
+    sys.exit(main())
+"""
+
+
+@contextmanager
+def _lock_extraction(target: Path) -> Iterator[None]:
+    # Other wast processes sharing the cache can extract the same pip, they
+    # are kept out with a lock file next to it. The file lock is held by the
+    # process, so its threads are kept out with a thread lock.
+    with _EXTRACTION_LOCK:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with target.with_name(f".{target.name}.lock").open("w") as fp:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+
+
+@functools.lru_cache(maxsize=None)
+def _find_bundled_pip(interpreter: str, mtime_ns: int) -> Optional[str]:
+    # pylint: disable=unused-argument
+    # The mtime is part of the arguments to invalidate the cache in long
+    # running processes if the interpreter gets updated.
+    try:
+        ensurepip_path = subprocess.run(
+            [
+                interpreter,
+                "-c",
+                "import ensurepip, os; print(os.path.dirname(ensurepip.__file__))",
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except subprocess.CalledProcessError:
+        # Some distributions remove ensurepip
+        return None
+
+    wheels = sorted(Path(ensurepip_path, "_bundled").glob("pip-*.whl"))
+    if not wheels:
+        return None
+    return str(wheels[-1])
+
+
+def get_shared_pip(interpreter: str, cache_path: Path) -> Optional[Path]:
+    """
+    Get a copy of pip that can be shared by environments of this interpreter.
+
+    This extracts the version of pip bundled with the interpreter once in the
+    cache, in order to not need to install it in every environment.
+
+    :param interpreter: the path to the interpreter
+    :param cache_path: the root of the directory where to extract pip
+    :return: the path to add to :py:data:`sys.path` in order to import pip, or
+             :python:`None` if the interpreter does not bundle pip.
+    """
+    wheel = _find_bundled_pip(interpreter, os.stat(interpreter).st_mtime_ns)
+    if wheel is None:
+        return None
+
+    target = cache_path / Path(wheel).stem
+
+    if target.exists():
+        return target
+
+    with _lock_extraction(target):
+        if not target.exists():
+            # pylint: disable-next=import-outside-toplevel
+            import zipfile
+
+            LOGGER.debug("Extracting %s to %s", wheel, target)
+            tmp_path = target.with_name(f".{target.name}.tmp")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            with zipfile.ZipFile(wheel) as archive:
+                archive.extractall(tmp_path)
+            os.replace(tmp_path, target)
+
+    return target
+
+
+def link_shared_pip(venv_path: Path, pip_path: Path) -> None:
+    """
+    Make the shared pip available in the given environment.
+
+    This makes ``python -m pip`` and the ``pip`` scripts work as if pip was
+    installed in the environment. Installing pip in the environment
+    explicitly takes precedence over the shared one.
+    """
+    for site_packages in venv_path.glob("lib/*/site-packages"):
+        site_packages.joinpath("_wast_shared_pip.pth").write_text(
+            f"{pip_path}\n"
+        )
+
+    for name in ["pip", "pip3"]:
+        script = venv_path / "bin" / name
+        script.write_text(_PIP_SCRIPT.format(python=venv_path / "bin/python"))
+        script.chmod(0o755)
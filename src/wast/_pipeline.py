@@ -1,13 +1,27 @@
+# pylint: disable=too-many-lines
 import graphlib
 import logging
+import os
+import statistics
 import sys
 import time
-from collections import deque
 from concurrent import futures
 from contextvars import Context, ContextVar, copy_context
 from datetime import timedelta
+from pathlib import Path
 from subprocess import CalledProcessError
-from typing import Dict, Generator, List, Optional, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    Pattern,
+    Set,
+    Tuple,
+)
 
 from colorama import Fore, Style
 
@@ -15,23 +29,57 @@ from wast._steps.handlers import BaseStepHandler, StepGroupHandler, StepHandler
 from wast._steps.parametrize import extract_parameters
 from wast._steps.steps import Step
 
-from ._config import Config
+from ._config import CONFIG_ENVIRONMENT, Config
 from ._exceptions import (
-    CyclicStepDependenciesException,
+    BaseWastException,
     DuplicateStepException,
     FailedPipelineException,
     UnavailableInterpreterException,
-    UnknownStepsException,
 )
-from ._log_capture import PipePlexer
+from ._history import TimingHistory
+from ._listing import list_steps, resolve_execution_order
+from ._log_capture import LinePrefixer, OutputCapture, PipePlexer
 from ._logging import set_context_handler
-from ._subproc import set_subprocess_default_pipes
+from ._memory import get_available_memory
+from ._scheduler import Scheduler
+from ._step_index import IndexedStep, StepIndex, get_module_files
+from ._subproc import (
+    get_subprocess_default_pipes,
+    set_command_scope,
+    set_subprocess_default_pipes,
+    track_peak_memory,
+)
 from ._timing import get_timedelta_since
+from ._wheelhouse import Wheelhouse
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from ._async_subproc import CommandScope
 
 LOGGER = logging.getLogger(__name__)
 
 _PIPELINE = ContextVar["Pipeline"]("pipeline")
 
+# Duration assumed for steps that never ran, when no other step has history
+# either.
+DEFAULT_STEP_DURATION = timedelta(seconds=1)
+# A step's duration is flagged in the summary if it differs from its median
+# duration by this factor, and at least by that much time
+DEVIATION_FACTOR = 1.5
+SIGNIFICANT_DEVIATION = timedelta(seconds=5)
+# Colors used to tell apart the output of steps when streaming it live
+OUTPUT_COLORS = [
+    Fore.CYAN,
+    Fore.MAGENTA,
+    Fore.BLUE,
+    Fore.GREEN,
+    Fore.YELLOW,
+    Fore.LIGHTCYAN_EX,
+    Fore.LIGHTMAGENTA_EX,
+    Fore.LIGHTBLUE_EX,
+]
+
 
 def get_pipeline() -> "Pipeline":
     return _PIPELINE.get()
@@ -50,6 +98,7 @@ class ExceptionWithTimeSpentException(Exception):
         self.time_spent = time_spent
 
 
+# pylint: disable=too-many-instance-attributes
 class Pipeline:
     def __init__(self, config: Config) -> None:
         self.config = config
@@ -59,6 +108,14 @@ class Pipeline:
             Tuple[str, List[str], Optional[bool]]
         ] = []
         self._steps_cache: Optional[Dict[str, BaseStepHandler]] = None
+        self._graph_cache: Optional[Dict[str, IndexedStep]] = None
+        self._history_cache: Optional[TimingHistory] = None
+        self.wheelhouse = Wheelhouse(config)
+        # Where the pipeline was defined, to be able to reload it in workers
+        self.definition_path: Optional[str] = None
+        # Modules imported by the pipeline definition
+        self.definition_modules: Set[str] = set()
+        self._process_pool_cache: Optional[futures.ProcessPoolExecutor] = None
 
     @property
     def _steps(self) -> Dict[str, BaseStepHandler]:
@@ -66,6 +123,127 @@ class Pipeline:
             self._steps_cache = self._resolve_steps()
         return self._steps_cache
 
+    @property
+    def _graph(self) -> Dict[str, IndexedStep]:
+        if self._graph_cache is None:
+            self._graph_cache = {
+                name: (
+                    IndexedStep(
+                        step.requires,
+                        step.run_by_default,
+                        step.python,
+                        step.parameters_id,
+                    )
+                    if isinstance(step, StepHandler)
+                    else IndexedStep(step.requires, step.run_by_default)
+                )
+                for name, step in self._steps.items()
+            }
+        return self._graph_cache
+
+    @property
+    def _history(self) -> TimingHistory:
+        if self._history_cache is None:
+            self._history_cache = TimingHistory(self.config.history_path)
+        return self._history_cache
+
+    @property
+    def _process_pool(self) -> "futures.ProcessPoolExecutor":
+        if self._process_pool_cache is None:
+            # pylint: disable-next=import-outside-toplevel
+            import multiprocessing
+
+            # Forking a process with multiple running threads is not safe
+            self._process_pool_cache = futures.ProcessPoolExecutor(
+                self.config.n_jobs,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._process_pool_cache
+
+    def run_in_worker(self, name: str) -> Dict[str, List[Any]]:
+        """
+        Run the body of the given step in a worker process.
+
+        Its output is forwarded to the current output of the step.
+
+        :return: the artifacts gathered by the step in the worker
+        """
+        # pylint: disable=import-outside-toplevel,cyclic-import
+        from ._worker import RemoteTraceback, run_step
+
+        if self.definition_path is None:
+            raise BaseWastException(
+                f"Unable to run {name} in a worker process: the pipeline was"
+                " not loaded from a file"
+            )
+
+        handler = self._steps[name]
+        assert isinstance(handler, StepHandler)
+
+        # Steps that ran in other workers can't gather their artifacts again
+        worker_artifacts = {
+            step.name: step.worker_artifacts
+            for step in self._steps.values()
+            if isinstance(step, StepHandler)
+            and step.worker_artifacts is not None
+        }
+
+        output, artifacts, exception, tb = self._process_pool.submit(
+            run_step,
+            self.definition_path,
+            self.config,
+            name,
+            worker_artifacts,
+            handler.jobs,
+        ).result()
+
+        stdout, stderr = get_subprocess_default_pipes()
+        for stream, data in output:
+            (stdout if stream == "stdout" else stderr).write(data)
+
+        if exception is not None:
+            raise exception from RemoteTraceback(tb)
+        return artifacts
+
+    def save_step_index(self) -> None:
+        """
+        Record the steps of the pipeline definition in the step index.
+        """
+        assert self.definition_path is not None
+
+        files = get_module_files(
+            [
+                *self.definition_modules,
+                *(
+                    module
+                    for module in sys.modules
+                    if module == "wast" or module.startswith("wast.")
+                ),
+            ]
+        )
+
+        try:
+            StepIndex(self.config.step_index_path).save(
+                self.definition_path,
+                [os.path.abspath(self.definition_path), *files],
+                self._graph,
+            )
+        except OSError as exc:
+            LOGGER.warning("Unable to save the step index: %s", exc)
+
+    def get_environment_variables(self) -> Set[str]:
+        """
+        Get the variables of the environment the configuration and the steps
+        captured when they were created.
+        """
+        return set(CONFIG_ENVIRONMENT).union(
+            *(
+                step.passenv
+                for step in self._steps.values()
+                if isinstance(step, StepHandler)
+            )
+        )
+
     def register_step(self, name: str, step: "Step") -> None:
         self._registered_steps.append((name, step))
 
@@ -123,8 +301,14 @@ class Pipeline:
                 requires=args.pop("requires", None),
                 run_by_default=current_run_by_default,
                 parameters=args,
+                parameters_id=params_id,
                 passenv=args.pop("passenv", None),
                 setenv=args.pop("setenv", None),
+                inputs=args.pop("inputs", None),
+                run_in_process=args.pop("run_in_process", None),
+                cores=args.pop("cores", None),
+                memory=args.pop("memory", None),
+                resources=args.pop("resources", None),
             )
 
         if len(parameters) > 1:
@@ -136,57 +320,9 @@ class Pipeline:
         only_steps: Optional[List[str]] = None,
         except_steps: Optional[List[str]] = None,
     ) -> List[str]:
-        assert not (only_steps and except_steps)
-        if only_steps:
-            steps = only_steps
-        if except_steps is None:
-            except_steps = []
-
-        if steps is None:
-            steps = [
-                name
-                for name, step in self._steps.items()
-                if step.run_by_default and name not in except_steps
-            ]
-
-        graph = {}
-        steps_to_process = deque(steps)
-        unknown_steps = []
-
-        while steps_to_process:
-            step = steps_to_process.pop()
-
-            try:
-                step_info = self._steps[step]
-            except KeyError:
-                unknown_steps.append(step)
-                continue
-
-            required_steps = step_info.requires
-            if only_steps:
-                required_steps = [r for r in required_steps if r in only_steps]
-            elif except_steps:
-                required_steps = [
-                    r for r in required_steps if r not in except_steps
-                ]
-
-            graph[step] = required_steps
-
-            for requirement in required_steps:
-                if (
-                    requirement not in graph
-                    and requirement not in except_steps
-                ):
-                    steps_to_process.append(requirement)
-
-        if unknown_steps:
-            raise UnknownStepsException(unknown_steps)
-
-        sorter = graphlib.TopologicalSorter(graph)
-        try:
-            return list(sorter.static_order())
-        except graphlib.CycleError as exc:
-            raise CyclicStepDependenciesException(exc.args[1]) from exc
+        return resolve_execution_order(
+            self._graph, steps, only_steps, except_steps
+        )
 
     def execute(
         self,
@@ -210,6 +346,14 @@ class Pipeline:
             for step in steps:
                 self._steps[step].clean()
 
+        if self.config.wheelhouse and not self.config.skip_setup:
+            self.wheelhouse.fill(
+                (handler.python, tuple(handler.dependencies))
+                for handler in (self._steps[step] for step in steps)
+                if isinstance(handler, StepHandler)
+                and handler.dependencies is not None
+            )
+
         LOGGER.info("Running steps: %s", ", ".join(steps))
 
         graph = {
@@ -221,84 +365,463 @@ class Pipeline:
             for step in steps
         }
 
-        sorter = graphlib.TopologicalSorter(graph)
-        sorter.prepare()
+        cores = {
+            name: handler.cores
+            for name, handler in self._steps.items()
+            if isinstance(handler, StepHandler) and handler.cores is not None
+        }
+        # Cores only limit the steps running in parallel when asked to, or
+        # when some steps can make use of several
+        n_cores = self.config.n_cores
+        if n_cores is None and any(step in cores for step in steps):
+            n_cores = os.cpu_count() or 1
+
+        scheduler = Scheduler(
+            graph,
+            self._estimate_durations(steps),
+            cores,
+            n_cores,
+            memory=self._estimate_memory(steps),
+            memory_budget=get_available_memory(),
+            resources={
+                name: handler.resources
+                for name, handler in self._steps.items()
+                if isinstance(handler, StepHandler)
+            },
+        )
+        LOGGER.debug(
+            "Estimated remaining time per step: %s",
+            ", ".join(
+                f"{step}={priority}"
+                for step, priority in scheduler.priorities.items()
+            ),
+        )
+
+        output_prefixes = self._get_output_prefixes(steps)
+        if self.config.engine == "asyncio":
+            # Only pay for importing asyncio when it is used
+            # pylint: disable-next=import-outside-toplevel,redefined-outer-name
+            import asyncio
+
+            results = asyncio.run(
+                self._execute_with_asyncio(scheduler, output_prefixes)
+            )
+        else:
+            results = self._execute_with_threads(scheduler, output_prefixes)
+
+        # Steps that were ready but never got started due to a failure
+        for name in scheduler.pending():
+            results[name] = futures.CancelledError(), timedelta()
+
+        if self._process_pool_cache is not None:
+            self._process_pool_cache.shutdown()
+            self._process_pool_cache = None
+
+        try:
+            self._log_summary(graph, results, start_time)
+        finally:
+            self._record_history(results)
 
+    def watch(
+        self,
+        steps: Optional[List[str]],
+        only_steps: Optional[List[str]],
+        except_steps: Optional[List[str]],
+        clean: bool,
+    ) -> None:
+        """
+        Run the steps, then rerun them whenever their inputs change.
+
+        Only the steps declaring inputs matching the files that changed, and
+        the steps depending on them, are rerun. The pipeline definition is
+        not reloaded, and environments are only set up again when what they
+        installed changed. This runs until interrupted.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from ._watch import FileWatcher, compile_input_pattern
+
+        selected = self._resolve_execution_order(
+            steps, only_steps, except_steps
+        )
+        patterns = {}
+        for name in selected:
+            handler = self._steps[name]
+            if isinstance(handler, StepHandler) and handler.inputs:
+                patterns[name] = [
+                    compile_input_pattern(pattern)
+                    for pattern in handler.inputs
+                ]
+        if not patterns:
+            LOGGER.warning(
+                "None of the selected steps declares inputs, they will never"
+                " be rerun"
+            )
+
+        watcher = FileWatcher(Path.cwd(), [self.config.cache_path])
+        to_run = selected
+
+        try:
+            while True:
+                try:
+                    self.execute(to_run, to_run, None, clean=clean)
+                except FailedPipelineException as exc:
+                    LOGGER.error("%s", exc)
+                clean = False
+
+                LOGGER.info("%sWatching for changes...", Style.BRIGHT)
+                to_run = []
+                while not to_run:
+                    changes = watcher.wait()
+                    LOGGER.debug(
+                        "Files changed: %s", ", ".join(sorted(changes))
+                    )
+                    if (
+                        self.definition_path is not None
+                        and os.path.relpath(self.definition_path) in changes
+                    ):
+                        LOGGER.warning(
+                            "The pipeline definition changed, restart wast to"
+                            " take it into account"
+                        )
+                    to_run = self._get_affected_steps(
+                        selected, patterns, changes
+                    )
+        except KeyboardInterrupt:
+            LOGGER.info("Stopped watching")
+        finally:
+            watcher.close()
+
+    def _get_affected_steps(
+        self,
+        steps: List[str],
+        patterns: Dict[str, List[Pattern[str]]],
+        changes: Set[str],
+    ) -> List[str]:
+        affected = {
+            name
+            for name, step_patterns in patterns.items()
+            if any(
+                pattern.match(path)
+                for pattern in step_patterns
+                for path in changes
+            )
+        }
+
+        # Steps are sorted topologically, requirements come first
+        for name in steps:
+            if any(r in affected for r in self._graph[name].requires):
+                affected.add(name)
+
+        return [name for name in steps if name in affected]
+
+    def _execute_with_threads(
+        self, scheduler: Scheduler, output_prefixes: Dict[str, str]
+    ) -> Dict[str, Tuple[Optional[Exception], timedelta]]:
         results: Dict[str, Tuple[Optional[Exception], timedelta]] = {}
         should_stop = False
 
         with futures.ThreadPoolExecutor(self.config.n_jobs) as executor:
             running_futures: Dict[
-                futures.Future[timedelta], Tuple[str, Optional[PipePlexer]]
+                futures.Future[timedelta], Tuple[str, Optional[OutputCapture]]
             ] = {}
 
-            while sorter.is_active():
-                ready = sorter.get_ready()
-                if not ready:
-                    if not running_futures:
-                        # No more tasks ready to run, and all tasks has finished
-                        # we can't move forward
-                        break
+            while scheduler.is_active():
+                if not should_stop:
+                    # Only submit as many steps as can run at once, so that
+                    # steps becoming ready later can still overtake the ones
+                    # that are less critical.
+                    for name in scheduler.pop_ready(
+                        self.config.n_jobs - len(running_futures)
+                    ):
+                        self._grant_cores(scheduler, name)
+                        pipe_plexer = self._create_output_capture(
+                            name, output_prefixes
+                        )
+
+                        # XXX: Save the context to be able to rerun in it with
+                        # each executor. This needs to be done every time as
+                        # it's not possible to re-enter a context.
+                        pipeline_context = copy_context()
+
+                        future = executor.submit(
+                            self._run_step_in_context,
+                            pipeline_context,
+                            name,
+                            pipe_plexer,
+                        )
+                        running_futures[future] = name, pipe_plexer
+
+                if not running_futures:
+                    # No more tasks ready to run, and all tasks has finished
+                    # we can't move forward
+                    break
+
+                next_finished = next(
+                    futures.as_completed(running_futures.keys())
+                )
+                name, pipe_plexer = running_futures.pop(next_finished)
 
-                    next_finished = next(
-                        futures.as_completed(running_futures.keys())
-                    )
-                    name, pipe_plexer = running_futures.pop(next_finished)
-
-                    if pipe_plexer is not None:
-                        pipe_plexer.dump(sys.stdout, sys.stderr)
-
-                    try:
-                        time_spent = next_finished.result()
-                    except ExceptionWithTimeSpentException as exc:
-                        results[name] = exc.original_exception, exc.time_spent
-
-                        if (
-                            isinstance(
-                                exc.original_exception,
-                                UnavailableInterpreterException,
-                            )
-                            and self.config.skip_missing_interpreters
-                        ):
-                            sorter.done(name)
-                        else:
-                            if self.config.fail_fast:
-                                should_stop = True
-                                for future in running_futures:
-                                    future.cancel()
-
-                            # We won't be able to enqueue new results after a failure
-                            # anyways
-                            continue
-                    except futures.CancelledError as exc:
-                        results[name] = exc, timedelta()
-                        continue
-                    else:
-                        results[name] = None, time_spent
-                        sorter.done(name)
-
-                if should_stop:
-                    continue
-
-                for name in ready:
-                    pipe_plexer = (
-                        PipePlexer() if self.config.n_jobs != 1 else None
-                    )
+                if self._collect_result(
+                    scheduler, results, name, pipe_plexer, next_finished.result
+                ):
+                    should_stop = True
+                    for future in running_futures:
+                        future.cancel()
+
+        return results
+
+    async def _execute_with_asyncio(
+        self, scheduler: Scheduler, output_prefixes: Dict[str, str]
+    ) -> Dict[str, Tuple[Optional[Exception], timedelta]]:
+        # Steps are synchronous, so they still need a thread each to run,
+        # but all the commands they run are handled by the event loop, which
+        # allows killing them as soon as we need to stop.
+        # pylint: disable=import-outside-toplevel,redefined-outer-name
+        import asyncio
+
+        from ._async_subproc import CommandScope
+
+        loop = asyncio.get_running_loop()
+        results: Dict[str, Tuple[Optional[Exception], timedelta]] = {}
+        should_stop = False
+
+        with futures.ThreadPoolExecutor(self.config.n_jobs) as executor:
+            running_tasks: Dict[
+                "asyncio.Future[timedelta]",
+                Tuple[str, Optional[OutputCapture], CommandScope],
+            ] = {}
+
+            while scheduler.is_active():
+                if not should_stop:
+                    for name in scheduler.pop_ready(
+                        self.config.n_jobs - len(running_tasks)
+                    ):
+                        self._grant_cores(scheduler, name)
+                        pipe_plexer = self._create_output_capture(
+                            name, output_prefixes
+                        )
+                        scope = CommandScope(loop)
+
+                        task = loop.run_in_executor(
+                            executor,
+                            self._run_step_in_context,
+                            copy_context(),
+                            name,
+                            pipe_plexer,
+                            scope,
+                        )
+                        running_tasks[task] = name, pipe_plexer, scope
+
+                if not running_tasks:
+                    break
+
+                finished, _ = await asyncio.wait(
+                    running_tasks.keys(), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in finished:
+                    name, pipe_plexer, _ = running_tasks.pop(task)
+
+                    if self._collect_result(
+                        scheduler, results, name, pipe_plexer, task.result
+                    ):
+                        should_stop = True
+                        for _, _, scope in running_tasks.values():
+                            scope.cancel()
+
+        # Let cancelled commands finish cleaning up before the loop closes
+        await asyncio.gather(
+            *(asyncio.all_tasks() - {asyncio.current_task()}),
+            return_exceptions=True,
+        )
+        return results
 
-                    # XXX: Save the context to be able to rerun in it with each
-                    # executor. This needs to be done every time as it's not
-                    # possible to re-enter a context.
-                    pipeline_context = copy_context()
+    def _grant_cores(self, scheduler: Scheduler, name: str) -> None:
+        handler = self._steps[name]
+        if isinstance(handler, StepHandler):
+            handler.jobs = scheduler.get_granted_cores(name)
+            if handler.jobs > 1:
+                LOGGER.debug("Granted %d cores to %s", handler.jobs, name)
 
-                    future = executor.submit(
-                        self._run_step_in_context,
-                        pipeline_context,
+    def _collect_result(
+        self,
+        scheduler: Scheduler,
+        results: Dict[str, Tuple[Optional[Exception], timedelta]],
+        name: str,
+        pipe_plexer: Optional[OutputCapture],
+        get_time_spent: Callable[[], timedelta],
+    ) -> bool:
+        """
+        Record the result of a step that finished.
+
+        :return: whether the pipeline should stop running new steps
+        """
+        scheduler.release(name)
+
+        if isinstance(pipe_plexer, PipePlexer):
+            pipe_plexer.dump(sys.stdout, sys.stderr)
+        elif isinstance(pipe_plexer, LinePrefixer):
+            pipe_plexer.close()
+
+        try:
+            time_spent = get_time_spent()
+        except ExceptionWithTimeSpentException as exc:
+            results[name] = exc.original_exception, exc.time_spent
+
+            if (
+                isinstance(
+                    exc.original_exception,
+                    UnavailableInterpreterException,
+                )
+                and self.config.skip_missing_interpreters
+            ):
+                scheduler.done(name)
+            elif isinstance(exc.original_exception, futures.CancelledError):
+                pass
+            else:
+                if isinstance(pipe_plexer, LinePrefixer):
+                    # The output of the step is interleaved with the others,
+                    # make failures stand out as soon as they happen
+                    LOGGER.error(
+                        "%s%s[%s] %s: error: %s",
+                        Style.BRIGHT,
+                        Fore.RED,
+                        exc.time_spent,
                         name,
-                        pipe_plexer,
+                        self._format_exception(exc.original_exception),
                     )
-                    running_futures[future] = name, pipe_plexer
+                if self.config.fail_fast:
+                    return True
+        except futures.CancelledError as exc:
+            results[name] = exc, timedelta()
+        else:
+            results[name] = None, time_spent
+            scheduler.done(name)
+
+        return False
+
+    def _get_output_prefixes(self, steps: List[str]) -> Dict[str, str]:
+        if not self.config.live_output or self.config.n_jobs == 1:
+            return {}
+
+        width = max(len(step) for step in steps)
+        if not self.config.colors:
+            return {step: f"{step:<{width}} | " for step in steps}
+
+        return {
+            step: (
+                f"{OUTPUT_COLORS[index % len(OUTPUT_COLORS)]}{step:<{width}}"
+                f" |{Style.RESET_ALL} "
+            )
+            for index, step in enumerate(steps)
+        }
 
-            self._log_summary(graph, results, start_time)
+    def _create_output_capture(
+        self, name: str, output_prefixes: Dict[str, str]
+    ) -> Optional[OutputCapture]:
+        if self.config.n_jobs == 1:
+            return None
+        if name in output_prefixes:
+            return LinePrefixer(
+                sys.stdout,
+                sys.stderr,
+                output_prefixes[name],
+                Style.RESET_ALL if self.config.colors else "",
+            )
+        return PipePlexer(self.config.output_buffer_size)
+
+    def _estimate_durations(self, steps: List[str]) -> Dict[str, timedelta]:
+        known_durations = {}
+        for step in steps:
+            duration = self._history.get_duration(step)
+            if duration is not None:
+                known_durations[step] = duration
+
+        # Steps that never ran are assumed to be as slow as a typical step
+        default_duration = DEFAULT_STEP_DURATION
+        if known_durations:
+            default_duration = timedelta(
+                seconds=statistics.median(
+                    d.total_seconds() for d in known_durations.values()
+                )
+            )
+
+        return {
+            step: (
+                timedelta()
+                if isinstance(self._steps[step], StepGroupHandler)
+                else known_durations.get(step, default_duration)
+            )
+            for step in steps
+        }
+
+    def _estimate_memory(self, steps: List[str]) -> Dict[str, int]:
+        memory = {}
+        for step in steps:
+            handler = self._steps[step]
+            if not isinstance(handler, StepHandler):
+                continue
+
+            if handler.memory is not None:
+                memory[step] = handler.memory
+            else:
+                peak_memory = self._history.get_peak_memory(step)
+                if peak_memory is not None:
+                    memory[step] = peak_memory
+        return memory
+
+    def _record_history(
+        self, results: Dict[str, Tuple[Optional[Exception], timedelta]]
+    ) -> None:
+        for name, (exception, time_spent) in results.items():
+            if isinstance(self._steps[name], StepGroupHandler):
+                continue
+
+            if exception is None:
+                if self._steps[name].up_to_date:
+                    outcome = "up-to-date"
+                else:
+                    outcome = "success"
+            elif isinstance(exception, futures.CancelledError):
+                # The step never ran, there is nothing to learn from it
+                continue
+            elif isinstance(exception, UnavailableInterpreterException):
+                outcome = "skipped"
+            else:
+                outcome = "failure"
+
+            handler = self._steps[name]
+            assert isinstance(handler, StepHandler)
+            self._history.record(
+                name,
+                outcome,
+                time_spent,
+                handler.phase_timings,
+                handler.peak_memory,
+            )
+
+        try:
+            self._history.save()
+        except OSError as exc:
+            LOGGER.warning("Unable to save the step history: %s", exc)
+
+    def _format_usual_duration(self, name: str, time_spent: timedelta) -> str:
+        usual_duration = self._history.get_duration(name)
+        if usual_duration is None:
+            return ""
+
+        slowest, fastest = sorted([time_spent, usual_duration], reverse=True)
+        if (
+            slowest - fastest < SIGNIFICANT_DEVIATION
+            or slowest < fastest * DEVIATION_FACTOR
+        ):
+            return f" (median: {usual_duration})"
+
+        factor = f"{slowest / fastest:.1f}x " if fastest else ""
+        direction = "slower" if time_spent > usual_duration else "faster"
+        return (
+            f" {Fore.YELLOW}(median: {usual_duration},"
+            f" {factor}{direction} than usual)"
+        )
 
     def get_step(self, step_name: str) -> BaseStepHandler:
         return self._steps[step_name]
@@ -310,29 +833,15 @@ class Pipeline:
         except_steps: Optional[List[str]] = None,
         show_dependencies: bool = False,
     ) -> None:
-        all_steps = self._resolve_execution_order(list(self._steps.keys()))
-        selected_steps = self._resolve_execution_order(
-            steps, only_steps, except_steps
+        list_steps(
+            self._graph,
+            steps,
+            only_steps,
+            except_steps,
+            show_dependencies,
+            self.config.colors,
         )
 
-        LOGGER.info("Available steps (* means selected, - means skipped):")
-        for step in sorted(all_steps):
-            dep_info = ""
-            if show_dependencies and self._steps[step].requires:
-                dep_info = " --> " + ", ".join(
-                    reversed(
-                        [
-                            s
-                            for s in all_steps
-                            if s in self._steps[step].requires
-                        ]
-                    )
-                )
-            if step in selected_steps:
-                LOGGER.info("\t* %s%s", step, dep_info)
-            else:
-                LOGGER.info("\t%s- %s%s", Fore.LIGHTBLACK_EX, step, dep_info)
-
     def _log_summary(
         self,
         graph: Dict[str, List[str]],
@@ -349,9 +858,17 @@ class Pipeline:
         for name in sorter.static_order():
             if name in results:
                 result, time_spent = results[name]
-                if result is None:
+                if result is None and self._steps[name].up_to_date:
                     LOGGER.info(
-                        "\t%s[%s] %s: success", Fore.GREEN, time_spent, name
+                        "\t%s[%s] %s: up to date", Fore.GREEN, time_spent, name
+                    )
+                elif result is None:
+                    LOGGER.info(
+                        "\t%s[%s] %s: success%s",
+                        Fore.GREEN,
+                        time_spent,
+                        name,
+                        self._format_usual_duration(name, time_spent),
                     )
                 elif (
                     isinstance(result, UnavailableInterpreterException)
@@ -414,7 +931,8 @@ class Pipeline:
         self,
         pipeline_context: Context,
         name: str,
-        pipe_plexer: Optional[PipePlexer],
+        pipe_plexer: Optional[OutputCapture],
+        scope: Optional["CommandScope"] = None,
     ) -> timedelta:
         # We need to make sure that we run in a sub-context of the pipeline.
         # Running via `futures.ThreadPoolExecutor` however does not forward the
@@ -423,7 +941,7 @@ class Pipeline:
         def execute() -> timedelta:
             # Ensure we run in a clean sub-context
             context = copy_context()
-            return context.run(self._run_step, name, pipe_plexer)
+            return context.run(self._run_step, name, pipe_plexer, scope)
 
         # Forcefully run in the pipeline context
         return pipeline_context.run(execute)
@@ -431,8 +949,11 @@ class Pipeline:
     def _run_step(
         self,
         name: str,
-        pipe_plexer: Optional[PipePlexer],
+        pipe_plexer: Optional[OutputCapture],
+        scope: Optional["CommandScope"] = None,
     ) -> timedelta:
+        if scope is not None:
+            set_command_scope(scope)
         if pipe_plexer is not None:
             set_context_handler(pipe_plexer.stderr)
             set_subprocess_default_pipes(
@@ -443,6 +964,7 @@ class Pipeline:
             "%s--- Step: %s ---%s", Style.BRIGHT, name, Style.RESET_ALL
         )
         start_time = time.monotonic()
+        peak_memory = track_peak_memory()
 
         try:
             self._steps[name].execute()
@@ -451,6 +973,11 @@ class Pipeline:
             raise ExceptionWithTimeSpentException(
                 exc, get_timedelta_since(start_time)
             ) from exc
+        except futures.CancelledError as exc:
+            LOGGER.warning("Step %s was cancelled", name)
+            raise ExceptionWithTimeSpentException(
+                exc, get_timedelta_since(start_time)
+            ) from exc
         except Exception as exc:
             # FIXME: allow another exception that can be thrown programatically
             exc_info = exc if not isinstance(exc, CalledProcessError) else None
@@ -463,6 +990,10 @@ class Pipeline:
             raise ExceptionWithTimeSpentException(
                 exc, get_timedelta_since(start_time)
             ) from exc
+        finally:
+            handler = self._steps[name]
+            if isinstance(handler, StepHandler):
+                handler.peak_memory = peak_memory.value
 
         LOGGER.info("%sStep %s finished successfully", Fore.GREEN, name)
         return get_timedelta_since(start_time)
@@ -1,54 +1,405 @@
+import fcntl
+import functools
+import json
 import logging
+import os
+import shlex
 import shutil
 import subprocess
-from contextlib import suppress
-from typing import Dict, List, Optional
+import threading
+from collections import defaultdict
+from contextlib import contextmanager, suppress
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+from ._clone import clone_tree, replace_in_file
 from ._config import Config
 from ._exceptions import (
     CommandNotFoundException,
     CommandNotInEnvironment,
     UnavailableInterpreterException,
 )
+from ._fingerprint import hash_file, hash_value
+from ._pip import get_shared_pip, link_shared_pip
 from ._subproc import run
 
 LOGGER = logging.getLogger(__name__)
 
+# File in each virtual environment keeping track of what it contains
+_METADATA_FILE = "wast-environment.json"
+# File marking a template environment as complete
+_TEMPLATE_MARKER = "wast-template"
+
+# Ensure a single step builds each template in parallel runs
+_TEMPLATE_LOCKS: Dict[Path, threading.Lock] = defaultdict(threading.Lock)
+_TEMPLATE_LOCKS_LOCK = threading.Lock()
+
+
+@contextmanager
+def _lock_template(template: Path) -> Iterator[None]:
+    # Other wast processes sharing the cache can build or clone the same
+    # template, they are kept out with a lock file next to it. The file lock
+    # is held by the process, so its threads are kept out with a thread lock.
+    with _TEMPLATE_LOCKS_LOCK:
+        lock = _TEMPLATE_LOCKS[template]
+
+    with lock:
+        template.parent.mkdir(parents=True, exist_ok=True)
+        with template.with_name(f".{template.name}.lock").open("w") as fp:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_interpreter_version(path: str, mtime_ns: int) -> str:
+    # pylint: disable=unused-argument
+    # The mtime is part of the arguments to invalidate the cache in long
+    # running processes if the interpreter gets updated.
+    return subprocess.run(
+        [path, "-c", "import sys; print(sys.version)"],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.strip()
+
+
+def _iter_requirement_files(
+    packages: Tuple[str, ...], base: Path
+) -> Iterator[Path]:
+    """
+    Find all requirements and constraints files referenced by pip arguments.
+
+    This recurses into the files themselves, as they can reference other files.
+    """
+    arguments = iter(packages)
+
+    for argument in arguments:
+        for flag in ["-r", "--requirement", "-c", "--constraint"]:
+            if argument == flag:
+                path = next(arguments, None)
+            elif argument.startswith(f"{flag}="):
+                path = argument[len(flag) + 1 :]
+            elif len(flag) == 2 and argument.startswith(flag):
+                path = argument[len(flag) :]
+            else:
+                continue
+
+            if path is None:
+                break
+
+            requirement_file = base / path.strip()
+            yield requirement_file
+
+            with suppress(OSError):
+                lines = requirement_file.read_text().splitlines()
+                yield from _iter_requirement_files(
+                    tuple(
+                        part
+                        for line in lines
+                        if not line.lstrip().startswith("#")
+                        for part in shlex.split(line, comments=True)
+                    ),
+                    requirement_file.parent,
+                )
+            break
+
+
+def get_requirements_fingerprint(packages: Tuple[str, ...]) -> Optional[str]:
+    """
+    Compute a fingerprint of the packages passed to ``pip install``.
+
+    This takes into account the content of requirements and constraints files,
+    and of local files like wheels.
+
+    :param packages: the arguments passed to ``pip install``
+    :return: the fingerprint, or :python:`None` if it can't be computed, which
+             happens when installing local directories, as we can't tell
+             cheaply whether they changed.
+    """
+    files: Dict[str, Optional[str]] = {}
+
+    for package in packages:
+        if Path(package).is_dir():
+            LOGGER.debug(
+                "%s is a local directory, installation can't be skipped",
+                package,
+            )
+            return None
+        if Path(package).is_file():
+            files[package] = hash_file(package)
+
+    for requirement_file in _iter_requirement_files(packages, Path()):
+        try:
+            files[str(requirement_file)] = hash_file(str(requirement_file))
+        except OSError:
+            files[str(requirement_file)] = None
+
+    return hash_value({"packages": packages, "files": files})
+
 
 class VenvRunner:
     def __init__(
-        self, name: str, python: str, config: Config, environ: Dict[str, str]
+        self,
+        name: str,
+        python: str,
+        config: Config,
+        environ: Dict[str, str],
+        path: Optional[Path] = None,
     ) -> None:
+        if path is None:
+            path = config.venvs_path / name.replace(":", "-")
+
         self._original_python = python
-        self._path = (config.venvs_path / name.replace(":", "-")).resolve()
+        self._path = path.resolve()
         self._python = str(self._path / "bin/python")
         self._config = config
         self._environ = environ
+        # Whether the creation of the environment was delayed until we know
+        # whether it can be cloned from a template
+        self._creation_pending = False
+        # The packages installed with a key, to be able to tell whether they
+        # changed since
+        self._installs: Dict[str, Tuple[str, ...]] = {}
+
+    @property
+    def path(self) -> Path:
+        return self._path
 
     def clean(self) -> None:
         with suppress(FileNotFoundError):
             shutil.rmtree(self._path)
 
     def prepare(self) -> None:
-        if shutil.which(self._original_python) is None:
-            raise UnavailableInterpreterException(self._original_python)
+        interpreter = self.get_interpreter()
 
         if self._path.exists():
-            LOGGER.debug("venv already exists. Reusing")
+            metadata = self._load_metadata()
+            if metadata.get("interpreter") == interpreter:
+                LOGGER.debug("venv already exists. Reusing")
+                return
+
+            LOGGER.info(
+                "The interpreter for %s changed or its creation was"
+                " interrupted. Recreating it",
+                self._path,
+            )
+            self.clean()
+
+        if self._config.venv_templates:
+            self._creation_pending = True
             return
 
-        run(
-            [self._original_python, "-m", "venv", str(self._path)],
-            env=self._config.environ,
-            silent_on_success=self._config.verbosity < 2,
+        self._create(interpreter)
+
+    def is_outdated(self) -> bool:
+        """
+        Check whether the environment changed since it was prepared.
+
+        This looks at the interpreter and at the fingerprints of the packages
+        installed with a key, and is thus cheap enough to do before each run.
+        """
+        if self._creation_pending:
+            return False
+
+        metadata = self._load_metadata()
+        if metadata.get("interpreter") != self.get_interpreter():
+            return True
+
+        installs = metadata.get("installs", {})
+        for key, packages in self._installs.items():
+            fingerprint = self._get_install_fingerprint(packages)
+            if fingerprint is not None and installs.get(key) != fingerprint:
+                return True
+        return False
+
+    def _create(self, interpreter: Dict[str, Any]) -> None:
+        pip_path = None
+        if self._config.fast_venvs:
+            pip_path = get_shared_pip(
+                interpreter["path"], self._config.cache_path / "pip"
+            )
+            if pip_path is None:
+                LOGGER.debug(
+                    "%s does not bundle pip, creating a full environment",
+                    self._original_python,
+                )
+
+        if pip_path is None:
+            run(
+                [self._original_python, "-m", "venv", str(self._path)],
+                env=self._config.environ,
+                silent_on_success=self._config.verbosity < 2,
+            )
+        else:
+            run(
+                [
+                    self._original_python,
+                    "-m",
+                    "venv",
+                    "--without-pip",
+                    str(self._path),
+                ],
+                env=self._config.environ,
+                silent_on_success=self._config.verbosity < 2,
+            )
+            link_shared_pip(self._path, pip_path)
+
+        self._save_metadata({"interpreter": interpreter, "installs": {}})
+
+    def _ensure_created(self) -> None:
+        if self._creation_pending:
+            self._creation_pending = False
+            self._create(self.get_interpreter())
+
+    def get_interpreter(self) -> Dict[str, Any]:
+        """
+        Get information identifying the interpreter used for the environment.
+
+        :return: the path, version and modification time of the interpreter.
+        :raise UnavailableInterpreterException: if the interpreter is not found
+        """
+        path = shutil.which(self._original_python)
+        if path is None:
+            raise UnavailableInterpreterException(self._original_python)
+
+        path = os.path.realpath(path)
+        mtime_ns = os.stat(path).st_mtime_ns
+        return {
+            "path": path,
+            "version": _get_interpreter_version(path, mtime_ns),
+            "mtime_ns": mtime_ns,
+        }
+
+    def get_installed_packages(self) -> List[str]:
+        """
+        Get the list of distributions installed in the environment.
+
+        This only looks at the metadata directories, which contain both the
+        name and version of each distribution, and is thus fast.
+        """
+        return sorted(
+            path.name
+            for pattern in ["*.dist-info", "*.egg-info", "*.egg-link"]
+            for path in self._path.glob(f"lib/*/site-packages/{pattern}")
         )
 
-    def install(self, *packages: str) -> None:
+    def install(self, *packages: str, key: Optional[str] = None) -> None:
+        """
+        Install the given packages in the environment.
+
+        :param packages: the arguments to pass to ``pip install``
+        :param key: an identifier for this specific installation in the
+                    environment. If passed, the installation will be skipped
+                    if the same packages were already installed for this key,
+                    and no requirement file changed.
+        """
+        fingerprint = None
+        if key is not None:
+            self._installs[key] = packages
+            fingerprint = self._get_install_fingerprint(packages)
+
+        if fingerprint is not None:
+            if self._creation_pending:
+                self._creation_pending = False
+                self._clone_from_template(fingerprint, packages)
+                metadata = self._load_metadata()
+                metadata["installs"] = {key: fingerprint}
+                self._save_metadata(metadata)
+                return
+
+            metadata = self._load_metadata()
+            if metadata.get("installs", {}).get(key) == fingerprint:
+                LOGGER.debug("Requirements already installed, skipping")
+                return
+
         self.run(
             [self._python, "-m", "pip", "install", *packages],
             silent_on_success=self._config.verbosity < 2,
         )
 
+        if fingerprint is not None:
+            metadata = self._load_metadata()
+            metadata.setdefault("installs", {})[key] = fingerprint
+            self._save_metadata(metadata)
+
+    def _get_install_fingerprint(
+        self, packages: Tuple[str, ...]
+    ) -> Optional[str]:
+        requirements = get_requirements_fingerprint(packages)
+        if requirements is None:
+            return None
+
+        return hash_value(
+            {
+                "interpreter": self.get_interpreter(),
+                "requirements": requirements,
+                # Those can change where packages are fetched from
+                "pip_environment": {
+                    key: value
+                    for key, value in self._merge_env(self._config).items()
+                    if key.startswith("PIP_")
+                },
+            }
+        )
+
+    def _clone_from_template(
+        self, fingerprint: str, packages: Tuple[str, ...]
+    ) -> None:
+        template = self._config.venv_templates_path / fingerprint[:32]
+
+        with _lock_template(template):
+            if not template.joinpath(_TEMPLATE_MARKER).exists():
+                LOGGER.info(
+                    "Creating template environment for %s", " ".join(packages)
+                )
+                runner = VenvRunner(
+                    template.name,
+                    self._original_python,
+                    self._config,
+                    self._environ,
+                    path=template,
+                )
+                runner.clean()
+                runner.prepare()
+                runner.install(*packages)
+                template.joinpath(_TEMPLATE_MARKER).touch()
+
+            LOGGER.debug("Cloning environment from template %s", template)
+            self.clean()
+            method = clone_tree(template, self._path)
+            LOGGER.debug("Cloned %s using %s", self._path, method)
+
+        # Scripts, activation files and the configuration contain the
+        # absolute path to the environment
+        self._path.joinpath(_TEMPLATE_MARKER).unlink()
+        replace_in_file(
+            self._path / "pyvenv.cfg", str(template), str(self._path)
+        )
+        for path in self._path.joinpath("bin").iterdir():
+            if path.is_file() and not path.is_symlink():
+                replace_in_file(path, str(template), str(self._path))
+
+    def _load_metadata(self) -> Dict[str, Any]:
+        try:
+            with self._path.joinpath(_METADATA_FILE).open() as fp:
+                metadata = json.load(fp)
+        except (OSError, ValueError):
+            return {}
+
+        if not isinstance(metadata, dict):
+            return {}
+        return metadata
+
+    def _save_metadata(self, metadata: Dict[str, Any]) -> None:
+        path = self._path.joinpath(_METADATA_FILE)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with tmp_path.open("w") as fp:
+            json.dump(metadata, fp)
+        os.replace(tmp_path, path)
+
     def run(
         self,
         command: List[str],
@@ -56,6 +407,7 @@ class VenvRunner:
         external_command: bool = False,
         silent_on_success: bool = False,
     ) -> subprocess.CompletedProcess[None]:
+        self._ensure_created()
         env = self._merge_env(self._config, env)
         self._validate_command(command[0], external_command, env)
 
@@ -0,0 +1,224 @@
+import graphlib
+import heapq
+import logging
+from datetime import timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+_MIB = 1024 * 1024
+
+
+def compute_priorities(
+    graph: Dict[str, List[str]], estimates: Dict[str, timedelta]
+) -> Dict[str, timedelta]:
+    """
+    Compute the length of the longest chain of work starting at each step.
+
+    The chain for a step is the step itself, followed by the slowest chain
+    of the steps that depend on it. Starting the steps with the longest
+    chains first keeps the critical path of the pipeline busy.
+
+    :param graph: A mapping of each step to the steps it requires.
+    :param estimates: The expected duration of each step.
+    :return: A mapping of each step to its remaining chain duration.
+    """
+    dependents: Dict[str, List[str]] = {step: [] for step in graph}
+    for step, requirements in graph.items():
+        for requirement in requirements:
+            dependents.setdefault(requirement, []).append(step)
+
+    priorities: Dict[str, timedelta] = {}
+    # Dependents always come after their requirements in a topological order,
+    # so walking it backwards ensures we always have them computed already.
+    for step in reversed(
+        list(graphlib.TopologicalSorter(graph).static_order())
+    ):
+        priorities[step] = estimates[step] + max(
+            (priorities[dependent] for dependent in dependents[step]),
+            default=timedelta(),
+        )
+
+    return priorities
+
+
+# pylint: disable-next=too-many-instance-attributes
+class Scheduler:
+    """
+    Decide which of the steps that are ready to run should be started next.
+
+    Ready steps are started by order of the longest chain of work that remains
+    after them, so that the slowest dependency chains start as early as
+    possible.
+
+    When given a number of cores, steps are also only started while some of
+    them are free, and each is granted as many as it asked for, within the
+    ones that are free, until it is released.
+
+    When given a memory budget, steps are also only started if the memory
+    they are expected to need fits in what the running steps did not reserve
+    yet. Smaller steps can then start before more critical ones that don't
+    fit. A step always starts if nothing else is running, to never get stuck.
+
+    When given resources, steps are also only started if none of the running
+    steps holds one of their resources in a conflicting way: a resource can
+    be held by a single step with an exclusive access, or by any number of
+    steps with a shared access. Steps not conflicting can start before more
+    critical ones that do, but not take a resource a more critical step is
+    waiting on, so that exclusive access is not delayed forever.
+
+    :param graph: A mapping of each step to the steps it requires.
+    :param estimates: The expected duration of each step.
+    :param cores: How many cores each step can use, 0 meaning as many as
+                  are free. Steps not in there use a single one.
+    :param n_cores: How many cores to share between the running steps. If
+                    :python:`None`, cores are not accounted for.
+    :param memory: How much memory each step is expected to need, in bytes.
+                   Steps not in there are not accounted for.
+    :param memory_budget: How much memory the running steps can use, in
+                          bytes. If :python:`None`, memory is not accounted
+                          for.
+    :param resources: The resources each step needs, mapped to whether it
+                      needs an ``exclusive`` or ``shared`` access to them.
+    """
+
+    def __init__(
+        self,
+        graph: Dict[str, List[str]],
+        estimates: Dict[str, timedelta],
+        cores: Optional[Dict[str, int]] = None,
+        n_cores: Optional[int] = None,
+        *,
+        memory: Optional[Dict[str, int]] = None,
+        memory_budget: Optional[int] = None,
+        resources: Optional[Dict[str, Dict[str, str]]] = None,
+    ) -> None:
+        # pylint: disable=too-many-arguments
+        self.priorities = compute_priorities(graph, estimates)
+        self._cores = cores or {}
+        self._free_cores = n_cores
+        self._granted: Dict[str, int] = {}
+        self._memory = memory or {}
+        self._free_memory = memory_budget
+        self._resources = resources or {}
+        # The running steps holding each resource, and with which access
+        self._holders: Dict[str, Dict[str, str]] = {}
+
+        self._sorter = graphlib.TopologicalSorter(graph)
+        self._sorter.prepare()
+        # Used to break ties in a deterministic way
+        self._order = {step: index for index, step in enumerate(graph)}
+        self._ready: List[Tuple[float, int, str]] = []
+
+    def is_active(self) -> bool:
+        return self._sorter.is_active()
+
+    def pop_ready(self, max_steps: int) -> List[str]:
+        for step in self._sorter.get_ready():
+            heapq.heappush(
+                self._ready,
+                (
+                    -self.priorities[step].total_seconds(),
+                    self._order[step],
+                    step,
+                ),
+            )
+
+        steps: List[str] = []
+        deferred: List[Tuple[float, int, str]] = []
+        # Resources that more critical steps are waiting on
+        awaited: Set[str] = set()
+        while self._ready and len(steps) < max_steps:
+            if self._free_cores is not None and self._free_cores < 1:
+                break
+
+            entry = heapq.heappop(self._ready)
+            step = entry[2]
+            conflicts = self._get_conflicts(step, awaited)
+            if conflicts:
+                awaited.update(conflicts)
+                deferred.append(entry)
+                continue
+            if not self._fits_in_memory(step):
+                deferred.append(entry)
+                continue
+
+            for resource, access in self._resources.get(step, {}).items():
+                self._holders.setdefault(resource, {})[step] = access
+
+            if self._free_memory is not None:
+                self._free_memory -= self._memory.get(step, 0)
+
+            wanted = self._cores.get(step, 1)
+            if self._free_cores is None:
+                granted = max(wanted, 1)
+            else:
+                granted = min(wanted or self._free_cores, self._free_cores)
+                self._free_cores -= granted
+
+            self._granted[step] = granted
+            steps.append(step)
+
+        for entry in deferred:
+            heapq.heappush(self._ready, entry)
+        return steps
+
+    def _get_conflicts(self, step: str, awaited: Set[str]) -> List[str]:
+        conflicts = []
+        for resource, access in self._resources.get(step, {}).items():
+            holders = self._holders.get(resource, {})
+            if resource in awaited or (
+                holders
+                and (access == "exclusive" or "exclusive" in holders.values())
+            ):
+                LOGGER.debug(
+                    "Not starting %s yet, it needs %s access to %s, which"
+                    " is held by or reserved for other steps",
+                    step,
+                    access,
+                    resource,
+                )
+                conflicts.append(resource)
+        return conflicts
+
+    def _fits_in_memory(self, step: str) -> bool:
+        needed = self._memory.get(step, 0)
+        if (
+            self._free_memory is None
+            or not self._granted
+            or needed <= self._free_memory
+        ):
+            return True
+
+        LOGGER.debug(
+            "Not starting %s yet, it needs %d MiB of memory and only %d MiB"
+            " are left",
+            step,
+            needed // _MIB,
+            self._free_memory // _MIB,
+        )
+        return False
+
+    def get_granted_cores(self, step: str) -> int:
+        return self._granted[step]
+
+    def release(self, step: str) -> None:
+        """
+        Give back the cores, memory and resources of a step that was started,
+        once it finished.
+        """
+        granted = self._granted.pop(step)
+        if self._free_cores is not None:
+            self._free_cores += granted
+        if self._free_memory is not None:
+            self._free_memory += self._memory.get(step, 0)
+        for resource in self._resources.get(step, {}):
+            del self._holders[resource][step]
+            if not self._holders[resource]:
+                del self._holders[resource]
+
+    def pending(self) -> List[str]:
+        return [step for _, _, step in sorted(self._ready)]
+
+    def done(self, step: str) -> None:
+        self._sorter.done(step)
@@ -0,0 +1,352 @@
+import io
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+from argparse import Namespace
+from contextlib import redirect_stderr, redirect_stdout, suppress
+from contextvars import copy_context
+from typing import Any, Dict, Optional, Set, Tuple
+
+from . import _pipeline
+from .__main__ import (
+    _create_config,
+    _load_pipeline,
+    _log_exception,
+    _parse_args,
+    _run_pipeline,
+)
+from ._client import EXIT, FALLBACK, HEADER, STDERR, STDOUT, get_socket_path
+from ._config import Config
+from ._exceptions import BaseWastException
+from ._logging import set_context_handler, setup_logging
+from ._step_index import get_module_files
+from ._subproc import set_subprocess_default_pipes
+
+LOGGER = logging.getLogger(__name__)
+
+# Arguments only affecting a single invocation. Invocations differing in any
+# other argument configure the pipeline differently, and need their own.
+_INVOCATION_ARGUMENTS = {
+    "clean",
+    "except_steps",
+    "list_dependencies",
+    "list_only",
+    "only_steps",
+    "server",
+    "steps",
+    "watch",
+}
+
+
+class _Connection:
+    def __init__(self, connection: socket.socket) -> None:
+        self._connection = connection
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def send(self, kind: int, value: int, data: bytes = b"") -> None:
+        with self._lock:
+            if self._closed:
+                return
+
+            try:
+                self._connection.sendall(HEADER.pack(kind, value) + data)
+            except OSError as exc:
+                # The client went away, e.g. it was interrupted. Let the
+                # invocation finish anyways, as stopping it midway would leave
+                # things in an inconsistent state.
+                LOGGER.debug("Unable to send output to the client: %s", exc)
+                self._closed = True
+
+
+class _ClientStream:
+    def __init__(self, connection: _Connection, kind: int) -> None:
+        self._connection = connection
+        self._kind = kind
+
+    def write(self, data: str) -> int:
+        if data:
+            encoded = data.encode(errors="replace")
+            self._connection.send(self._kind, len(encoded), encoded)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+
+class _ClientStdin(io.StringIO):
+    # The input of the client is not forwarded, but whether it is a tty
+    # decides whether to use colors by default
+    def __init__(self, isatty: bool) -> None:
+        super().__init__()
+        self._isatty = isatty
+
+    def isatty(self) -> bool:
+        return self._isatty
+
+
+def _get_mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _parse_request(line: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return None
+
+    if not (
+        isinstance(request, dict)
+        and isinstance(request.get("args"), list)
+        and isinstance(request.get("cwd"), str)
+        and isinstance(request.get("environ"), dict)
+        and isinstance(request.get("isatty"), bool)
+    ):
+        return None
+    return request
+
+
+def _get_environ(pipeline: _pipeline.Pipeline) -> Dict[str, Optional[str]]:
+    # The configuration and the steps capture the environment when they are
+    # created, e.g. for variables passed through to the steps. Other variables
+    # can differ between invocations without affecting the pipeline.
+    return {
+        name: os.environ.get(name)
+        for name in pipeline.get_environment_variables()
+    }
+
+
+def _get_exit_code(exc: SystemExit) -> int:
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+    print(exc.code, file=sys.stderr)
+    return 1
+
+
+class _Server:
+    def __init__(self, config: Config) -> None:
+        self._config = config
+        # Only the pipeline of the last invocation is kept, with the arguments
+        # it was created for and the environment it captured
+        self._pipeline: Optional[_pipeline.Pipeline] = None
+        self._key: Tuple[Any, ...] = ()
+        self._environ: Dict[str, Optional[str]] = {}
+        # The files the pipelines were loaded from, with their modification
+        # time, and the modules they defined in the project
+        self._definition_files: Dict[str, Optional[int]] = {}
+        self._definition_modules: Set[str] = set()
+
+    def handle(self, connection: socket.socket) -> None:
+        with connection.makefile("rb") as stream:
+            line = stream.readline()
+
+        request = _parse_request(line)
+        if request is None:
+            LOGGER.debug("Received an invalid request: %r", line)
+            return
+
+        client = _Connection(connection)
+        # Steps rely on running from the project's directory
+        if request["cwd"] != os.getcwd():
+            client.send(FALLBACK, 0)
+            return
+
+        try:
+            exit_code = copy_context().run(self._serve, request, client)
+        finally:
+            # Log the messages of the server itself to its own output again
+            setup_logging(
+                logging.INFO - 10 * self._config.verbosity,
+                self._config.colors,
+            )
+
+        if exit_code is None:
+            client.send(FALLBACK, 0)
+        else:
+            client.send(EXIT, exit_code)
+
+    def _serve(
+        self, request: Dict[str, Any], client: _Connection
+    ) -> Optional[int]:
+        stdout = _ClientStream(client, STDOUT)
+        stderr = _ClientStream(client, STDERR)
+        set_context_handler(stderr)
+        set_subprocess_default_pipes(stdout, stderr)
+
+        stdin = sys.stdin
+        sys.stdin = _ClientStdin(request["isatty"])
+        # Invocations are served one at a time, they can thus use the
+        # environment of their client for as long as they run
+        environ = dict(os.environ)
+        os.environ.clear()
+        os.environ.update(request["environ"])
+
+        try:
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                return self._run(request["args"])
+        except SystemExit as exc:
+            return _get_exit_code(exc)
+        except Exception:  # pylint: disable=broad-except
+            LOGGER.exception("Unexpected error while running wast")
+            return 1
+        finally:
+            sys.stdin = stdin
+            os.environ.clear()
+            os.environ.update(environ)
+
+    def _run(self, argv: Any) -> Optional[int]:
+        args = _parse_args(argv)
+        if args.server or args.watch:
+            return None
+
+        try:
+            self._reload_if_changed()
+
+            key = self._get_key(args)
+            pipeline = self._pipeline
+            if (
+                pipeline is None
+                or key != self._key
+                or self._environ != _get_environ(pipeline)
+            ):
+                pipeline = None
+                config = _create_config(args)
+            else:
+                config = pipeline.config
+            setup_logging(logging.INFO - 10 * config.verbosity, config.colors)
+
+            if pipeline is None:
+                self._pipeline = None
+                pipeline = self._load(config, args.config)
+                self._environ = _get_environ(pipeline)
+                self._key = key
+                self._pipeline = pipeline
+
+            _run_pipeline(
+                pipeline,
+                args.steps,
+                args.only_steps,
+                args.except_steps,
+                args.clean,
+                args.list_only,
+                args.list_dependencies,
+                False,
+            )
+        except BaseWastException as exc:
+            _log_exception(exc, args.verbose - args.quiet)
+            return exc.exit_code
+
+        return 0
+
+    def _get_key(self, args: Namespace) -> Tuple[Any, ...]:
+        return (
+            sys.stdin.isatty(),
+            *sorted(
+                (name, value)
+                for name, value in vars(args).items()
+                if name not in _INVOCATION_ARGUMENTS
+            ),
+        )
+
+    def _load(self, config: Config, config_file: str) -> _pipeline.Pipeline:
+        pipeline = _load_pipeline(config, config_file)
+
+        files = get_module_files(pipeline.definition_modules)
+        for path in [os.path.abspath(config_file), *files]:
+            self._definition_files.setdefault(path, _get_mtime(path))
+
+        # Only forget about the modules of the project when reloading, other
+        # ones like the standard library don't change
+        project = os.path.join(os.getcwd(), "")
+        self._definition_modules.update(
+            name
+            for name in pipeline.definition_modules
+            if os.path.abspath(
+                getattr(sys.modules.get(name), "__file__", None) or "/"
+            ).startswith(project)
+        )
+        return pipeline
+
+    def _reload_if_changed(self) -> None:
+        if all(
+            _get_mtime(path) == mtime
+            for path, mtime in self._definition_files.items()
+        ):
+            return
+
+        LOGGER.info("The pipeline definition changed, reloading it")
+        for name in self._definition_modules:
+            sys.modules.pop(name, None)
+        self._pipeline = None
+        self._definition_files.clear()
+        self._definition_modules.clear()
+
+
+def serve(config: Config) -> None:
+    """
+    Serve the invocations of wast made from the current directory, until
+    interrupted.
+
+    The pipeline definition is loaded once, and reloaded only when it
+    changes, and the environments of steps are only set up again when what
+    they installed changed. Clients send their arguments and environment over
+    a unix socket in the cache directory, and the output and exit code of the
+    invocation are streamed back to them. Invocations are served one at a
+    time.
+
+    :param config: the configuration of the server itself
+    """
+    socket_path = get_socket_path(str(config.cache_path))
+    config.cache_path.mkdir(parents=True, exist_ok=True)
+
+    if os.path.exists(socket_path):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(socket_path)
+            except OSError:
+                LOGGER.debug("Removing stale socket at %s", socket_path)
+                os.unlink(socket_path)
+            else:
+                raise BaseWastException(
+                    f"A wast server is already running at {socket_path}"
+                )
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        # Clients get their invocations run as the user of the server, only
+        # let that same user connect
+        umask = os.umask(0o077)
+        try:
+            listener.bind(socket_path)
+        except OSError as exc:
+            raise BaseWastException(
+                f"Unable to listen on {socket_path}: {exc}"
+            ) from exc
+        finally:
+            os.umask(umask)
+
+        try:
+            listener.listen()
+            LOGGER.info("Listening on %s", socket_path)
+            server = _Server(config)
+
+            while True:
+                connection, _ = listener.accept()
+                with connection:
+                    try:
+                        server.handle(connection)
+                    except Exception:  # pylint: disable=broad-except
+                        # A single client must not bring the server down
+                        LOGGER.exception("Unable to serve a client")
+        except KeyboardInterrupt:
+            LOGGER.info("Stopping the server")
+        finally:
+            with suppress(FileNotFoundError):
+                os.unlink(socket_path)
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from ._fingerprint import get_file_info
+
+LOGGER = logging.getLogger(__name__)
+
+# Bump this whenever the format of the index changes, to invalidate the
+# existing ones.
+_INDEX_VERSION = 1
+# Name of the file next to the index listing the names of all steps, one per
+# line, for shell completion to use without running wast
+STEP_NAMES_FILE_NAME = "step-names.txt"
+
+
+class IndexedStep(NamedTuple):
+    """
+    What is needed to know about a step to plan a run, or list steps.
+    """
+
+    requires: List[str]
+    run_by_default: bool
+    # Only set for steps that are not step groups
+    python: Optional[str] = None
+    parameters_id: Optional[str] = None
+
+
+def get_module_files(modules: Iterable[str]) -> List[str]:
+    """
+    Get the source files of the given modules, for those that have one.
+    """
+    files = set()
+    for name in modules:
+        path = getattr(sys.modules.get(name), "__file__", None)
+        if path is not None and os.path.isfile(path):
+            files.add(os.path.abspath(path))
+    return sorted(files)
+
+
+class StepIndex:
+    """
+    A cache of the steps resolved from a pipeline definition.
+
+    It is keyed on the content of the pipeline definition and of all the
+    modules it imported, as well as on the interpreter running wast, which
+    allows listing the steps without executing the pipeline definition.
+    Checking whether it is up to date only needs to hash the files whose size
+    or modification time changed.
+
+    The names of the steps are also written to a plain text file next to it,
+    for shell completion to use.
+
+    .. note::
+
+        Pipeline definitions that behave differently depending on anything
+        else, like environment variables, are not detected.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._names_path = path.with_name(STEP_NAMES_FILE_NAME)
+        self._index = self._load()
+
+    def get_steps(
+        self, definition_path: str
+    ) -> Optional[Dict[str, IndexedStep]]:
+        """
+        Get the steps defined by the given pipeline definition.
+
+        :return: the steps, or :python:`None` if the index is not up to date.
+        """
+        if self._index is None:
+            return None
+
+        try:
+            if self._index["key"] != self._get_key(definition_path):
+                return None
+
+            for path, info in self._index["files"].items():
+                current = get_file_info(path, info)
+                if current is None or current["sha256"] != info["sha256"]:
+                    LOGGER.debug("Step index outdated: %s changed", path)
+                    return None
+
+            return {
+                name: IndexedStep(**step)
+                for name, step in self._index["steps"].items()
+            }
+        except (AttributeError, KeyError, TypeError) as exc:
+            LOGGER.debug("Ignoring invalid step index: %s", exc)
+            return None
+
+    def save(
+        self,
+        definition_path: str,
+        files: List[str],
+        steps: Dict[str, IndexedStep],
+    ) -> None:
+        """
+        Save the steps defined by the given pipeline definition.
+
+        :param definition_path: the path to the pipeline definition
+        :param files: all the files the pipeline definition depends on
+        :param steps: the steps it defines
+        """
+        previous_files = {}
+        if self._index is not None:
+            previous_files = self._index["files"]
+
+        files_info = {}
+        for path in files:
+            info = get_file_info(path, previous_files.get(path))
+            if info is not None:
+                files_info[path] = info
+
+        index = {
+            "version": _INDEX_VERSION,
+            "key": self._get_key(definition_path),
+            "files": files_info,
+            "steps": {name: step._asdict() for name, step in steps.items()},
+        }
+
+        if index == self._index and self._names_path.exists():
+            return
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_name(f".{self._path.name}.tmp")
+        with tmp_path.open("w") as fp:
+            json.dump(index, fp)
+        os.replace(tmp_path, self._path)
+
+        tmp_path = self._names_path.with_name(f".{self._names_path.name}.tmp")
+        tmp_path.write_text("".join(f"{name}\n" for name in sorted(steps)))
+        os.replace(tmp_path, self._names_path)
+
+        self._index = index
+
+    def _get_key(self, definition_path: str) -> Dict[str, str]:
+        return {
+            "definition": os.path.abspath(definition_path),
+            "interpreter": sys.executable,
+            "python_version": sys.version,
+        }
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        try:
+            with self._path.open() as fp:
+                index = json.load(fp)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            LOGGER.debug("Ignoring invalid step index: %s", exc)
+            return None
+
+        if (
+            not isinstance(index, dict)
+            or index.get("version") != _INDEX_VERSION
+        ):
+            return None
+        return index
@@ -5,14 +5,37 @@ import re
 import shutil
 import subprocess
 import sys
+import time
+import uuid
 from abc import ABC, abstractmethod
-from contextlib import suppress
-from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from contextlib import contextmanager, suppress
+from datetime import timedelta
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
 
 from .._config import Config
 from .._dependency_injection import call_with_parameters
 from .._exceptions import BaseWastException
+from .._file_results import FileResults, expand_files
+from .._fingerprint import (
+    Fingerprint,
+    explain_changes,
+    hash_file,
+    hash_files,
+    hash_value,
+    load_fingerprint,
+    save_fingerprint,
+)
 from .._runners import VenvRunner
+from .._timing import get_timedelta_since
 from .steps import (
     Step,
     StepRunner,
@@ -20,6 +43,7 @@ from .steps import (
     StepWithCleanup,
     StepWithDependentSetup,
     StepWithSetup,
+    escape_step_name,
 )
 
 if TYPE_CHECKING:
@@ -28,6 +52,11 @@ if TYPE_CHECKING:
 
 LOGGER = logging.getLogger(__name__)
 
+# How many files to pass to each run of a tool in run_on_files. Files are only
+# recorded as passed when the run they were part of succeeds, a failing file
+# thus only gets the other files of its run checked again.
+_FILES_PER_RUN = 100
+
 
 class BaseStepHandler(ABC):
     def __init__(
@@ -42,6 +71,11 @@ class BaseStepHandler(ABC):
         self.run_by_default = (
             run_by_default if run_by_default is not None else True
         )
+        # Time spent in each phase ('setup', 'dependent_setup' and 'run')
+        # during the last execution
+        self.phase_timings: Dict[str, timedelta] = {}
+        # Whether the step was skipped as its inputs did not change
+        self.up_to_date = False
         self._pipeline = pipeline
 
     @abstractmethod
@@ -52,6 +86,16 @@ class BaseStepHandler(ABC):
     def execute(self) -> None:
         pass
 
+    @abstractmethod
+    def get_run_token(self) -> Optional[str]:
+        """
+        Get a token identifying the last time the step did any work.
+
+        It changes whenever the step runs successfully, in this invocation or
+        a previous one, allowing dependent steps to know whether they are up
+        to date.
+        """
+
     @abstractmethod
     def _execute_dependent_setup(
         self, current_step: "BaseStepHandler"
@@ -67,6 +111,7 @@ class BaseStepHandler(ABC):
         pass
 
 
+# pylint: disable=too-many-instance-attributes
 class StepHandler(BaseStepHandler):
     def __init__(
         self,
@@ -79,7 +124,14 @@ class StepHandler(BaseStepHandler):
         parameters: Optional[Dict[str, Any]] = None,
         passenv: Optional[List[str]] = None,
         setenv: Optional[Dict[str, str]] = None,
+        inputs: Optional[List[str]] = None,
+        run_in_process: Optional[bool] = None,
+        parameters_id: Optional[str] = None,
+        cores: Optional[int] = None,
+        memory: Optional[int] = None,
+        resources: Optional[Dict[str, str]] = None,
     ) -> None:
+        # pylint: disable=too-many-locals
         super().__init__(name, pipeline, requires, run_by_default)
 
         self.name = name
@@ -93,10 +145,34 @@ class StepHandler(BaseStepHandler):
 
         self.python = python
 
+        self.inputs = inputs
+        # The variables of the environment passed through to the step
+        self.passenv = passenv or []
+        self.run_in_process = bool(run_in_process)
+        # How many cores the step can use, 0 meaning all that are available
+        # and None that it did not declare it, and how many it got for its
+        # current run
+        self.cores = cores
+        self.jobs = 1
+        # How much memory the step is declared to need, and the most its
+        # commands used in its last run, in bytes
+        self.memory = None if memory is None else memory * 1024 * 1024
+        self.peak_memory: Optional[int] = None
+        # The resources the step needs, and whether it needs an exclusive or
+        # shared access to them
+        self.resources = self._check_resources(resources or {})
+        # The id of the parameters the step was created with, if parametrized
+        self.parameters_id = parameters_id
+
         self._func = func
-        step_environment = self._resolve_environ(passenv, setenv)
+        self._current_phase = "run"
+        self._n_installs = 0
+        self._is_set_up = False
+        # Artifacts gathered in a worker process, if the step ran in one
+        self.worker_artifacts: Optional[Dict[str, List[Any]]] = None
+        self._environment = self._resolve_environ(passenv, setenv)
         self._venv_runner = VenvRunner(
-            self.name, self.python, self.config, step_environment
+            self.name, self.python, self.config, self._environment
         )
         self._step_runner = StepRunner(self)
 
@@ -111,10 +187,23 @@ class StepHandler(BaseStepHandler):
             self.parameters = parameters
             self.parameters["step"] = self._step_runner
 
+    def _check_resources(self, resources: Dict[str, str]) -> Dict[str, str]:
+        for resource, access in resources.items():
+            if access not in ("exclusive", "shared"):
+                raise BaseWastException(
+                    f"invalid access '{access}' to resource '{resource}' for"
+                    f" step {self.name}, expected 'exclusive' or 'shared'"
+                )
+        return resources
+
     @property
     def config(self) -> Config:
         return self._pipeline.config
 
+    @property
+    def venv_path(self) -> Path:
+        return self._venv_runner.path
+
     def get_artifacts(self, key: str) -> List[Any]:
         return list(
             itertools.chain.from_iterable(
@@ -127,8 +216,27 @@ class StepHandler(BaseStepHandler):
             )
         )
 
+    @property
+    def dependencies(self) -> Optional[List[str]]:
+        """
+        Get the dependencies installed during setup, for managed steps.
+        """
+        if not isinstance(self._func, StepWithSetup):
+            return None
+        dependencies = self.parameters.get("dependencies")
+        if not isinstance(dependencies, (list, tuple)):
+            return None
+        return list(dependencies)
+
     def install(self, *packages: str) -> None:
-        self._venv_runner.install(*packages)
+        # Identify each installation by when it happens in the step, in order
+        # to skip it if the same packages were installed there previously.
+        key = f"{self._current_phase}:{self._n_installs}"
+        self._n_installs += 1
+        options = self._pipeline.wheelhouse.get_install_options(
+            self.python, packages
+        )
+        self._venv_runner.install(*options, *packages, key=key)
 
     def run(
         self,
@@ -145,34 +253,226 @@ class StepHandler(BaseStepHandler):
             silent_on_success=silent_on_success,
         )
 
+    def run_on_files(
+        self,
+        command: List[str],
+        files: Sequence[str],
+        *,
+        extensions: Sequence[str],
+        config_files: Sequence[str],
+        env: Optional[Dict[str, str]] = None,
+        external_command: bool = False,
+        silent_on_success: bool = False,
+    ) -> None:
+        expanded = expand_files(files, extensions, self.config.cache_path)
+        results = FileResults(
+            self._step_runner.cache_path / "file-results.json",
+            hash_value(
+                {
+                    "command": command,
+                    "config_files": {
+                        path: hash_file(path) if os.path.isfile(path) else None
+                        for path in config_files
+                    },
+                    "dependencies": self._venv_runner.get_installed_packages(),
+                    "environment": {**self._environment, **(env or {})},
+                    "interpreter": self._venv_runner.get_interpreter(),
+                }
+            ),
+        )
+
+        pending = results.get_pending(expanded)
+        if not pending:
+            LOGGER.info(
+                "All %d files passed previously, nothing to do", len(expanded)
+            )
+            return
+
+        LOGGER.info(
+            "Running on %d of %d files, which changed or did not pass"
+            " previously",
+            len(pending),
+            len(expanded),
+        )
+
+        failure: Optional[subprocess.CalledProcessError] = None
+        for start in range(0, len(pending), _FILES_PER_RUN):
+            batch = pending[start : start + _FILES_PER_RUN]
+            try:
+                self.run(
+                    [*command, *batch],
+                    env=env,
+                    external_command=external_command,
+                    silent_on_success=silent_on_success,
+                )
+            except subprocess.CalledProcessError as exc:
+                # Keep going, to record which of the other files pass
+                if failure is None:
+                    failure = exc
+            else:
+                results.record_passed(batch)
+
+        if failure is not None:
+            raise failure
+
     def execute(self) -> None:
+        self.phase_timings = {}
+        self.up_to_date = False
+        self._n_installs = 0
+        self.worker_artifacts = None
+
         if self.config.skip_setup:
             LOGGER.debug("Skipping setup phase")
+        elif self._is_set_up and not self._venv_runner.is_outdated():
+            # The step already ran in this process, e.g. in watch mode, and
+            # nothing it installed changed since
+            LOGGER.debug("Step %s is already set up", self.name)
         else:
-            self._venv_runner.prepare()
+            with self._timed_phase("setup"):
+                self._venv_runner.prepare()
 
-            if isinstance(self._func, StepWithSetup):
-                call_with_parameters(self._func.setup, self.parameters.copy())
+                if isinstance(self._func, StepWithSetup):
+                    call_with_parameters(
+                        self._func.setup, self.parameters.copy()
+                    )
+            self._is_set_up = True
 
         if self.config.skip_run:
             LOGGER.debug("Skipping run")
             return
 
-        for requirement in self.requires:
-            # Pylint check here is wrong, it's still an instance of our class
-            # pylint: disable=protected-access
-            self._pipeline.get_step(requirement)._execute_dependent_setup(self)
+        fingerprint = None
+        if self.inputs is not None:
+            fingerprint = self._compute_fingerprint()
+            reasons = explain_changes(
+                load_fingerprint(self._fingerprint_path), fingerprint
+            )
+            if not reasons:
+                LOGGER.info("Step %s is up to date, skipping", self.name)
+                self.up_to_date = True
+                return
+
+            LOGGER.log(
+                logging.INFO if self.config.explain else logging.DEBUG,
+                "Step %s is not up to date: %s",
+                self.name,
+                "; ".join(reasons),
+            )
+
+        # Never consider the step or its dependents up to date if it does not
+        # finish successfully
+        with suppress(FileNotFoundError):
+            self._fingerprint_path.unlink()
+        with suppress(FileNotFoundError):
+            self._run_token_path.unlink()
+
+        with self._timed_phase("dependent_setup"):
+            for requirement in self.requires:
+                # Pylint check here is wrong, it's still an instance of our class
+                # pylint: disable=protected-access
+                self._pipeline.get_step(requirement)._execute_dependent_setup(
+                    self
+                )
+
+        with self._timed_phase("run"):
+            if self.run_in_process:
+                self.worker_artifacts = self._pipeline.run_in_worker(self.name)
+            else:
+                call_with_parameters(self._func, self.parameters.copy())
 
+        if fingerprint is not None:
+            save_fingerprint(self._fingerprint_path, fingerprint)
+
+        self._run_token_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._run_token_path.with_name(
+            f".{self._run_token_path.name}.tmp"
+        )
+        tmp_path.write_text(uuid.uuid4().hex, encoding="utf-8")
+        os.replace(tmp_path, self._run_token_path)
+
+    def get_run_token(self) -> Optional[str]:
+        try:
+            return self._run_token_path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def run_in_worker(self) -> Dict[str, List[Any]]:
+        """
+        Run the body of the step, when running in a worker process.
+
+        :return: the artifacts of the step, to send back to the main process.
+        """
         call_with_parameters(self._func, self.parameters.copy())
+        return self._gather_artifacts()
+
+    @contextmanager
+    def _timed_phase(self, phase: str) -> Iterator[None]:
+        start_time = time.monotonic()
+        self._current_phase = phase
+        try:
+            yield
+        finally:
+            self._current_phase = "run"
+            self.phase_timings[phase] = get_timedelta_since(start_time)
 
     def clean(self) -> None:
         if isinstance(self._func, StepWithCleanup):
             call_with_parameters(self._func.clean, self.parameters.copy())
 
         self._venv_runner.clean()
+        self._is_set_up = False
 
         with suppress(FileNotFoundError):
             shutil.rmtree(self._step_runner.cache_path)
+        with suppress(FileNotFoundError):
+            self._fingerprint_path.unlink()
+        with suppress(FileNotFoundError):
+            self._run_token_path.unlink()
+
+    @property
+    def _fingerprint_path(self) -> Path:
+        return (
+            self.config.cache_path
+            / "fingerprints"
+            / f"{escape_step_name(self.name)}.json"
+        )
+
+    @property
+    def _run_token_path(self) -> Path:
+        return self._fingerprint_path.with_suffix(".run")
+
+    def _compute_fingerprint(self) -> Fingerprint:
+        assert self.inputs is not None
+
+        previous = load_fingerprint(self._fingerprint_path) or {}
+        parameters = {
+            key: value
+            for key, value in self.parameters.items()
+            if key != "step"
+        }
+
+        return {
+            "files": hash_files(
+                self.inputs,
+                self.config.cache_path,
+                previous.get("files", None),
+            ),
+            "parameters": hash_value(parameters),
+            "environment": hash_value(self._environment),
+            "interpreter": self._venv_runner.get_interpreter(),
+            "dependencies": hash_value(
+                self._venv_runner.get_installed_packages()
+            ),
+            # The outputs of the steps we require are unknown, so consider
+            # them changed whenever they did any work since our last run,
+            # even in a previous invocation
+            "requirements": {
+                requirement: self._pipeline.get_step(
+                    requirement
+                ).get_run_token()
+                for requirement in self.requires
+            },
+        }
 
     def _execute_dependent_setup(
         self, current_step: "BaseStepHandler"
@@ -199,6 +499,9 @@ class StepHandler(BaseStepHandler):
         return artifacts
 
     def _gather_artifacts(self) -> Dict[str, List[Any]]:
+        if self.worker_artifacts is not None:
+            return self.worker_artifacts
+
         if not isinstance(self._func, StepWithArtifacts):
             LOGGER.debug("Step %s does not provide any artifacts", self.name)
             return {}
@@ -244,6 +547,14 @@ class StepGroupHandler(BaseStepHandler):
     def execute(self) -> None:
         LOGGER.debug("Step %s is a meta step. Nothing to do", self.name)
 
+    def get_run_token(self) -> Optional[str]:
+        return hash_value(
+            [
+                self._pipeline.get_step(requirement).get_run_token()
+                for requirement in self.requires
+            ]
+        )
+
     def _execute_dependent_setup(
         self, current_step: "BaseStepHandler"
     ) -> None:
@@ -1,8 +1,8 @@
 from typing import Callable, Dict, List, Optional, Sequence
 
+from .. import _pipeline
 from .._exceptions import BaseWastException
 from .._inspect import get_location
-from .._pipeline import get_pipeline
 from .parametrize import build_parameters, parametrize
 from .steps import Step, StepRunner
 
@@ -16,6 +16,11 @@ def register_step(
     run_by_default: Optional[bool] = None,
     passenv: Optional[List[str]] = None,
     setenv: Optional[Dict[str, str]] = None,
+    inputs: Optional[List[str]] = None,
+    run_in_process: Optional[bool] = None,
+    cores: Optional[int] = None,
+    memory: Optional[int] = None,
+    resources: Optional[Dict[str, str]] = None,
 ) -> Step:
     """
     Register the provided :term:`step`.
@@ -68,12 +73,63 @@ def register_step(
     :param passenv: A list of environment variables to pass through to the step.
     :param setenv: A list of environment variables to set in the context of the
                    step.
+    :param inputs: A list of glob patterns matching the files this step reads.
+
+        When provided, the step is skipped if none of the matching files, its
+        parameters, its interpreter or the packages installed in its
+        environment changed since its last successful run, and if none of the
+        steps it requires ran since then, in this invocation or a previous
+        one.
+
+        Patterns are relative to the current directory and support ``**`` to
+        match directories recursively (e.g. :python:`["src/**/*.py"]`).
+        Passing ``--explain`` shows why a step is not up to date.
+
+        If :python:`None`, the step always runs.
+    :param run_in_process: Whether to run the step in a separate process.
+
+        This is useful for steps doing CPU intensive work in python
+        themselves, which would otherwise block other steps from running in
+        parallel. The process loads the pipeline definition again, and its
+        output and artifacts are sent back when the step finishes. The setup
+        phases still run in the main process.
+    :param cores: How many cores the step can make use of.
+
+        This is for steps running tools that do work in parallel themselves.
+        The scheduler shares :py:attr:`Config.n_cores` between the running
+        steps, and grants each at most this many cores, which it gets as
+        :py:attr:`StepRunner.jobs`. 0 means as many as are available.
+
+        If :python:`None`, the step uses a single core.
+    :param memory: How much memory the step is expected to need, in MiB.
+
+        Steps are only started while the memory expected for the running
+        steps fits in what was available when the pipeline started, as
+        reported by the system or the cgroup wast runs in.
+
+        If :python:`None`, the peak memory used by the commands of the step
+        in its previous runs is used, when known.
+    :param resources: The resources the step needs, mapped to whether it
+                      needs an ``"exclusive"`` or a ``"shared"`` access to them.
+
+        Resources are arbitrary names, e.g. :python:`"source tree"` or
+        :python:`"port 5432"`. Steps conflicting on a resource never run
+        at the same time: a resource is held either by a single step needing
+        an exclusive access, or by any number of steps needing a shared one.
+        Unlike ``requires``, this does not order the steps, nor make them run
+        when one of them is requested.
+
+        For example, steps rewriting the source files can take
+        :python:`{"source tree": "exclusive"}`, and steps only reading them
+        :python:`{"source tree": "shared"}`.
+
+        If :python:`None`, the step does not need any.
     :return: The step that was passed as argument.
     :raises BaseWastException: If no :python:`name` is passed and the :python:`func`
                                parameter does not have a :python:`__name__`
                                attribute.
     """
-    pipeline = get_pipeline()
+    pipeline = _pipeline.get_pipeline()
 
     if name is None:
         name = getattr(func, "__name__", None)
@@ -89,6 +145,11 @@ def register_step(
         run_by_default=run_by_default,
         passenv=passenv,
         setenv=setenv,
+        inputs=inputs,
+        run_in_process=run_in_process,
+        cores=cores,
+        memory=memory,
+        resources=resources,
     )(func)
 
     pipeline.register_step(name, func)
@@ -105,6 +166,11 @@ def register_managed_step(
     run_by_default: Optional[bool] = None,
     passenv: Optional[List[str]] = None,
     setenv: Optional[Dict[str, str]] = None,
+    inputs: Optional[List[str]] = None,
+    run_in_process: Optional[bool] = None,
+    cores: Optional[int] = None,
+    memory: Optional[int] = None,
+    resources: Optional[Dict[str, str]] = None,
 ) -> Step:
     """
     Register the provided :term:`step`, and handle installing its dependencies.
@@ -130,6 +196,11 @@ def register_managed_step(
     :param passenv: A list of environment variables to pass through to the step.
     :param setenv: A list of environment variables to set in the context of the
                    step.
+    :param inputs: A list of glob patterns matching the files this step reads.
+    :param run_in_process: Whether to run the step in a separate process.
+    :param cores: How many cores the step can make use of.
+    :param memory: How much memory the step is expected to need, in MiB.
+    :param resources: The resources the step needs, and how it accesses them.
     :return: The step that was passed as argument.
     :raises BaseWastException: If the :python:`func` passed already has a
                                :python:`setup` attribute defined.
@@ -158,6 +229,11 @@ def register_managed_step(
         run_by_default=run_by_default,
         passenv=passenv,
         setenv=setenv,
+        inputs=inputs,
+        run_in_process=run_in_process,
+        cores=cores,
+        memory=memory,
+        resources=resources,
     )
 
 
@@ -180,7 +256,7 @@ def register_step_group(
     :param requires: The list of steps that are part of the group
     :param run_by_default: Whether to run this step by default or not
     """
-    pipeline = get_pipeline()
+    pipeline = _pipeline.get_pipeline()
     pipeline.register_step_group(name, requires, run_by_default)
 
 
@@ -192,6 +268,11 @@ def step(
     run_by_default: Optional[bool] = None,
     passenv: Optional[List[str]] = None,
     setenv: Optional[Dict[str, str]] = None,
+    inputs: Optional[List[str]] = None,
+    run_in_process: Optional[bool] = None,
+    cores: Optional[int] = None,
+    memory: Optional[int] = None,
+    resources: Optional[Dict[str, str]] = None,
 ) -> Callable[[Step], Step]:
     """
     Register the decorated :term:`step` and make it available to the pipeline.
@@ -206,6 +287,11 @@ def step(
     :param passenv: A list of environment variables to pass through to the step.
     :param setenv: A list of environment variables to set in the context of the
                    step.
+    :param inputs: A list of glob patterns matching the files this step reads.
+    :param run_in_process: Whether to run the step in a separate process.
+    :param cores: How many cores the step can make use of.
+    :param memory: How much memory the step is expected to need, in MiB.
+    :param resources: The resources the step needs, and how it accesses them.
     """
 
     def wrapper(func: Step) -> Step:
@@ -217,6 +303,11 @@ def step(
             run_by_default=run_by_default,
             passenv=passenv,
             setenv=setenv,
+            inputs=inputs,
+            run_in_process=run_in_process,
+            cores=cores,
+            memory=memory,
+            resources=resources,
         )
         return func
 
@@ -232,6 +323,11 @@ def managed_step(
     run_by_default: Optional[bool] = None,
     passenv: Optional[List[str]] = None,
     setenv: Optional[Dict[str, str]] = None,
+    inputs: Optional[List[str]] = None,
+    run_in_process: Optional[bool] = None,
+    cores: Optional[int] = None,
+    memory: Optional[int] = None,
+    resources: Optional[Dict[str, str]] = None,
 ) -> Callable[[Step], Step]:
     """
     Register the decorated :term:`step`, and handle installing its dependencies.
@@ -247,6 +343,11 @@ def managed_step(
     :param passenv: A list of environment variables to pass through to the step.
     :param setenv: A list of environment variables to set in the context of the
                    step.
+    :param inputs: A list of glob patterns matching the files this step reads.
+    :param run_in_process: Whether to run the step in a separate process.
+    :param cores: How many cores the step can make use of.
+    :param memory: How much memory the step is expected to need, in MiB.
+    :param resources: The resources the step needs, and how it accesses them.
     """
 
     def wrapper(func: Step) -> Step:
@@ -259,6 +360,11 @@ def managed_step(
             run_by_default=run_by_default,
             passenv=passenv,
             setenv=setenv,
+            inputs=inputs,
+            run_in_process=run_in_process,
+            cores=cores,
+            memory=memory,
+            resources=resources,
         )
         return func
 
@@ -11,6 +11,7 @@ from typing import (
     List,
     Optional,
     Protocol,
+    Sequence,
     runtime_checkable,
 )
 
@@ -413,6 +414,15 @@ class StepWithCleanup(Step, Protocol):
     clean: Callable[..., None]
 
 
+def escape_step_name(name: str) -> str:
+    # Those chars regularly cause trouble with unescaped glob patterns and
+    # such. As such, replace them with "-", hoping this does not cause
+    # collisions
+    for char in ["/", ":", "*", "[", "]"]:
+        name = name.replace(char, "-")
+    return name
+
+
 class StepRunner:
     """
     Defines the runner for a :term:`step`, and provides utilities for the step to run.
@@ -463,14 +473,29 @@ class StepRunner:
 
         This will be cleaned up and emptied before the step runs.
         """
-        name = self.name
-        # Those chars regularly cause trouble with unescaped glob patterns and
-        # such. As such, replace them with "-", hoping this does not cause
-        # collisions
-        for char in ["/", ":", "*", "[", "]"]:
-            name = name.replace(char, "-")
+        return self.config.cache_path / "cache" / escape_step_name(self.name)
 
-        return self.config.cache_path / "cache" / name
+    @property
+    def jobs(self) -> int:
+        """
+        The number of cores the step was granted for its current run.
+
+        Steps running tools that do work in parallel should pass this to them,
+        in order not to compete for cores with the other steps running at the
+        same time. This is always 1 unless the step was registered with more
+        ``cores``.
+        """
+        return self._handler.jobs
+
+    @property
+    def venv_path(self) -> Path:
+        """
+        The path to the virtual environment of the current step.
+
+        This can be used to keep track of what was installed in the
+        environment, as anything stored there is removed together with it.
+        """
+        return self._handler.venv_path
 
     def get_artifacts(self, key: str) -> List[Any]:
         """
@@ -545,3 +570,68 @@ class StepRunner:
             external_command=external_command,
             silent_on_success=silent_on_success,
         )
+
+    def run_on_files(
+        self,
+        command: List[str],
+        files: Sequence[str],
+        *,
+        extensions: Sequence[str] = (".py",),
+        config_files: Sequence[str] = (),
+        env: Optional[Dict[str, str]] = None,
+        external_command: bool = False,
+        silent_on_success: bool = False,
+    ) -> None:
+        """
+        Run the provided command on the files that changed since it last
+        succeeded.
+
+        This is meant for tools checking or formatting each file
+        independently, like formatters and linters, to avoid running them
+        again on files they already succeeded on.
+
+        Directories in ``files`` are expanded to the files they contain with
+        one of the given extensions, skipping the ones ignored by git, and the
+        files the command previously succeeded on, which did not change since,
+        are skipped. The remaining files are appended to the command, and run
+        like :py:func:`run` would, in batches of up to 100 files. All batches
+        run even if some fail, which then fails the step.
+
+        Results are only reused as long as the command, the content of the
+        configuration files, the packages installed in the environment and its
+        interpreter stay the same. They are forgotten when cleaning the step.
+
+        .. warning::
+
+            As files are passed explicitly to the command, exclusions that
+            tools only apply when walking directories themselves do not apply.
+
+            The command only runs again on a file when it changes. Checks
+            spanning multiple files, like imports, might thus miss issues
+            until the affected files change, and only see the files of the
+            same batch.
+
+            Files are only recorded as passed when their whole batch passes.
+            A failing file thus has the other files of its batch checked again
+            on the next run, until they all pass.
+
+        :param command: The command to run, as a list of arguments, without
+                        the files.
+        :param files: The files and directories to run the command on.
+        :param extensions: The extensions of the files to consider when
+                           expanding directories.
+        :param config_files: The configuration files of the tool, whose
+                             changes invalidate the previous results.
+        :param env: See :py:func:`run`.
+        :param external_command: See :py:func:`run`.
+        :param silent_on_success: See :py:func:`run`.
+        """
+        self._handler.run_on_files(
+            command,
+            files,
+            extensions=extensions,
+            config_files=config_files,
+            env=env,
+            external_command=external_command,
+            silent_on_success=silent_on_success,
+        )
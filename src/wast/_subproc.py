@@ -1,17 +1,25 @@
+import codecs
 import logging
 import os
 import pty
+import selectors
 import subprocess
 import sys
+import threading
 from contextlib import suppress
 from contextvars import ContextVar, copy_context
-from threading import Thread
-from typing import Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 from ._log_capture import PipePlexer, WriterProtocol
 
+if TYPE_CHECKING:
+    from ._async_subproc import CommandScope
+
 LOGGER = logging.getLogger(__name__)
 
+# How much output of commands to read at once
+READ_SIZE = 64 * 1024
+
 _STDOUT_PIPE = ContextVar[WriterProtocol]("_STDOUT_PIPE", default=sys.stdout)
 _STDERR_PIPE = ContextVar[WriterProtocol]("_STDERR_PIPE", default=sys.stderr)
 
@@ -23,10 +31,156 @@ def set_subprocess_default_pipes(
     _STDERR_PIPE.set(stderr)
 
 
-def _stream(source: int, dest: WriterProtocol) -> None:
-    with suppress(IOError):
-        while data := os.read(source, 2048):
-            dest.write(data.decode())
+def get_subprocess_default_pipes() -> Tuple[WriterProtocol, WriterProtocol]:
+    return _STDOUT_PIPE.get(), _STDERR_PIPE.get()
+
+
+class PeakMemory:
+    """
+    The highest resident memory used by any of the commands run so far.
+    """
+
+    def __init__(self) -> None:
+        self.value: Optional[int] = None
+
+    def update(self, value: int) -> None:
+        if self.value is None or value > self.value:
+            self.value = value
+
+
+_PEAK_MEMORY = ContextVar[Optional[PeakMemory]]("_PEAK_MEMORY", default=None)
+
+
+def track_peak_memory() -> PeakMemory:
+    """
+    Keep track of the peak memory of the commands run in the current context.
+    """
+    peak_memory = PeakMemory()
+    _PEAK_MEMORY.set(peak_memory)
+    return peak_memory
+
+
+def wait_for_process(
+    proc: "subprocess.Popen[Any]", peak_memory: Optional[PeakMemory]
+) -> int:
+    """
+    Wait for the process to finish, recording the most memory it used.
+
+    :return: the return code of the process
+    """
+    # Reap the process ourselves, in order to know how much memory it used
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    if peak_memory is not None:
+        # This is in kilobytes everywhere but on macOS
+        factor = 1 if sys.platform == "darwin" else 1024
+        peak_memory.update(usage.ru_maxrss * factor)
+    return proc.returncode
+
+
+class _OutputReactor:
+    """
+    Forward the output of all running subprocesses to their destinations.
+
+    A single thread waits on the output of every command run by any step, and
+    reads it in large chunks, instead of having blocking threads per stream.
+    """
+
+    def __init__(self) -> None:
+        self._setup()
+
+    def _setup(self) -> None:
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pending: List[Tuple[int, WriterProtocol, threading.Event]] = []
+        self._wakeup_reader, self._wakeup_writer = os.pipe()
+        os.set_blocking(self._wakeup_writer, False)
+
+    def stream(self, source: int, dest: WriterProtocol) -> threading.Event:
+        """
+        Forward everything read from the source to the destination.
+
+        :param source: the file descriptor to read from, until it is closed
+        :param dest: where to write the decoded output
+        :return: an event set once the source is exhausted
+        """
+        done = threading.Event()
+
+        with self._lock:
+            self._pending.append((source, dest, done))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="wast-output", daemon=True
+                )
+                self._thread.start()
+
+        with suppress(BlockingIOError):
+            os.write(self._wakeup_writer, b"\0")
+        return done
+
+    def _loop(self) -> None:
+        selector = selectors.DefaultSelector()
+        selector.register(self._wakeup_reader, selectors.EVENT_READ)
+
+        while True:
+            for key, _ in selector.select():
+                if key.fd == self._wakeup_reader:
+                    os.read(self._wakeup_reader, READ_SIZE)
+                    with self._lock:
+                        pending, self._pending = self._pending, []
+                    for source, dest, done in pending:
+                        decoder = codecs.getincrementaldecoder("utf-8")(
+                            errors="replace"
+                        )
+                        selector.register(
+                            source,
+                            selectors.EVENT_READ,
+                            (dest, decoder, done),
+                        )
+                    continue
+
+                dest, decoder, done = key.data
+                try:
+                    data = os.read(key.fd, READ_SIZE)
+                except OSError:
+                    # Ptys raise EIO once the other side is closed
+                    data = b""
+
+                try:
+                    if data:
+                        dest.write(decoder.decode(data))
+                        continue
+
+                    if remaining := decoder.decode(b"", final=True):
+                        dest.write(remaining)
+                except Exception:  # pylint: disable=broad-except
+                    LOGGER.exception("Unable to forward output of command")
+
+                selector.unregister(key.fd)
+                done.set()
+
+    def _reset_after_fork(self) -> None:
+        # The thread is not running in the child, and the wakeup pipe is
+        # shared with the parent
+        os.close(self._wakeup_reader)
+        os.close(self._wakeup_writer)
+        self._setup()
+
+
+_REACTOR = _OutputReactor()
+os.register_at_fork(
+    after_in_child=_REACTOR._reset_after_fork  # pylint: disable=protected-access
+)
+
+
+_COMMAND_SCOPE = ContextVar[Optional["CommandScope"]](
+    "_COMMAND_SCOPE", default=None
+)
+
+
+def set_command_scope(scope: Optional["CommandScope"]) -> None:
+    _COMMAND_SCOPE.set(scope)
 
 
 def run(
@@ -35,6 +189,19 @@ def run(
     LOGGER.debug("Running command: '%s'", " ".join(command))
 
     def _run() -> subprocess.CompletedProcess[None]:
+        scope = _COMMAND_SCOPE.get()
+        if scope is not None:
+            returncode = scope.run(
+                command,
+                env,
+                _STDOUT_PIPE.get(),
+                _STDERR_PIPE.get(),
+                _PEAK_MEMORY.get(),
+            )
+            ret = subprocess.CompletedProcess[None](command, returncode)
+            ret.check_returncode()
+            return ret
+
         p_stdin, c_stdin = pty.openpty()
         p_stdout, c_stdout = pty.openpty()
         p_stderr, c_stderr = pty.openpty()
@@ -51,18 +218,12 @@ def run(
             for fd in [c_stdin, c_stdout, c_stderr]:
                 os.close(fd)
 
-            stdout_reader = Thread(
-                target=_stream, args=[p_stdout, _STDOUT_PIPE.get()]
-            )
-            stderr_reader = Thread(
-                target=_stream, args=[p_stderr, _STDERR_PIPE.get()]
-            )
-
-            stdout_reader.start()
-            stderr_reader.start()
+            stdout_done = _REACTOR.stream(p_stdout, _STDOUT_PIPE.get())
+            stderr_done = _REACTOR.stream(p_stderr, _STDERR_PIPE.get())
 
-            stdout_reader.join()
-            stderr_reader.join()
+            stdout_done.wait()
+            stderr_done.wait()
+            wait_for_process(proc, _PEAK_MEMORY.get())
 
         for fd in [p_stdin, p_stdout, p_stderr]:
             os.close(fd)
@@ -85,5 +246,5 @@ def run(
     try:
         return context.run(_run_in_context)
     except subprocess.CalledProcessError:
-        pipe_plexer.dump(sys.stdout, sys.stderr)
+        pipe_plexer.dump(*get_subprocess_default_pipes())
         raise
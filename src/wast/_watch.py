@@ -0,0 +1,358 @@
+import ctypes
+import logging
+import os
+import re
+import select
+import struct
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Pattern, Set
+
+LOGGER = logging.getLogger(__name__)
+
+# How long to wait for things to settle after a change, in seconds, so that
+# saving multiple files or checking out a branch only triggers a single run
+DEBOUNCE_DELAY = 0.2
+# How often to look for changes when inotify is not available, in seconds
+POLLING_INTERVAL = 0.5
+
+# From sys/inotify.h
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def compile_input_pattern(pattern: str) -> Pattern[str]:
+    """
+    Compile a glob pattern, as given to a step's ``inputs``, to a regex.
+
+    ``**`` matches any number of directories, while other wildcards never
+    match across directories, like :py:func:`glob.glob` with
+    ``recursive=True``.
+    """
+    regex = ""
+    components = os.path.normpath(pattern).split(os.sep)
+
+    for index, component in enumerate(components):
+        is_last = index == len(components) - 1
+        if component == "**":
+            regex += ".*" if is_last else "(?:.*/)?"
+            continue
+
+        i = 0
+        while i < len(component):
+            char = component[i]
+            end = component.find("]", i + 2)
+            if char == "*":
+                regex += "[^/]*"
+            elif char == "?":
+                regex += "[^/]"
+            elif char == "[" and end != -1:
+                content = component[i + 1 : end].replace("\\", "\\\\")
+                if content.startswith("!"):
+                    content = f"^{content[1:]}"
+                regex += f"[{content}]"
+                i = end
+            else:
+                regex += re.escape(char)
+            i += 1
+
+        if not is_last:
+            regex += "/"
+
+    return re.compile(f"{regex}\\Z")
+
+
+class _GitIgnore:
+    def __init__(self, root: Path) -> None:
+        self._root = root
+        try:
+            subprocess.run(
+                ["git", "rev-parse", "--is-inside-work-tree"],
+                cwd=root,
+                capture_output=True,
+                check=True,
+            )
+        except (OSError, subprocess.CalledProcessError):
+            LOGGER.debug("%s is not a git repository", root)
+            self._enabled = False
+        else:
+            self._enabled = True
+
+    def get_ignored_directories(self) -> Set[str]:
+        if not self._enabled:
+            return set()
+
+        output = subprocess.run(
+            [
+                "git",
+                "ls-files",
+                "--others",
+                "--ignored",
+                "--exclude-standard",
+                "--directory",
+                "-z",
+            ],
+            cwd=self._root,
+            capture_output=True,
+            check=False,
+            text=True,
+        ).stdout
+        return {
+            entry.rstrip("/")
+            for entry in output.split("\0")
+            if entry.endswith("/")
+        }
+
+    def filter(self, paths: Iterable[str]) -> Set[str]:
+        paths = set(paths)
+        if not self._enabled or not paths:
+            return paths
+
+        # Exits with 1 if no path is ignored
+        output = subprocess.run(
+            ["git", "check-ignore", "--stdin", "-z"],
+            cwd=self._root,
+            input="\0".join(sorted(paths)),
+            capture_output=True,
+            check=False,
+            text=True,
+        ).stdout
+        return paths - set(output.split("\0"))
+
+
+# pylint: disable=too-many-instance-attributes
+class FileWatcher:
+    """
+    Watch a directory tree for changes.
+
+    Changes are detected with inotify where available, and by polling
+    otherwise. The ``.git`` directory, the excluded directories and everything
+    ignored by git is never reported.
+
+    :param root: the directory to watch
+    :param excluded: directories to never consider, e.g. wast's cache.
+    """
+
+    def __init__(self, root: Path, excluded: List[Path]) -> None:
+        self._root = root.resolve()
+        self._excluded = {
+            os.path.relpath(path.resolve(), self._root) for path in excluded
+        }
+        self._excluded.add(".git")
+        self._gitignore = _GitIgnore(self._root)
+        self._ignored_directories = (
+            self._gitignore.get_ignored_directories() | self._excluded
+        )
+
+        self._fd: Optional[int] = None
+        self._libc: Optional[ctypes.CDLL] = None
+        self._watches: Dict[int, str] = {}
+        self._snapshot: Dict[str, float] = {}
+
+        try:
+            self._fd = self._init_inotify()
+        except OSError as exc:
+            LOGGER.debug("Unable to use inotify, polling instead: %s", exc)
+            self._snapshot = self._take_snapshot()
+        else:
+            self._add_watches("")
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """
+        Wait for files to change.
+
+        Once something changed, this waits until nothing changed for
+        :py:data:`DEBOUNCE_DELAY` before returning.
+
+        :param timeout: how long to wait for a first change, forever if
+                        :python:`None`.
+        :return: the paths of the files that changed, relative to the root,
+                 or nothing if the timeout expired.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changes: Set[str] = set()
+
+        while True:
+            if changes:
+                wait_for: Optional[float] = DEBOUNCE_DELAY
+            elif deadline is None:
+                wait_for = None
+            else:
+                wait_for = max(deadline - time.monotonic(), 0)
+
+            new_changes = self._gitignore.filter(
+                path
+                for path in self._read_changes(wait_for)
+                if not self._is_excluded(path)
+            )
+            if new_changes:
+                changes.update(new_changes)
+            elif changes or (
+                deadline is not None and time.monotonic() >= deadline
+            ):
+                return changes
+
+    def _is_excluded(self, path: str) -> bool:
+        return any(
+            path == directory or path.startswith(f"{directory}/")
+            for directory in self._ignored_directories
+        )
+
+    def _read_changes(self, timeout: Optional[float]) -> Set[str]:
+        if self._fd is None:
+            return self._poll(timeout)
+
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changes = set()
+        offset = 0
+
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                LOGGER.warning(
+                    "Too many changes at once, some might have been missed"
+                )
+                continue
+            if mask & _IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, name) if directory else name
+
+            if mask & _IN_ISDIR:
+                if mask & (
+                    _IN_CREATE | _IN_MOVED_TO
+                ) and self._gitignore.filter([path]):
+                    # Files might have been added before we start watching
+                    changes.update(self._add_watches(path))
+                continue
+
+            changes.add(path)
+
+        return changes
+
+    def _poll(self, timeout: Optional[float]) -> Set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            wait_for = POLLING_INTERVAL
+            if deadline is not None:
+                wait_for = min(wait_for, max(deadline - time.monotonic(), 0))
+            time.sleep(wait_for)
+
+            snapshot = self._take_snapshot()
+            changes = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+
+            if changes or (
+                deadline is not None and time.monotonic() >= deadline
+            ):
+                return changes
+
+    def _walk(self, directory: str) -> Iterable[str]:
+        for root, dirs, files in os.walk(self._root / directory):
+            relative_root = os.path.relpath(root, self._root)
+            if relative_root == ".":
+                relative_root = ""
+
+            dirs[:] = [
+                name
+                for name in dirs
+                if not self._is_excluded(os.path.join(relative_root, name))
+            ]
+            yield relative_root
+
+            for name in files:
+                yield os.path.join(relative_root, name)
+
+    def _take_snapshot(self) -> Dict[str, float]:
+        snapshot = {}
+        for path in self._walk(""):
+            with_root = self._root / path
+            try:
+                if with_root.is_file():
+                    snapshot[path] = with_root.stat().st_mtime
+            except OSError:
+                continue
+        return snapshot
+
+    def _add_watches(self, directory: str) -> Set[str]:
+        assert self._fd is not None and self._libc is not None
+        files = set()
+
+        for path in self._walk(directory):
+            full_path = self._root / path
+            if not full_path.is_dir():
+                files.add(path)
+                continue
+
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(full_path), _WATCH_MASK
+            )
+            if wd < 0:
+                errno = ctypes.get_errno()
+                LOGGER.warning(
+                    "Unable to watch %s: %s", full_path, os.strerror(errno)
+                )
+                continue
+            self._watches[wd] = path
+
+        return files
+
+    def _init_inotify(self) -> int:
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only supported on linux")
+
+        # The symbols of the process include the ones of the libc
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        return int(fd)
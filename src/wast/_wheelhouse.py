@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import subprocess
+from typing import Dict, Iterable, List, Set, Tuple
+
+from ._config import Config
+from ._exceptions import UnavailableInterpreterException
+from ._fingerprint import hash_value
+from ._runners import VenvRunner, get_requirements_fingerprint
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Wheelhouse:
+    """
+    A local directory of wheels shared by the environments of all steps.
+
+    It is filled once per run with the wheels of all the dependencies of
+    managed steps, so that installing them afterwards does not need to
+    access the index. What was already fetched is recorded per interpreter,
+    so that later runs do not need network access at all if the requirements
+    did not change.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self._config = config
+        self._path = config.wheelhouse_path
+        self._available: Dict[str, Set[Tuple[str, ...]]] = {}
+
+    def fill(
+        self, requirements: Iterable[Tuple[str, Tuple[str, ...]]]
+    ) -> None:
+        """
+        Fetch the wheels for all the given requirements.
+
+        Failing to fetch the wheels for some requirements is not fatal, the
+        steps needing them will then install them from the index as usual.
+
+        :param requirements: pairs of interpreter and arguments that will be
+                             passed to ``pip install`` in environments using
+                             this interpreter.
+        """
+        per_python: Dict[str, Set[Tuple[str, ...]]] = {}
+        for python, packages in requirements:
+            per_python.setdefault(python, set()).add(packages)
+
+        for python, all_packages in sorted(per_python.items()):
+            try:
+                self._fill_for_interpreter(python, sorted(all_packages))
+            except UnavailableInterpreterException:
+                LOGGER.debug(
+                    "Interpreter %s unavailable, not filling the wheelhouse",
+                    python,
+                )
+
+    def get_install_options(
+        self, python: str, packages: Tuple[str, ...]
+    ) -> List[str]:
+        """
+        Get the options to pass to ``pip install`` to use the wheelhouse.
+
+        :return: options to install without accessing the index if the
+                 wheelhouse contains all that is needed for the packages,
+                 or no options otherwise.
+        """
+        if packages not in self._available.get(python, set()):
+            return []
+        return ["--no-index", f"--find-links={self._path}"]
+
+    def _fill_for_interpreter(
+        self, python: str, all_packages: List[Tuple[str, ...]]
+    ) -> None:
+        runner = VenvRunner(
+            f"wheelhouse-{python}", python, self._config, self._config.environ
+        )
+        interpreter = runner.get_interpreter()
+        marker_path = self._path / f".{python.replace(os.sep, '-')}.json"
+
+        try:
+            with marker_path.open() as fp:
+                filled = set(json.load(fp))
+        except (OSError, ValueError, TypeError):
+            filled = set()
+
+        available = self._available.setdefault(python, set())
+        prepared = False
+
+        for packages in all_packages:
+            requirements = get_requirements_fingerprint(packages)
+            if requirements is None:
+                continue
+
+            fingerprint = hash_value(
+                {"interpreter": interpreter, "requirements": requirements}
+            )
+            if fingerprint in filled:
+                available.add(packages)
+                continue
+
+            if not prepared:
+                runner.prepare()
+                prepared = True
+
+            LOGGER.info(
+                "Fetching wheels for %s with %s", " ".join(packages), python
+            )
+            try:
+                runner.run(
+                    [
+                        "python",
+                        "-m",
+                        "pip",
+                        "wheel",
+                        f"--wheel-dir={self._path}",
+                        f"--find-links={self._path}",
+                        *packages,
+                    ],
+                    silent_on_success=self._config.verbosity < 2,
+                )
+            except subprocess.CalledProcessError:
+                LOGGER.warning(
+                    "Unable to fetch wheels for %s, steps will install them"
+                    " from the index",
+                    " ".join(packages),
+                )
+                continue
+
+            filled.add(fingerprint)
+            available.add(packages)
+
+        self._path.mkdir(parents=True, exist_ok=True)
+        tmp_path = marker_path.with_name(f"{marker_path.name}.tmp")
+        with tmp_path.open("w") as fp:
+            json.dump(sorted(filled), fp)
+        os.replace(tmp_path, marker_path)
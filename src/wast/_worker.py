@@ -0,0 +1,100 @@
+import logging
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from contextvars import copy_context
+from typing import Any, Dict, List, Optional, Tuple
+
+from ._config import Config
+from ._logging import set_context_handler, setup_logging
+from ._pipeline import Pipeline
+from ._steps.handlers import StepHandler
+from ._subproc import set_subprocess_default_pipes
+
+# Output of a step, as a list of stream name and data written
+Output = List[Tuple[str, str]]
+
+_PIPELINES: Dict[str, Pipeline] = {}
+
+
+class RemoteTraceback(Exception):
+    """
+    The traceback of an exception raised in a worker.
+    """
+
+    def __init__(self, tb: str) -> None:
+        super().__init__(tb)
+        self.tb = tb
+
+    def __str__(self) -> str:
+        return self.tb
+
+
+class _CapturedStream:
+    def __init__(self, output: Output, name: str) -> None:
+        self._output = output
+        self._name = name
+
+    def write(self, data: str) -> int:
+        self._output.append((self._name, data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+
+def _get_pipeline(definition_path: str, config: Config) -> Pipeline:
+    # pylint: disable=import-outside-toplevel,cyclic-import
+    from .__main__ import _load_user_config
+
+    if definition_path not in _PIPELINES:
+        setup_logging(logging.INFO - 10 * config.verbosity, config.colors)
+        _PIPELINES[definition_path] = _load_user_config(
+            Pipeline(config), definition_path
+        )
+    return _PIPELINES[definition_path]
+
+
+def run_step(
+    definition_path: str,
+    config: Config,
+    name: str,
+    worker_artifacts: Dict[str, Dict[str, List[Any]]],
+    jobs: int,
+) -> Tuple[Output, Dict[str, List[Any]], Optional[Exception], str]:
+    """
+    Run the body of the given step, and gather its artifacts.
+
+    This runs in a worker process, which loads the pipeline definition itself
+    the first time, so that only the name of the step needs to be sent to it,
+    together with the artifacts of steps that ran in other workers and the
+    number of cores the step was granted.
+
+    :return: the output of the step, its artifacts, and the exception it raised
+             if any, with its formatted traceback.
+    """
+    output: Output = []
+    stdout = _CapturedStream(output, "stdout")
+    stderr = _CapturedStream(output, "stderr")
+
+    def _run() -> Dict[str, List[Any]]:
+        set_context_handler(stderr)
+        set_subprocess_default_pipes(stdout, stderr)
+
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            pipeline = _get_pipeline(definition_path, config)
+            for step, artifacts in worker_artifacts.items():
+                requirement = pipeline.get_step(step)
+                assert isinstance(requirement, StepHandler)
+                requirement.worker_artifacts = artifacts
+
+            handler = pipeline.get_step(name)
+            assert isinstance(handler, StepHandler)
+            handler.jobs = jobs
+            return handler.run_in_worker()
+
+    try:
+        artifacts = copy_context().run(_run)
+    except Exception as exc:  # pylint: disable=broad-except
+        return output, {}, exc, traceback.format_exc()
+
+    return output, artifacts, None, ""
@@ -14,17 +14,21 @@ duplication.
     tools when configuring them.
 """
 
-from ._black import black
-from ._coverage import coverage
-from ._docformatter import docformatter
-from ._isort import isort
-from ._mypy import mypy
-from ._package import package
-from ._pylint import pylint
-from ._pytest import pytest
-from ._sphinx import sphinx
-from ._twine import twine
-from ._unimport import unimport
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from ._black import black
+    from ._coverage import coverage
+    from ._docformatter import docformatter
+    from ._isort import isort
+    from ._mypy import mypy
+    from ._package import package
+    from ._pylint import pylint
+    from ._pytest import pytest
+    from ._sphinx import sphinx
+    from ._twine import twine
+    from ._unimport import unimport
 
 __all__ = [
     "black",
@@ -39,3 +43,18 @@ __all__ = [
     "twine",
     "unimport",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    # Predefined steps are imported lazily, so that only the ones used by the
+    # pipeline definition are paid for on startup
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f"._{name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted([*globals(), *__all__])
@@ -10,6 +10,7 @@ from .. import Step, StepRunner, build_parameters, set_defaults
         "dependencies": ["black"],
         "files": ["."],
         "additional_arguments": ["--check", "--diff", "-W1"],
+        "cache_results": False,
     }
 )
 class Black(Step):
@@ -21,6 +22,7 @@ class Black(Step):
         step: StepRunner,
         files: Sequence[str],
         additional_arguments: List[str],
+        cache_results: bool,
     ) -> None:
         if (
             "--color" not in additional_arguments
@@ -29,13 +31,22 @@ class Black(Step):
             color_arg = f"--{'' if step.config.colors else 'no-'}color"
             additional_arguments.append(color_arg)
 
-        step.run(["black", *additional_arguments, *files])
+        if cache_results:
+            step.run_on_files(
+                ["black", *additional_arguments],
+                files,
+                extensions=[".py", ".pyi"],
+                config_files=["pyproject.toml"],
+            )
+        else:
+            step.run(["black", *additional_arguments, *files])
 
 
 def black(
     *,
     files: Optional[Sequence[str]] = None,
     additional_arguments: Optional[List[str]] = None,
+    cache_results: Optional[bool] = None,
 ) -> Step:
     """
     Run `the Black formatter`_ against your python source code.
@@ -48,6 +59,10 @@ def black(
     :param additional_arguments: Additional arguments to pass to the ``black``
                                  invocation.
                                  Defaults to :python:`["--check", "--diff", "-W1"]`.
+    :param cache_results: Whether to only run ``black`` on the files that changed,
+                          or it did not succeed on, since the last time. See
+                          :py:func:`wast.StepRunner.run_on_files`.
+                          Defaults to :python:`False`.
     :return: The step so that you can add additional parameters to it if needed.
 
     :Examples:
@@ -94,5 +109,7 @@ def black(
         second.
     """
     return build_parameters(
-        files=files, additional_arguments=additional_arguments
+        files=files,
+        additional_arguments=additional_arguments,
+        cache_results=cache_results,
     )(Black())
@@ -1,9 +1,79 @@
-from typing import List, Optional
+import hashlib
+import json
+import logging
+import os
+from concurrent import futures
+from contextlib import suppress
+from contextvars import copy_context
+from pathlib import Path
+from typing import Any, Dict, List, Optional
 
 # XXX: All imports here should be done from the top level. If we need it,
 #      users might need it
 from .. import Step, StepRunner, parametrize, set_defaults
 
+LOGGER = logging.getLogger(__name__)
+
+# Bump this whenever the format of the state changes, to invalidate the
+# existing ones.
+_STATE_VERSION = 1
+# The files coverage reads its configuration from by default
+_CONFIG_FILES = [".coveragerc", "setup.cfg", "tox.ini", "pyproject.toml"]
+# Reports only printing to the terminal, which always need to run
+_TERMINAL_REPORTS = {"report"}
+# The options setting where reports write to, and where they do by default
+_REPORT_OUTPUTS = {
+    "annotate": (["-d", "--directory"], None),
+    "html": (["-d", "--directory"], "htmlcov"),
+    "json": (["-o"], "coverage.json"),
+    "lcov": (["-o"], "coverage.lcov"),
+    "xml": (["-o"], "coverage.xml"),
+}
+
+
+def _hash_file(path: str) -> Optional[str]:
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as fp:
+            while chunk := fp.read(1024 * 1024):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def _get_option(arguments: List[str], names: List[str]) -> Optional[str]:
+    value = None
+    for index, argument in enumerate(arguments):
+        for name in names:
+            if argument == name and index + 1 < len(arguments):
+                value = arguments[index + 1]
+            elif argument.startswith(f"{name}="):
+                value = argument[len(name) + 1 :]
+            elif len(name) == 2 and argument.startswith(name):
+                value = argument[len(name) :] or value
+    return value
+
+
+def _get_report_key(
+    report: List[str], inputs: Dict[str, Optional[str]]
+) -> str:
+    config_files = _CONFIG_FILES.copy()
+    rcfile = _get_option(report[1:], ["--rcfile"])
+    if rcfile is not None:
+        config_files.append(rcfile)
+    return json.dumps(
+        [inputs, {path: _hash_file(path) for path in config_files}]
+    )
+
+
+def _report_output_exists(report: List[str]) -> bool:
+    # Outputs only set in the configuration of coverage are not known, and the
+    # default one is then missing, which generates the report every time
+    names, default = _REPORT_OUTPUTS.get(report[0], ([], None))
+    output = _get_option(report[1:], names) or default
+    return output is None or os.path.exists(output)
+
 
 @set_defaults(
     {
@@ -22,16 +92,148 @@ class Coverage(Step):
         step: StepRunner,
         reports: List[List[str]],
     ) -> None:
-        env = {"COVERAGE_FILE": str(step.cache_path / "coverage")}
+        data_file = step.cache_path / "coverage"
+        env = {"COVERAGE_FILE": str(data_file)}
 
         coverage_files = step.get_artifacts("coverage_files")
         if not coverage_files:
             raise Exception("No coverage files provided. Can't proceed")
 
-        step.run(["coverage", "combine", "--keep", *coverage_files], env=env)
+        state_path = step.cache_path / "coverage-state.json"
+        state = self._load_state(state_path)
+        inputs = {path: _hash_file(path) for path in coverage_files}
+
+        if not data_file.exists() or inputs != state["inputs"]:
+            # Never trust the state if combining does not finish
+            with suppress(FileNotFoundError):
+                state_path.unlink()
+            self._combine(
+                step,
+                env,
+                inputs,
+                state["inputs"] if data_file.exists() else {},
+            )
+            state = {"inputs": inputs, "reports": {}}
+            self._save_state(state_path, state)
+        else:
+            LOGGER.info("Coverage data did not change since it was combined")
+
+        try:
+            self._generate_reports(
+                step, env, reports, state["reports"], inputs
+            )
+        finally:
+            self._save_state(state_path, state)
 
+    def _generate_reports(
+        self,
+        step: StepRunner,
+        env: Dict[str, str],
+        reports: List[List[str]],
+        generated: Dict[str, str],
+        inputs: Dict[str, Optional[str]],
+    ) -> None:
+        # Reports writing files are only generated again when the combined
+        # data or the configuration changed, or when what they wrote is gone
+        keys = {}
+        pending = []
         for report in reports:
-            step.run(["coverage", *report], env=env)
+            key = keys[json.dumps(report)] = _get_report_key(report, inputs)
+            if (
+                report[0] not in _TERMINAL_REPORTS
+                and generated.get(json.dumps(report)) == key
+                and _report_output_exists(report)
+            ):
+                LOGGER.info("Report '%s' is up to date", " ".join(report))
+            else:
+                pending.append(report)
+
+        # Reports only read the combined data, so they can be generated at
+        # the same time. Each needs its own copy of the context, which holds
+        # where the output of the commands goes.
+        with futures.ThreadPoolExecutor(max(len(pending), 1)) as executor:
+            results = [
+                (
+                    report,
+                    executor.submit(
+                        copy_context().run,
+                        step.run,
+                        ["coverage", *report],
+                        env=env,
+                    ),
+                )
+                for report in pending
+            ]
+
+        errors = []
+        for report, result in results:
+            try:
+                result.result()
+            except Exception as exc:  # pylint: disable=broad-except
+                errors.append(exc)
+            else:
+                generated[json.dumps(report)] = keys[json.dumps(report)]
+
+        if errors:
+            raise errors[0]
+
+    def _combine(
+        self,
+        step: StepRunner,
+        env: Dict[str, str],
+        inputs: Dict[str, Optional[str]],
+        previous: Dict[str, Optional[str]],
+    ) -> None:
+        # Combining merges the lines covered by each file, so data files that
+        # changed or went away since can't be removed from the combined data.
+        # Only files that were not combined yet can be added to it.
+        new_files = [path for path in inputs if path not in previous]
+        if (
+            previous
+            and new_files
+            and all(
+                inputs.get(path) == digest for path, digest in previous.items()
+            )
+        ):
+            LOGGER.info(
+                "Adding %d new coverage files to the combined data",
+                len(new_files),
+            )
+            step.run(
+                ["coverage", "combine", "--append", "--keep", *new_files],
+                env=env,
+            )
+            return
+
+        LOGGER.info("Combining %d coverage files", len(inputs))
+        with suppress(FileNotFoundError):
+            os.unlink(env["COVERAGE_FILE"])
+        step.run(["coverage", "combine", "--keep", *inputs], env=env)
+
+    def _load_state(self, path: Path) -> Dict[str, Any]:
+        try:
+            with path.open(encoding="utf-8") as fp:
+                state = json.load(fp)
+        except FileNotFoundError:
+            state = None
+        except (OSError, ValueError) as exc:
+            LOGGER.debug("Ignoring invalid coverage state: %s", exc)
+            state = None
+
+        if (
+            not isinstance(state, dict)
+            or state.get("version") != _STATE_VERSION
+            or not isinstance(state.get("inputs"), dict)
+            or not isinstance(state.get("reports"), dict)
+        ):
+            return {"inputs": {}, "reports": {}}
+        return state
+
+    def _save_state(self, path: Path, state: Dict[str, Any]) -> None:
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as fp:
+            json.dump({**state, "version": _STATE_VERSION}, fp)
+        os.replace(tmp_path, path)
 
 
 def coverage(*, reports: Optional[List[List[str]]] = None) -> Step:
@@ -48,6 +250,19 @@ def coverage(*, reports: Optional[List[List[str]]] = None) -> Step:
     This step leverages :term:`artifacts<artifact>` named ``coverage_files`` provided by
     other steps to provide reports.
 
+    .. note::
+
+        The combined data is kept between runs. Coverage files that were not
+        combined yet are added to it, and it is only combined from scratch
+        when files that were previously combined changed or went away.
+
+        Reports are generated concurrently. Reports writing files, like
+        ``xml`` or ``html``, are only generated again when the combined data
+        or the configuration of coverage changed, when what they wrote went
+        away, or when cleaning the step. Reports whose output is only set in the
+        configuration of coverage, rather than in their arguments, can't be
+        checked and are generated every time.
+
     :Example:
 
         Here is a fully fledged example that packages source code, runs pytest
@@ -10,6 +10,7 @@ from .. import Step, StepRunner, build_parameters, set_defaults
         "dependencies": ["docformatter"],
         "additional_arguments": ["--recursive", "--check", "--diff"],
         "files": ["."],
+        "cache_results": False,
     }
 )
 class DocFormatter(Step):
@@ -21,14 +22,23 @@ class DocFormatter(Step):
         step: StepRunner,
         files: Sequence[str],
         additional_arguments: List[str],
+        cache_results: bool,
     ) -> None:
-        step.run(["docformatter", *additional_arguments, *files])
+        if cache_results:
+            step.run_on_files(
+                ["docformatter", *additional_arguments],
+                files,
+                config_files=["pyproject.toml", "setup.cfg", "tox.ini"],
+            )
+        else:
+            step.run(["docformatter", *additional_arguments, *files])
 
 
 def docformatter(
     *,
     files: Optional[Sequence[str]] = None,
     additional_arguments: Optional[List[str]] = None,
+    cache_results: Optional[bool] = None,
 ) -> Step:
     """
     Run `docformatter`_ against your python source code.
@@ -41,6 +51,10 @@ def docformatter(
     :param additional_arguments: Additional arguments to pass to the ``docformatter``
                                  invocation.
                                  Defaults to :python:`["--recursive"]`.
+    :param cache_results: Whether to only run ``docformatter`` on the files that changed,
+                          or it did not succeed on, since the last time. See
+                          :py:func:`wast.StepRunner.run_on_files`.
+                          Defaults to :python:`False`.
     :return: The step so that you can add additional parameters to it if needed.
 
     :Examples:
@@ -74,4 +88,5 @@ def docformatter(
     return build_parameters(
         files=files,
         additional_arguments=additional_arguments,
+        cache_results=cache_results,
     )(DocFormatter())
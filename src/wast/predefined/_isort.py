@@ -10,6 +10,7 @@ from .. import Step, StepRunner, build_parameters, set_defaults
         "dependencies": ["isort[colors]"],
         "additional_arguments": ["--check-only", "--diff"],
         "files": ["."],
+        "cache_results": False,
     }
 )
 class Isort(Step):
@@ -21,17 +22,39 @@ class Isort(Step):
         step: StepRunner,
         files: Sequence[str],
         additional_arguments: List[str],
+        cache_results: bool,
     ) -> None:
         if step.config.colors:
             additional_arguments.append("--color")
-
-        step.run(["isort", *additional_arguments, *files])
+        if step.jobs > 1:
+            additional_arguments = [
+                f"--jobs={step.jobs}",
+                *additional_arguments,
+            ]
+
+        if cache_results:
+            # Files passed explicitly are otherwise never skipped
+            step.run_on_files(
+                ["isort", "--filter-files", *additional_arguments],
+                files,
+                extensions=[".py", ".pyi"],
+                config_files=[
+                    ".editorconfig",
+                    ".isort.cfg",
+                    "pyproject.toml",
+                    "setup.cfg",
+                    "tox.ini",
+                ],
+            )
+        else:
+            step.run(["isort", *additional_arguments, *files])
 
 
 def isort(
     *,
     files: Optional[Sequence[str]] = None,
     additional_arguments: Optional[List[str]] = None,
+    cache_results: Optional[bool] = None,
 ) -> Step:
     """
     Run `the isort formatter`_ against your python source code.
@@ -39,11 +62,18 @@ def isort(
     By default, it will depend on :python:`["isort[colors]"]`, when registered
     with :py:func:`wast.register_managed_step`.
 
+    When registered with multiple ``cores``, see :py:func:`wast.register_step`,
+    the number of cores it is granted is passed to ``isort --jobs``.
+
     :param files: The list of files or directories to run ``isort`` against.
                   Defaults to :python:`["."]`.
     :param additional_arguments: Additional arguments to pass to the ``isort``
                                  invocation.
                                  Defaults to :python:`["--check-only", "--diff"]`.
+    :param cache_results: Whether to only run ``isort`` on the files that changed,
+                          or it did not succeed on, since the last time. See
+                          :py:func:`wast.StepRunner.run_on_files`.
+                          Defaults to :python:`False`.
     :return: The step so that you can add additional parameters to it if needed.
 
     .. tip::
@@ -82,4 +112,5 @@ def isort(
     return build_parameters(
         files=files,
         additional_arguments=additional_arguments,
+        cache_results=cache_results,
     )(Isort())
@@ -1,6 +1,11 @@
+import json
 import logging
 import os
-from typing import List, Optional, Sequence
+import signal
+import subprocess
+from contextlib import suppress
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
 
 # XXX: All imports here should be done from the top level. If we need it,
 #      users might need it
@@ -10,17 +15,30 @@ LOGGER = logging.getLogger(__name__)
 
 
 @set_defaults(
-    {"dependencies": ["mypy"], "additional_arguments": [], "files": ["."]}
+    {
+        "dependencies": ["mypy"],
+        "additional_arguments": [],
+        "files": ["."],
+        "cache_in_step": False,
+        "daemon": False,
+    }
 )
 class Mypy(Step):
     def __init__(self) -> None:
         self.__name__ = "mypy"
 
+    def clean(self, step: StepRunner) -> None:
+        # The daemon would otherwise keep running from the environment that
+        # is about to be removed
+        self._stop_daemon(step)
+
     def __call__(
         self,
         step: StepRunner,
         files: Sequence[str],
         additional_arguments: List[str],
+        cache_in_step: bool,
+        daemon: bool,
     ) -> None:
         env = {}
         if step.config.colors:
@@ -35,13 +53,96 @@ class Mypy(Step):
                     "No TERM set, mypy won't be able to show colors"
                 )
 
-        step.run(["mypy", *additional_arguments, *files], env=env)
+        arguments = [*additional_arguments, *files]
+        if cache_in_step:
+            arguments.insert(0, f"--cache-dir={step.cache_path / 'mypy'}")
+
+        if not daemon:
+            step.run(["mypy", *arguments], env=env)
+            return
+
+        # The daemon keeps the modules of the environment it was started
+        # from loaded, it needs to be restarted whenever that changes
+        environment_path = step.cache_path / "dmypy-environment.json"
+        environment = self._get_environment(step)
+        with suppress(FileNotFoundError, ValueError):
+            if json.loads(environment_path.read_text()) != environment:
+                LOGGER.info("The environment of mypy changed")
+                self._stop_daemon(step)
+
+        step.cache_path.mkdir(parents=True, exist_ok=True)
+        environment_path.write_text(json.dumps(environment))
+        # Starting the daemon is done by `dmypy run` when needed, which also
+        # restarts it if the arguments changed
+        step.run(
+            [
+                "dmypy",
+                f"--status-file={self._get_status_file(step)}",
+                "run",
+                f"--log-file={step.cache_path / 'dmypy.log'}",
+                "--",
+                *arguments,
+            ],
+            env=env,
+        )
+
+    def _get_status_file(self, step: StepRunner) -> Path:
+        return step.cache_path / "dmypy.json"
+
+    def _get_environment(self, step: StepRunner) -> Dict[str, Any]:
+        # Recreating the environment rewrites its configuration, and the
+        # installed distributions tell which versions of packages it has
+        try:
+            created = step.venv_path.joinpath("pyvenv.cfg").stat().st_mtime_ns
+        except OSError:
+            created = None
+
+        return {
+            "created": created,
+            "packages": sorted(
+                path.name
+                for path in step.venv_path.glob(
+                    "lib/*/site-packages/*.dist-info"
+                )
+            ),
+        }
+
+    def _stop_daemon(self, step: StepRunner) -> None:
+        status_file = self._get_status_file(step)
+        try:
+            status = json.loads(status_file.read_text())
+        except FileNotFoundError:
+            return
+        except ValueError as exc:
+            LOGGER.debug("Ignoring invalid dmypy status file: %s", exc)
+            status_file.unlink()
+            return
+
+        LOGGER.info("Stopping the mypy daemon")
+        if step.venv_path.joinpath("bin", "dmypy").exists():
+            try:
+                step.run(
+                    ["dmypy", f"--status-file={status_file}", "stop"],
+                    silent_on_success=True,
+                )
+            except subprocess.CalledProcessError:
+                LOGGER.debug("Unable to stop the mypy daemon, killing it")
+            else:
+                return
+
+        # The daemon can't be reached anymore, e.g. its environment went away
+        with suppress(ProcessLookupError, KeyError, TypeError):
+            os.kill(status["pid"], signal.SIGTERM)
+        with suppress(FileNotFoundError):
+            status_file.unlink()
 
 
 def mypy(
     *,
     files: Optional[Sequence[str]] = None,
     additional_arguments: Optional[List[str]] = None,
+    cache_in_step: Optional[bool] = None,
+    daemon: Optional[bool] = None,
 ) -> Step:
     """
     Run `mypy`_ against your python source code.
@@ -55,6 +156,16 @@ def mypy(
     :param additional_arguments: Additional arguments to pass to the ``mypy``
                                  invocation.
                                  Defaults to :python:`[]`.
+    :param cache_in_step: Whether to keep the cache of ``mypy`` in the cache
+                          of the step, instead of the current directory. It
+                          is then removed when cleaning the step.
+                          Defaults to :python:`False`.
+    :param daemon: Whether to run ``mypy`` through its daemon, ``dmypy``.
+                   The daemon is started the first time the step runs, and
+                   reused by later runs, which only check what changed. It
+                   is restarted when the environment of the step changes,
+                   and stopped when cleaning the step.
+                   Defaults to :python:`False`.
     :return: The step so that you can add additional parameters to it if needed.
 
     :Examples:
@@ -66,8 +177,18 @@ def mypy(
                 wast.predefined.mypy(files=["./src"]),
                 dependencies=["mypy", "types-requests"],
             )
+
+        Or, to keep a daemon running between invocations, for fast checks:
+
+        .. code-block::
+
+            wast.register_managed_step(
+                wast.predefined.mypy(cache_in_step=True, daemon=True)
+            )
     """
     return build_parameters(
         files=files,
         additional_arguments=additional_arguments,
+        cache_in_step=cache_in_step,
+        daemon=daemon,
     )(Mypy())
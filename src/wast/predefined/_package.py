@@ -1,7 +1,13 @@
+import email
+import hashlib
+import json
 import logging
+import os
 import shutil
+import zipfile
 from contextlib import suppress
-from typing import Any, Dict, List
+from pathlib import Path
+from typing import Any, Dict, List, Optional
 
 # XXX: All imports here should be done from the top level. If we need it,
 #      users might need it
@@ -38,29 +44,100 @@ class Package(StepWithDependentSetup):
     ) -> None:
         wheels = list(original_step.cache_path.glob("*.whl"))
         assert len(wheels) == 1
+        wheel = wheels[0]
+
+        # Keep track of what was installed in the environment itself, so that
+        # it gets reset together with it
+        marker_path = current_step.venv_path / "wast-installed-wheels.json"
+        try:
+            installed = json.loads(marker_path.read_text())
+        except (OSError, ValueError):
+            installed = {}
+
+        previous = installed.get(original_step.name)
+        current = {
+            "sha256": self._hash_wheel(wheel),
+            "requires": self._get_requirements(wheel),
+        }
+
+        if previous == current:
+            LOGGER.debug("Wheel already installed, skipping")
+            return
+
+        base_command = [current_step.python, "-m", "pip", "install"]
+
+        if previous is None and not self._is_installed(wheel, current_step):
+            # Nothing to reinstall, a single installation gets the wheel and
+            # its dependencies
+            LOGGER.debug("Installing wheel with its dependencies")
+            current_step.run(
+                [*base_command, str(wheel)],
+                silent_on_success=current_step.config.verbosity < 2,
+            )
+        else:
+            self._reinstall(wheel, current_step, previous, current)
+
+        installed[original_step.name] = current
+        tmp_path = marker_path.with_name(f".{marker_path.name}.tmp")
+        tmp_path.write_text(json.dumps(installed))
+        os.replace(tmp_path, marker_path)
+
+    def _reinstall(
+        self,
+        wheel: Path,
+        step: StepRunner,
+        previous: Optional[Dict[str, Any]],
+        current: Dict[str, Any],
+    ) -> None:
+        base_command = [step.python, "-m", "pip", "install"]
+
+        # pip can't force the reinstallation of the wheel alone while
+        # resolving its dependencies, so new ones are installed first
+        if previous is None or previous.get("requires") != current["requires"]:
+            LOGGER.debug("Installing the dependencies of the wheel")
+            step.run(
+                [*base_command, str(wheel)],
+                silent_on_success=step.config.verbosity < 2,
+            )
 
-        LOGGER.debug("Installing wheel with its dependencies")
-        current_step.run(
-            [current_step.python, "-m", "pip", "install", str(wheels[0])],
-            silent_on_success=current_step.config.verbosity < 2,
-        )
+        if previous is None or previous.get("sha256") != current["sha256"]:
+            LOGGER.debug(
+                "Forcing reinstallation of the wheel in case it had code"
+                " changes"
+            )
+            step.run(
+                [*base_command, "--force-reinstall", "--no-deps", str(wheel)],
+                silent_on_success=step.config.verbosity < 2,
+            )
 
-        LOGGER.debug(
-            "Forcing reinstallation of the wheel in case it had code changes"
-        )
-        current_step.run(
-            [
-                current_step.python,
-                "-m",
-                "pip",
-                "install",
-                "--force-reinstall",
-                "--no-deps",
-                str(wheels[0]),
-            ],
-            silent_on_success=current_step.config.verbosity < 2,
+    def _is_installed(self, wheel: Path, step: StepRunner) -> bool:
+        # The wheel can be there without wast having installed it, e.g. if the
+        # step installs the project itself
+        name = wheel.name.split("-", 1)[0]
+        return any(
+            step.venv_path.glob(f"lib/*/site-packages/{name}-*.dist-info")
         )
 
+    def _hash_wheel(self, wheel: Path) -> str:
+        # Rebuilding a wheel from the same sources does not give the same
+        # archive, as it contains timestamps, so only hash the files in it
+        digest = hashlib.sha256()
+        with zipfile.ZipFile(wheel) as archive:
+            for name in sorted(archive.namelist()):
+                digest.update(name.encode())
+                digest.update(archive.read(name))
+        return digest.hexdigest()
+
+    def _get_requirements(self, wheel: Path) -> List[str]:
+        with zipfile.ZipFile(wheel) as archive:
+            for name in archive.namelist():
+                if name.count("/") == 1 and name.endswith(
+                    ".dist-info/METADATA"
+                ):
+                    metadata = email.message_from_bytes(archive.read(name))
+                    return sorted(metadata.get_all("Requires-Dist", []))
+        return []
+
     def __call__(self, step: StepRunner, isolate: bool) -> None:
         with suppress(FileNotFoundError):
             shutil.rmtree(step.cache_path)
@@ -96,7 +173,12 @@ def package(*, isolate: bool = True) -> Step:
     and a universal wheel (assuming there are no c-extensions).
 
     When this step is used as a requirement for another step, it will also
-    install the wheel inside it.
+    install the wheel inside it. This is skipped when the wheel did not
+    change, and only the wheel itself is reinstalled when only its code
+    changed. Installing the wheel for the first time takes a single ``pip``
+    call, but when the dependencies of an installed wheel changed, they are
+    installed first, as ``pip`` can't force the reinstallation of the wheel
+    alone while resolving its dependencies.
 
     This allows you to only build the sdist and wheel once, and then install
     your package in various different other steps, speeding up your whole
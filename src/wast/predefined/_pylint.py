@@ -10,6 +10,7 @@ from .. import Step, StepRunner, build_parameters, set_defaults
         "dependencies": ["pylint"],
         "additional_arguments": [],
         "files": ["."],
+        "cache_results": False,
     }
 )
 class Pylint(Step):
@@ -21,6 +22,7 @@ class Pylint(Step):
         step: StepRunner,
         files: Sequence[str],
         additional_arguments: List[str],
+        cache_results: bool,
     ) -> None:
         if step.config.colors and not [
             p
@@ -28,15 +30,34 @@ class Pylint(Step):
             if p.startswith("--output-format") or p.startswith("-f")
         ]:
             additional_arguments.append("--output-format=colorized")
+        if step.jobs > 1:
+            additional_arguments = [
+                f"--jobs={step.jobs}",
+                *additional_arguments,
+            ]
 
-        cmd = ["pylint", *additional_arguments, *files]
-        step.run(cmd)
+        if cache_results:
+            step.run_on_files(
+                ["pylint", *additional_arguments],
+                files,
+                config_files=[
+                    ".pylintrc",
+                    "pylintrc",
+                    "pyproject.toml",
+                    "setup.cfg",
+                    "tox.ini",
+                ],
+            )
+        else:
+            cmd = ["pylint", *additional_arguments, *files]
+            step.run(cmd)
 
 
 def pylint(
     *,
     files: Optional[Sequence[str]] = None,
     additional_arguments: Optional[Sequence[str]] = None,
+    cache_results: Optional[bool] = None,
 ) -> Step:
     """
     Run `pylint`_ against your source code.
@@ -44,11 +65,20 @@ def pylint(
     By default, it will depend on :python:`["pylint"]`, when registered with
     :py:func:`wast.register_managed_step`.
 
+    When registered with multiple ``cores``, see :py:func:`wast.register_step`,
+    the number of cores it is granted is passed to ``pylint --jobs``.
+
     :param files: The list of files or directories to run ``pylint`` against.
                   Defaults to :python:`["."]`.
     :param additional_arguments: Additional arguments to pass to the ``pylint``
                                  invocation.
                                  Defaults to :python:`[]`.
+    :param cache_results: Whether to only run ``pylint`` on the files that changed,
+                          or it did not succeed on, since the last time. See
+                          :py:func:`wast.StepRunner.run_on_files`. Checks
+                          spanning multiple modules are then only done again
+                          for the modules that changed.
+                          Defaults to :python:`False`.
     :return: The step so that you can add additional parameters to it if needed.
 
     :Examples:
@@ -65,4 +95,5 @@ def pylint(
     return build_parameters(
         files=files,
         additional_arguments=additional_arguments,
+        cache_results=cache_results,
     )(Pylint())
@@ -1,15 +1,89 @@
+import json
 import logging
+import os
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 # XXX: All imports here should be done from the top level. If we need it,
 #      users might need it
-from .. import Step, StepRunner, parametrize, set_defaults
+from .. import (
+    BaseWastException,
+    Step,
+    StepRunner,
+    parametrize,
+    set_defaults,
+)
 
 LOGGER = logging.getLogger(__name__)
 
+# Name of the file in the cache of each shard where the duration of the tests
+# it ran is recorded
+_DURATIONS_FILE = "pytest-durations.json"
 
-@set_defaults({"dependencies": ["pytest"], "args": []})
+# Runs pytest, only keeping the tests of the current shard. This runs in the
+# environment of the step, and thus only relies on pytest itself.
+_RUN_SHARD = """\
+import json
+import os
+import sys
+
+import pytest
+
+
+class ShardPlugin:
+    def __init__(self):
+        index, count = os.environ["WAST_PYTEST_SHARD"].split("/")
+        self.index = int(index) - 1
+        self.count = int(count)
+        self.durations = {}
+        self.emptied = False
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, config, items):
+        with open(os.environ["WAST_PYTEST_DURATIONS"]) as fp:
+            known = json.load(fp)
+        default = sum(known.values()) / len(known) if known else 1.0
+
+        # Give the slowest tests first to the least loaded shard. All shards
+        # compute the same split, as they collect the same tests.
+        loads = [0.0] * self.count
+        selected = set()
+        for item in sorted(
+            items, key=lambda item: (-known.get(item.nodeid, default), item.nodeid)
+        ):
+            shard = min(range(self.count), key=lambda i: (loads[i], i))
+            loads[shard] += known.get(item.nodeid, default)
+            if shard == self.index:
+                selected.add(item.nodeid)
+
+        deselected = [item for item in items if item.nodeid not in selected]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+        self.emptied = bool(items) and not selected
+        items[:] = [item for item in items if item.nodeid in selected]
+
+    def pytest_runtest_logreport(self, report):
+        self.durations[report.nodeid] = (
+            self.durations.get(report.nodeid, 0.0) + report.duration
+        )
+
+    def pytest_sessionfinish(self):
+        with open(os.environ["WAST_PYTEST_DURATIONS_OUTPUT"], "w") as fp:
+            json.dump(self.durations, fp)
+
+
+# Behave like the pytest script, which does not add the current directory
+sys.path.pop(0)
+plugin = ShardPlugin()
+exit_code = pytest.main(sys.argv[1:], plugins=[plugin])
+# Having more shards than tests is not an error
+if exit_code == pytest.ExitCode.NO_TESTS_COLLECTED and plugin.emptied:
+    exit_code = pytest.ExitCode.OK
+sys.exit(exit_code)
+"""
+
+
+@set_defaults({"dependencies": ["pytest"], "args": [], "shard": None})
 class Pytest(Step):
     def __init__(self) -> None:
         self.__name__ = "pytest"
@@ -21,25 +95,129 @@ class Pytest(Step):
 
         return {"coverage_files": [str(coverage_file)]}
 
-    def __call__(self, step: StepRunner, args: Sequence[str]) -> None:
+    def __call__(
+        self,
+        step: StepRunner,
+        args: Sequence[str],
+        shard: Optional[Tuple[int, int]],
+    ) -> None:
+        env = {"COVERAGE_FILE": str(self._get_coverage_file(step))}
+        if shard is None:
+            if step.jobs > 1 and any(
+                step.venv_path.glob(
+                    "lib/*/site-packages/pytest_xdist-*.dist-info"
+                )
+            ):
+                args = ["-n", str(step.jobs), *args]
+
+            step.run(["pytest", *args], env=env)
+            return
+
+        # Shards don't use pytest-xdist, as its workers would not know which
+        # tests belong to the current shard
+
+        index, count = shard
+        step.cache_path.mkdir(parents=True, exist_ok=True)
+        known_durations = self._update_known_durations(step, index, count)
+
         step.run(
-            ["pytest", *args],
-            env={"COVERAGE_FILE": str(self._get_coverage_file(step))},
+            ["python", "-c", _RUN_SHARD, *args],
+            env={
+                **env,
+                "WAST_PYTEST_SHARD": f"{index}/{count}",
+                "WAST_PYTEST_DURATIONS": str(known_durations),
+                "WAST_PYTEST_DURATIONS_OUTPUT": str(
+                    step.cache_path / _DURATIONS_FILE
+                ),
+            },
         )
 
     def _get_coverage_file(self, step: StepRunner) -> Path:
         return step.cache_path / "reports" / "coverage"
 
+    def _update_known_durations(
+        self, step: StepRunner, index: int, count: int
+    ) -> Path:
+        # All shards need to see the same durations in order to split the tests
+        # the same way, even when some of them already ran in the current
+        # invocation. They thus share a snapshot, kept in the cache of the first
+        # shard, which only takes the durations recorded by the shards into
+        # account once all of them ran again since it was last updated.
+        # The caches of the other shards only differ by the escaped shard id
+        shard_id = f"shard-{index}-{count}"
+        caches = [
+            step.cache_path.with_name(
+                step.cache_path.name.replace(
+                    shard_id, f"shard-{other}-{count}"
+                )
+            )
+            for other in range(1, count + 1)
+        ]
+        known_durations = caches[0] / "known-durations.json"
+
+        snapshot_mtime = _get_mtime(known_durations)
+        recorded = [cache / _DURATIONS_FILE for cache in caches]
+        recorded_mtimes = [_get_mtime(path) for path in recorded]
+        if snapshot_mtime is not None and not all(
+            mtime is not None and mtime > snapshot_mtime
+            for mtime in recorded_mtimes
+        ):
+            return known_durations
 
-def pytest(*, args: Optional[Sequence[str]] = None) -> Step:
+        durations = _load_durations(known_durations)
+        for path in recorded:
+            durations.update(_load_durations(path))
+
+        LOGGER.debug(
+            "Updating the known test durations in %s", known_durations
+        )
+        known_durations.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = known_durations.with_name(f".{known_durations.name}.tmp")
+        tmp_path.write_text(json.dumps(durations), encoding="utf-8")
+        os.replace(tmp_path, known_durations)
+        return known_durations
+
+
+def _get_mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _load_durations(path: Path) -> Dict[str, float]:
+    try:
+        with path.open(encoding="utf-8") as fp:
+            durations: Dict[str, float] = json.load(fp)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as exc:
+        LOGGER.debug("Ignoring invalid durations in %s: %s", path, exc)
+        return {}
+    return durations
+
+
+def pytest(
+    *, args: Optional[Sequence[str]] = None, shards: Optional[int] = None
+) -> Step:
     """
     Run `pytest`_.
 
     By default, it will depend on :python:`["pytest"]`, when registered with
     :py:func:`wast.register_managed_step`.
 
+    When registered with multiple ``cores``, see :py:func:`wast.register_step`,
+    and if ``pytest-xdist`` is installed, the tests are distributed over the
+    number of cores it is granted, unless they are split in shards.
+
     :param args: arguments to pass to the ``pytest`` invocation.
                  Defaults to :python:`[]`.
+    :param shards: split the tests in this many steps, that can run in
+                   parallel, named ``pytest[shard-1/N]`` to
+                   ``pytest[shard-N/N]``. Tests are split based on how long
+                   they took in previous runs, in order for all shards to take
+                   about as long.
+                   Defaults to not splitting the tests.
     :return: The step so that you can add additional parameters to it if needed.
 
     .. tip::
@@ -48,6 +226,11 @@ def pytest(*, args: Optional[Sequence[str]] = None) -> Step:
         ``coverage_files`` :term:`artifact` that can be used by dependent steps,
         for an example, see :py:func:`coverage`
 
+    .. note::
+
+        When splitting the tests in shards, each shard collects all the tests
+        before running its own, and exposes its own ``coverage_files``.
+
     :Examples:
 
         For running pytest with the a specific version of python, with your
@@ -93,10 +276,35 @@ def pytest(*, args: Optional[Sequence[str]] = None) -> Step:
                     )(wast.predefined.pytest()),
                 requires=["package"],
             )
+
+        Or, to split a slow test suite in 4 steps that can run in parallel,
+        and combine their coverage:
+
+        .. code-block::
+
+            wast.register_managed_step(
+                wast.predefined.pytest(args=["--cov"], shards=4),
+                dependencies=["pytest", "pytest-cov"],
+            )
+            wast.register_managed_step(
+                wast.predefined.coverage(), requires=["pytest"]
+            )
     """
     pytest_ = Pytest()
 
     if args is not None:
         pytest_ = parametrize("args", [args])(pytest_)
 
+    if shards is not None:
+        if shards < 1:
+            raise BaseWastException(
+                f"pytest needs at least one shard, got {shards}"
+            )
+
+        pytest_ = parametrize(
+            "shard",
+            [(index, shards) for index in range(1, shards + 1)],
+            ids=[f"shard-{index}/{shards}" for index in range(1, shards + 1)],
+        )(pytest_)
+
     return pytest_
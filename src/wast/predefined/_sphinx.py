@@ -56,6 +56,8 @@ class Sphinx(Step):
 
         if warning_as_error:
             command.append("-W")
+        if step.jobs > 1:
+            command.append(f"-j={step.jobs}")
 
         step.run(command)
 
@@ -73,6 +75,9 @@ def sphinx(
     By default, it will depend on :python:`["sphinx"]`, when registered with
     :py:func:`wast.register_managed_step`.
 
+    When registered with multiple ``cores``, see :py:func:`wast.register_step`,
+    the number of cores it is granted is passed to ``sphinx-build -j``.
+
     :param builder: The sphinx builder to use.
                     Defaults to :python:`"html"`.
     :param sourcedir: The directory in which the ``conf.py`` resides.
@@ -10,6 +10,7 @@ from .. import Step, StepRunner, build_parameters, set_defaults
         "dependencies": ["unimport"],
         "files": ["."],
         "additional_arguments": ["--check", "--diff", "--gitignore"],
+        "cache_results": False,
     }
 )
 class Unimport(Step):
@@ -21,6 +22,7 @@ class Unimport(Step):
         step: StepRunner,
         files: Sequence[str],
         additional_arguments: List[str],
+        cache_results: bool,
     ) -> None:
         if not any(arg.startswith("--color") for arg in additional_arguments):
             color_arg = (
@@ -28,13 +30,21 @@ class Unimport(Step):
             )
             additional_arguments.append(color_arg)
 
-        step.run(["unimport", *additional_arguments, *files])
+        if cache_results:
+            step.run_on_files(
+                ["unimport", *additional_arguments],
+                files,
+                config_files=["pyproject.toml", "setup.cfg"],
+            )
+        else:
+            step.run(["unimport", *additional_arguments, *files])
 
 
 def unimport(
     *,
     files: Optional[Sequence[str]] = None,
     additional_arguments: Optional[List[str]] = None,
+    cache_results: Optional[bool] = None,
 ) -> Step:
     """
     Run `the Unimport formatter`_ against your python source code.
@@ -47,6 +57,10 @@ def unimport(
     :param additional_arguments: Additional arguments to pass to the ``unimport``
                                  invocation.
                                  Defaults to :python:`["--check", "--diff", "--gitignore"]`.
+    :param cache_results: Whether to only run ``unimport`` on the files that changed,
+                          or it did not succeed on, since the last time. See
+                          :py:func:`wast.StepRunner.run_on_files`.
+                          Defaults to :python:`False`.
     :return: The step so that you can add additional parameters to it if needed.
 
     :Examples:
@@ -100,5 +114,7 @@ def unimport(
         unimport run first.
     """
     return build_parameters(
-        files=files, additional_arguments=additional_arguments
+        files=files,
+        additional_arguments=additional_arguments,
+        cache_results=cache_results,
     )(Unimport())
@@ -26,3 +26,49 @@ register_managed_step(black(additional_arguments=[]))
 
     cli([])
     assert wastfile_path.read_text() != wastfile_content
+
+
+def test_can_only_check_changed_files(cli, tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text("""\
+from wast import register_managed_step
+from wast.predefined import black
+
+register_managed_step(black(cache_results=True))
+""")
+    tmp_path.joinpath("module.py").write_text("x = 1\n")
+
+    result = cli([])
+    assert "Running on 2 of 2 files" in result.stderr
+
+    result = cli([])
+    assert "All 2 files passed previously" in result.stderr
+
+    tmp_path.joinpath("module.py").write_text("x=2\n")
+    result = cli([], raise_on_error=False)
+    assert result.exit_code == 1
+    assert "Running on 1 of 2 files" in result.stderr
+
+    # Files that did not pass are checked again
+    result = cli([], raise_on_error=False)
+    assert "Running on 1 of 2 files" in result.stderr
+
+
+def test_only_checks_failing_files_again(cli, monkeypatch, tmp_path):
+    monkeypatch.setattr("wast._steps.handlers._FILES_PER_RUN", 1)
+    tmp_path.joinpath("wastfile.py").write_text("""\
+from wast import register_managed_step
+from wast.predefined import black
+
+register_managed_step(black(cache_results=True))
+""")
+    tmp_path.joinpath("module.py").write_text("x = 1\n")
+    tmp_path.joinpath("broken.py").write_text("x=2\n")
+
+    result = cli([], raise_on_error=False)
+    assert result.exit_code == 1
+    assert "Running on 3 of 3 files" in result.stderr
+
+    # The files that passed alongside the failing one are not checked again
+    result = cli([], raise_on_error=False)
+    assert result.exit_code == 1
+    assert "Running on 1 of 3 files" in result.stderr
@@ -0,0 +1,87 @@
+import subprocess
+import sys
+
+
+def test_combines_incrementally_and_caches_reports(cli, tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text("""\
+import glob
+
+from wast import register_managed_step, register_step
+from wast.predefined import coverage
+
+class Measure:
+    def __init__(self):
+        self.__name__ = "measure"
+
+    def gather_artifacts(self, step):
+        return {"coverage_files": sorted(glob.glob("data/*"))}
+
+    def __call__(self, step):
+        pass
+
+register_step(Measure())
+register_managed_step(
+    coverage(
+        reports=[
+            ["xml", "-o", "coverage.xml"],
+            ["json", "--rcfile=custom.cfg"],
+            ["report"],
+        ]
+    ),
+    requires=["measure"],
+)
+""")
+    tmp_path.joinpath("custom.cfg").write_text("[run]\n")
+    tmp_path.joinpath("module.py").write_text(
+        "import sys\nif len(sys.argv) > 1:\n    print('a')\nelse:\n    print('b')\n"
+    )
+
+    def measure(name, *args):
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "coverage",
+                "run",
+                f"--data-file=data/{name}",
+                "module.py",
+                *args,
+            ],
+            check=True,
+        )
+
+    measure("first")
+    measure("second", "arg")
+
+    result = cli([])
+    assert "Combining 2 coverage files" in result.stderr
+    assert tmp_path.joinpath("coverage.xml").exists()
+    assert tmp_path.joinpath("coverage.json").exists()
+    assert "100%" in result.stdout
+
+    result = cli([])
+    assert "Coverage data did not change" in result.stderr
+    assert "Report 'xml -o coverage.xml' is up to date" in result.stderr
+    assert "Report 'json --rcfile=custom.cfg' is up to date" in result.stderr
+    # Terminal reports always run
+    assert "100%" in result.stdout
+
+    # Reports are generated again when what they wrote went away, or when
+    # the configuration they were given changed
+    tmp_path.joinpath("coverage.xml").unlink()
+    tmp_path.joinpath("custom.cfg").write_text("[run]\nbranch = False\n")
+    result = cli([])
+    assert "Report 'xml -o coverage.xml' is up to date" not in result.stderr
+    assert (
+        "Report 'json --rcfile=custom.cfg' is up to date" not in result.stderr
+    )
+    assert tmp_path.joinpath("coverage.xml").exists()
+
+    measure("third")
+    result = cli([])
+    assert "Adding 1 new coverage files" in result.stderr
+    assert tmp_path.joinpath("coverage.xml").exists()
+
+    measure("first", "arg")
+    result = cli([])
+    assert "Combining 3 coverage files" in result.stderr
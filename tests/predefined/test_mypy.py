@@ -0,0 +1,23 @@
+def test_daemon_is_reused_and_stopped_on_clean(cli, tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text("""\
+from wast import register_managed_step
+from wast.predefined import mypy
+
+register_managed_step(
+    mypy(files=["module.py"], cache_in_step=True, daemon=True)
+)
+""")
+    tmp_path.joinpath("module.py").write_text("x: int = 1\n")
+
+    try:
+        result = cli([])
+        assert "Daemon started" in result.stdout
+
+        tmp_path.joinpath("module.py").write_text("x: int = '1'\n")
+        result = cli([], raise_on_error=False)
+        assert result.exit_code == 1
+        assert "Daemon started" not in result.stdout
+        assert "Incompatible types in assignment" in result.stdout
+    finally:
+        result = cli(["--clean", "--setup-only"])
+        assert "Stopping the mypy daemon" in result.stderr
@@ -0,0 +1,41 @@
+def test_only_reinstalls_changed_wheels(cli, tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text("""\
+from wast import register_managed_step, register_step
+from wast.predefined import package
+
+register_managed_step(
+    package(isolate=False), ["build", "setuptools>=61.0.0", "wheel"]
+)
+
+def check(step):
+    step.run(["python", "-c", "import sample; print(sample.VALUE)"])
+
+register_step(check, requires=["package"])
+""")
+    tmp_path.joinpath("pyproject.toml").write_text("""\
+[build-system]
+requires = ["setuptools>=61.0.0"]
+build-backend = "setuptools.build_meta"
+
+[project]
+name = "sample"
+version = "1.0.0"
+
+[tool.setuptools]
+py-modules = ["sample"]
+""")
+    tmp_path.joinpath("sample.py").write_text("VALUE = 1\n")
+
+    result = cli(["-s", "check"])
+    assert "Installing wheel with its dependencies" in result.stderr
+    assert "Forcing reinstallation of the wheel" not in result.stderr
+
+    tmp_path.joinpath("sample.py").write_text("VALUE = 2\n")
+    result = cli(["-s", "check"])
+    assert "Installing wheel with its dependencies" not in result.stderr
+    assert "Installing the dependencies of the wheel" not in result.stderr
+    assert "Forcing reinstallation of the wheel" in result.stderr
+    assert "2" in result.stdout.splitlines()
+
+    result = cli(["-s", "check"])
+    assert "Wheel already installed, skipping" in result.stderr
@@ -0,0 +1,32 @@
+import re
+
+
+def test_shards_split_tests_by_duration(cli, tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text("""\
+from wast import register_managed_step
+from wast.predefined import pytest
+
+register_managed_step(pytest(args=["-p", "no:cacheprovider"], shards=3))
+""")
+    tmp_path.joinpath("test_sample.py").write_text("""\
+import time
+
+import pytest
+
+@pytest.mark.parametrize("delay", [0.4, 0.2, 0, 0, 0])
+def test_sleep(delay):
+    time.sleep(delay)
+""")
+
+    def get_passed_per_shard():
+        output = re.sub(r"\x1b\[\d+(;\d+)*m", "", cli([]).stdout)
+        return [
+            int(passed)
+            for passed in re.findall(r"(\d+) passed, \d+ deselected", output)
+        ]
+
+    # Without known durations, tests are split evenly
+    assert sorted(get_passed_per_shard()) == [1, 2, 2]
+
+    # Each of the slow tests is then alone in its shard
+    assert sorted(get_passed_per_shard()) == [1, 1, 3]
@@ -1,3 +1,8 @@
+import os
+import re
+import sys
+import time
+
 import pytest
 
 
@@ -28,3 +33,206 @@ def test_handles_invalid_wastfile_nicely(
         cli([])
 
     assert expected_error in str(exc_wrapper.value)
+
+
+def test_skips_steps_whose_inputs_did_not_change(cli, tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text(
+        """\
+from wast import step
+
+@step(inputs=["*.txt"])
+def check(step):
+    pass
+"""
+    )
+    tmp_path.joinpath("input.txt").write_text("one")
+
+    assert "check: success" in cli([]).stderr
+    assert "check: up to date" in cli([]).stderr
+
+    tmp_path.joinpath("input.txt").write_text("two")
+    result = cli(["--explain"])
+    assert "modified input files: input.txt" in result.stderr
+    assert "check: success" in result.stderr
+
+
+def test_steps_are_not_up_to_date_once_their_requirements_ran(cli, tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text("""\
+from wast import step
+
+@step()
+def build(step):
+    pass
+
+@step(inputs=["*.txt"], requires=["build"])
+def check(step):
+    pass
+""")
+    tmp_path.joinpath("input.txt").write_text("one")
+
+    assert "check: success" in cli([]).stderr
+    assert "check: up to date" in cli(["--only", "check"]).stderr
+
+    # Even when the requirement ran in a previous invocation
+    cli(["--only", "build"])
+    result = cli(["--only", "check", "--explain"])
+    assert "requirements changed" in result.stderr
+    assert "check: success" in result.stderr
+
+
+def test_asyncio_engine_kills_running_commands_on_failure(cli, tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text("""\
+import time
+from wast import step
+
+@step()
+def slow(step):
+    step.run(["sleep", "60"], external_command=True)
+
+@step()
+def fail(step):
+    # Ensure the other step started
+    time.sleep(1)
+    raise Exception("failure")
+""")
+
+    start = time.monotonic()
+    result = cli(
+        ["--engine", "asyncio", "--fail-fast", "--jobs", "2"],
+        raise_on_error=False,
+    )
+
+    assert time.monotonic() - start < 30
+    assert "slow: Cancelled" in result.stderr
+    assert "fail: error: failure" in result.stderr
+
+
+def test_can_run_steps_in_worker_processes(cli, tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text(f"""\
+import os
+from wast import register_step, step
+
+class Generate:
+    __name__ = "generate"
+
+    def __call__(self):
+        print("generate in worker:", os.getpid() != {os.getpid()})
+
+    def gather_artifacts(self, step):
+        return {{"pids": [os.getpid()]}}
+
+register_step(Generate(), run_in_process=True)
+
+@step(requires=["generate"])
+def use(step):
+    pids = step.get_artifacts("pids")
+    print("artifacts from worker:", pids[0] != {os.getpid()})
+""")
+
+    result = cli([])
+    assert "generate in worker: True" in result.stdout
+    assert "artifacts from worker: True" in result.stdout
+
+
+def test_steps_are_granted_the_cores_they_can_use(cli, tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text("""\
+from wast import step
+
+@step(cores=0)
+def parallel(step):
+    print("parallel jobs:", step.jobs)
+
+@step(cores=2, run_in_process=True)
+def bounded(step):
+    print("bounded jobs:", step.jobs)
+
+@step()
+def serial(step):
+    print("serial jobs:", step.jobs)
+""")
+
+    result = cli(["--cores", "3"])
+    assert "parallel jobs: 3" in result.stdout
+    assert "bounded jobs: 2" in result.stdout
+    assert "serial jobs: 1" in result.stdout
+
+
+def test_jobs_are_not_limited_by_cores_unless_steps_use_them(
+    cli, tmp_path, monkeypatch
+):
+    tmp_path.joinpath("wastfile.py").write_text("""\
+import threading
+from wast import step
+
+both_running = threading.Barrier(2, timeout=10)
+
+@step()
+def first(step):
+    both_running.wait()
+
+@step()
+def second(step):
+    both_running.wait()
+""")
+    monkeypatch.setattr("os.cpu_count", lambda: 1)
+
+    cli(["--jobs", "2"])
+
+
+def test_live_output_prefixes_lines_and_reports_failures_early(cli, tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text("""\
+from wast import step
+
+@step()
+def success(step):
+    step.run(["sh", "-c", "echo one; printf two"], external_command=True)
+
+@step(requires=["success"])
+def fail(step):
+    step.run(["sh", "-c", "exit 1"], external_command=True)
+""")
+
+    result = cli(["--jobs", "2", "--live-output"], raise_on_error=False)
+
+    stdout = re.sub(r"\x1b\[\d+m", "", result.stdout).splitlines()
+    assert stdout == ["success | one", "success | two"]
+    stderr = re.sub(r"\x1b\[\d+m", "", result.stderr).splitlines()
+    assert "success | wast > --- Step: success ---" in stderr
+    errors = [i for i, line in enumerate(stderr) if "fail: error:" in line]
+    summary = stderr.index("wast > *** Steps summary ***")
+    # Reported once as soon as it failed, and once in the summary
+    assert errors[0] < summary < errors[1]
+
+
+def test_listing_steps_uses_the_step_index(cli, monkeypatch, tmp_path):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    tmp_path.joinpath("helpers.py").write_text("NAMES = ['one', 'two']\n")
+    tmp_path.joinpath("wastfile.py").write_text("""\
+from pathlib import Path
+
+from helpers import NAMES
+from wast import parametrize, step
+
+# Record each time the definition is executed
+with Path("executions").open("a") as fp:
+    fp.write("x")
+
+@parametrize("name", NAMES)
+@step()
+def check(step, name):
+    pass
+""")
+
+    def list_steps():
+        # Not importing the helpers from a previous run
+        sys.modules.pop("helpers", None)
+        result = cli(["--list"])
+        return re.findall(r"\* (check[^\s\x1b]*)", result.stderr)
+
+    assert list_steps() == ["check", "check[one]", "check[two]"]
+    assert list_steps() == ["check", "check[one]", "check[two]"]
+    assert tmp_path.joinpath("executions").read_text() == "x"
+
+    tmp_path.joinpath("helpers.py").write_text("NAMES = ['one', 'three']\n")
+    assert list_steps() == ["check", "check[one]", "check[three]"]
+    assert tmp_path.joinpath("executions").read_text() == "xx"
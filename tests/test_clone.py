@@ -0,0 +1,26 @@
+from wast._clone import clone_tree, replace_in_file
+
+
+def test_clone_tree_keeps_symlinks_and_never_modifies_source(tmp_path):
+    source = tmp_path / "source"
+    source.joinpath("bin").mkdir(parents=True)
+    source.joinpath("bin/script").write_text(f"#!{source}/bin/python\n")
+    source.joinpath("bin/python").symlink_to("/usr/bin/python3")
+    source.joinpath("lib64").symlink_to("bin")
+
+    clone_tree(source, tmp_path / "clone")
+    replace_in_file(
+        tmp_path / "clone/bin/script", str(source), str(tmp_path / "clone")
+    )
+
+    assert (
+        tmp_path.joinpath("clone/bin/script").read_text()
+        == f"#!{tmp_path}/clone/bin/python\n"
+    )
+    assert (
+        source.joinpath("bin/script").read_text() == f"#!{source}/bin/python\n"
+    )
+    assert tmp_path.joinpath("clone/lib64").readlink().name == "bin"
+    assert str(tmp_path.joinpath("clone/bin/python").readlink()) == (
+        "/usr/bin/python3"
+    )
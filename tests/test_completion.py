@@ -0,0 +1,47 @@
+import shutil
+import subprocess
+
+import pytest
+
+from wast._step_index import IndexedStep, StepIndex
+
+
+@pytest.mark.skipif(shutil.which("bash") is None, reason="requires bash")
+@pytest.mark.parametrize(
+    ("line", "expected"),
+    (
+        pytest.param("wast -s ", ["black", "black:fix", "pytest[3.10]"]),
+        pytest.param("wast --only py", ["pytest[3.10]"], id="prefix"),
+        pytest.param("wast -e black:", ["fix"], id="word-break"),
+        pytest.param("wast --step=black,py", ["black,pytest[3.10]"]),
+        pytest.param("wast --ski", ["--skip-missing-interpreters"]),
+    ),
+)
+def test_bash_completion(cli, tmp_path, line, expected):
+    StepIndex(tmp_path / ".wast/step-index.json").save(
+        str(tmp_path / "wastfile.py"),
+        [],
+        {
+            name: IndexedStep([], True)
+            for name in ["pytest[3.10]", "black:fix", "black"]
+        },
+    )
+    script = cli(["--completion", "bash"]).stdout
+
+    result = subprocess.run(
+        [
+            "bash",
+            "-c",
+            f"""\
+{script}
+COMP_LINE='{line}'
+COMP_POINT=${{#COMP_LINE}}
+_wast
+printf '%s\\n' "${{COMPREPLY[@]}}"
+""",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    assert result.stdout.splitlines() == expected
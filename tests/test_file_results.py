@@ -0,0 +1,34 @@
+from wast._file_results import FileResults, expand_files
+
+
+def test_expand_files_keeps_files_with_extensions(tmp_path):
+    tmp_path.joinpath("cache").mkdir()
+    tmp_path.joinpath("cache/ignored.py").write_text("")
+    tmp_path.joinpath(".hidden").mkdir()
+    tmp_path.joinpath(".hidden/ignored.py").write_text("")
+    tmp_path.joinpath("src").mkdir()
+    tmp_path.joinpath("src/module.py").write_text("")
+    tmp_path.joinpath("src/data.json").write_text("")
+    tmp_path.joinpath("setup.cfg").write_text("")
+
+    assert expand_files([".", "setup.cfg"], [".py"], tmp_path / "cache") == [
+        "src/module.py",
+        "setup.cfg",
+    ]
+
+
+def test_only_files_that_changed_or_did_not_pass_are_pending(tmp_path):
+    for name in ["passed.py", "changed.py", "failed.py"]:
+        tmp_path.joinpath(name).write_text("content")
+    files = ["passed.py", "changed.py", "failed.py"]
+    results_path = tmp_path / "cache/results.json"
+
+    results = FileResults(results_path, "key")
+    assert results.get_pending(files) == files
+    results.record_passed(["passed.py", "changed.py"])
+
+    tmp_path.joinpath("changed.py").write_text("new content")
+
+    results = FileResults(results_path, "key")
+    assert results.get_pending(files) == ["changed.py", "failed.py"]
+    assert FileResults(results_path, "other-key").get_pending(files) == files
@@ -0,0 +1,45 @@
+from wast._fingerprint import explain_changes, hash_files
+
+
+def test_hash_files_ignores_excluded_directory(tmp_path):
+    tmp_path.joinpath("cache").mkdir()
+    tmp_path.joinpath("cache/ignored.py").write_text("")
+    tmp_path.joinpath("file.py").write_text("")
+
+    assert list(hash_files(["**/*.py"], tmp_path / "cache")) == ["file.py"]
+
+
+def test_hash_files_reuses_hashes_of_unchanged_files(tmp_path):
+    tmp_path.joinpath("file.py").write_text("content")
+    files = hash_files(["*.py"], tmp_path / "cache")
+    files["file.py"]["sha256"] = "cached"
+
+    assert hash_files(["*.py"], tmp_path / "cache", files) == files
+
+
+def test_explain_changes(tmp_path):
+    tmp_path.joinpath("modified.py").write_text("old")
+    tmp_path.joinpath("removed.py").write_text("")
+    old = {
+        "files": hash_files(["*.py"], tmp_path / "cache"),
+        "parameters": "1",
+        "interpreter": "python",
+    }
+
+    tmp_path.joinpath("modified.py").write_text("new")
+    tmp_path.joinpath("removed.py").unlink()
+    tmp_path.joinpath("added.py").write_text("")
+    new = {
+        "files": hash_files(["*.py"], tmp_path / "cache"),
+        "parameters": "2",
+        "interpreter": "python",
+    }
+
+    assert explain_changes(old, old) == []
+    assert explain_changes(None, new) == ["no successful run was recorded"]
+    assert explain_changes(old, new) == [
+        "parameters changed",
+        "added input files: added.py",
+        "removed input files: removed.py",
+        "modified input files: modified.py",
+    ]
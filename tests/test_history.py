@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from wast._history import TimingHistory
+
+
+def _record(history, step, seconds, outcome="success"):
+    history.record(
+        step,
+        outcome,
+        timedelta(seconds=seconds),
+        {"setup": timedelta(), "run": timedelta(seconds=seconds)},
+    )
+
+
+def test_history_is_persisted(tmp_path):
+    path = tmp_path / "history.jsonl"
+    history = TimingHistory(path)
+    _record(history, "step", 1)
+    _record(history, "step", 3)
+    _record(history, "step", 100, outcome="failure")
+    history.save()
+
+    history = TimingHistory(path)
+    assert history.get_duration("step") == timedelta(seconds=2)
+    assert [e.outcome for e in history.get_entries("step")] == [
+        "success",
+        "success",
+        "failure",
+    ]
+
+
+def test_history_keeps_a_bounded_window(tmp_path):
+    path = tmp_path / "history.jsonl"
+
+    for index in range(10):
+        history = TimingHistory(path, window=3)
+        _record(history, "step", index)
+        history.save()
+
+    history = TimingHistory(path, window=3)
+    assert [e.duration for e in history.get_entries("step")] == [7, 8, 9]
+    assert len(path.read_text().splitlines()) <= 6
+
+
+def test_history_ignores_invalid_entries(tmp_path):
+    path = tmp_path / "history.jsonl"
+    history = TimingHistory(path)
+    _record(history, "step", 1)
+    history.save()
+
+    with path.open("a") as fp:
+        fp.write('[1]\n"text"\n')
+        fp.write(
+            '{"outcome": "success", "duration": 5, "phases": {},'
+            ' "timestamp": 0}\n'
+        )
+        fp.write('{"step": "step", "dur')
+
+    history = TimingHistory(path)
+    assert history.get_duration("step") == timedelta(seconds=1)
+    _record(history, "step", 3)
+    history.save()
+
+    assert TimingHistory(path).get_duration("step") == timedelta(seconds=2)
+
+
+def test_history_keeps_the_peak_memory(tmp_path):
+    path = tmp_path / "history.jsonl"
+    history = TimingHistory(path)
+    _record(history, "step", 1)
+    for peak_memory in [100, 300, 200]:
+        history.record(
+            "step", "success", timedelta(seconds=1), {}, peak_memory
+        )
+    history.save()
+
+    history = TimingHistory(path)
+    assert history.get_peak_memory("step") == 300
+    assert history.get_peak_memory("other") is None
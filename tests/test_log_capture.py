@@ -0,0 +1,40 @@
+from typing import List, Tuple
+
+from wast._log_capture import PipePlexer
+
+
+class _Recorder:
+    def __init__(self, output, name):
+        self._output = output
+        self._name = name
+
+    def write(self, data):
+        self._output.append((self._name, data))
+        return len(data)
+
+
+def test_pipe_plexer_spills_to_disk_and_keeps_order():
+    plexer = PipePlexer(memory_limit=64)
+    expected = []
+
+    for i in range(100):
+        for name, pipe in [
+            ("stdout", plexer.stdout),
+            ("stderr", plexer.stderr),
+        ]:
+            for data in [f"{name} {i}\n", "é" * i, "\n"]:
+                pipe.write(data)
+            expected.append((name, f"{name} {i}\n{'é' * i}\n"))
+
+    assert plexer._file is not None  # pylint: disable=protected-access
+
+    output: List[Tuple[str, str]] = []
+    plexer.dump(_Recorder(output, "stdout"), _Recorder(output, "stderr"))
+
+    merged: List[Tuple[str, str]] = []
+    for name, data in output:
+        if merged and merged[-1][0] == name:
+            merged[-1] = (name, merged[-1][1] + data)
+        else:
+            merged.append((name, data))
+    assert merged == expected
@@ -0,0 +1,47 @@
+from wast import _memory
+from wast._memory import get_available_memory
+
+
+def test_available_memory_is_limited_by_the_cgroup(tmp_path, monkeypatch):
+    meminfo = tmp_path / "meminfo"
+    meminfo.write_text("MemTotal: 8000000 kB\nMemAvailable: 4000000 kB\n")
+    monkeypatch.setattr(_memory, "_MEMINFO", meminfo)
+    proc_cgroup = tmp_path / "proc-cgroup"
+    proc_cgroup.write_text("0::/user.slice/wast.scope\n")
+    monkeypatch.setattr(_memory, "_PROC_CGROUP", proc_cgroup)
+
+    root = tmp_path / "cgroup"
+    scope = root / "user.slice" / "wast.scope"
+    scope.mkdir(parents=True)
+    assert get_available_memory(root) == 4000000 * 1024
+
+    scope.joinpath("memory.max").write_text("max\n")
+    scope.joinpath("memory.current").write_text("1000\n")
+    assert get_available_memory(root) == 4000000 * 1024
+
+    scope.joinpath("memory.max").write_text("3000\n")
+    assert get_available_memory(root) == 2000
+
+    # Limits of the parents apply too, but not the ones of other cgroups
+    root.joinpath("user.slice", "memory.max").write_text("2500\n")
+    root.joinpath("user.slice", "memory.current").write_text("1000\n")
+    root.joinpath("other.slice").mkdir()
+    root.joinpath("other.slice", "memory.max").write_text("10\n")
+    root.joinpath("other.slice", "memory.current").write_text("0\n")
+    assert get_available_memory(root) == 1500
+
+
+def test_available_memory_is_limited_by_the_cgroup_v1(tmp_path, monkeypatch):
+    monkeypatch.setattr(_memory, "_MEMINFO", tmp_path / "missing")
+    proc_cgroup = tmp_path / "proc-cgroup"
+    proc_cgroup.write_text("5:cpu,cpuacct:/wast\n4:memory:/wast\n0::/\n")
+    monkeypatch.setattr(_memory, "_PROC_CGROUP", proc_cgroup)
+
+    root = tmp_path / "cgroup"
+    cgroup = root / "memory" / "wast"
+    cgroup.mkdir(parents=True)
+    assert get_available_memory(root) is None
+
+    cgroup.joinpath("memory.limit_in_bytes").write_text("3000\n")
+    cgroup.joinpath("memory.usage_in_bytes").write_text("1000\n")
+    assert get_available_memory(root) == 2000
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from wast._pip import get_shared_pip, link_shared_pip
+
+
+def test_environments_can_use_the_shared_pip(tmp_path):
+    pip_path = get_shared_pip(sys.executable, tmp_path / "pip")
+    if pip_path is None:
+        pytest.skip("The interpreter does not bundle pip")
+
+    venv_path = tmp_path / "venv"
+    subprocess.run(
+        [sys.executable, "-m", "venv", "--without-pip", str(venv_path)],
+        check=True,
+    )
+    link_shared_pip(venv_path, pip_path)
+
+    for command in [
+        [str(venv_path / "bin/python"), "-m", "pip"],
+        [str(venv_path / "bin/pip")],
+    ]:
+        result = subprocess.run(
+            [*command, "--version"],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        assert str(pip_path) in result.stdout
+
+
+def test_pip_is_extracted_once_across_processes(tmp_path):
+    def extract(_):
+        return subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys; from pathlib import Path;"
+                " from wast._pip import get_shared_pip;"
+                " print(get_shared_pip(sys.executable, Path(sys.argv[1])))",
+                str(tmp_path / "pip"),
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+
+    with ThreadPoolExecutor(4) as executor:
+        outputs = list(executor.map(extract, range(4)))
+
+    assert len(set(outputs)) == 1
+    assert not list(tmp_path.glob("pip/.*.tmp"))
@@ -0,0 +1,96 @@
+# pylint: disable=protected-access
+import subprocess
+import sys
+
+from wast._runners import VenvRunner, _iter_requirement_files, _lock_template
+
+# Tries to lock the given file without waiting, and reports whether it could
+_TRY_LOCK = """\
+import fcntl, sys
+with open(sys.argv[1], "w") as fp:
+    try:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        print("locked")
+    else:
+        print("free")
+"""
+
+
+def test_finds_nested_requirement_files(tmp_path):
+    tmp_path.joinpath("requirements").mkdir()
+    tmp_path.joinpath("requirements/base.txt").write_text(
+        "# -r ignored.txt\n-c constraints.txt\nrequests\n"
+    )
+    tmp_path.joinpath("requirements/dev.txt").write_text("-r base.txt\n")
+
+    assert [
+        str(path.relative_to(tmp_path))
+        for path in _iter_requirement_files(
+            ("-rrequirements/dev.txt", "pytest"), tmp_path
+        )
+    ] == [
+        "requirements/dev.txt",
+        "requirements/base.txt",
+        "requirements/constraints.txt",
+    ]
+
+
+def test_install_fingerprint_tracks_requirement_files(tmp_path, sample_config):
+    runner = VenvRunner("test", "python3", sample_config, {})
+    tmp_path.joinpath("requirements.txt").write_text("pytest\n")
+
+    fingerprint = runner._get_install_fingerprint(("-r", "requirements.txt"))
+    assert fingerprint == runner._get_install_fingerprint(
+        ("-r", "requirements.txt")
+    )
+
+    tmp_path.joinpath("requirements.txt").write_text("pytest==7.0\n")
+    assert fingerprint != runner._get_install_fingerprint(
+        ("-r", "requirements.txt")
+    )
+    # Local projects can't be tracked
+    assert runner._get_install_fingerprint((".",)) is None
+
+
+def test_templates_are_locked_across_processes(tmp_path):
+    template = tmp_path / "templates" / "abc"
+
+    def try_lock():
+        return subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                _TRY_LOCK,
+                str(tmp_path / "templates/.abc.lock"),
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+
+    with _lock_template(template):
+        assert try_lock() == "locked"
+    assert try_lock() == "free"
+
+
+def test_environment_is_outdated_when_requirements_change(
+    tmp_path, sample_config, monkeypatch
+):
+    runner = VenvRunner("test", "python3", sample_config, {})
+    runner.path.mkdir(parents=True)
+    runner._save_metadata(
+        {"interpreter": runner.get_interpreter(), "installs": {}}
+    )
+    tmp_path.joinpath("requirements.txt").write_text("pytest\n")
+
+    commands = []
+    monkeypatch.setattr(
+        runner, "run", lambda command, **kwargs: commands.append(command)
+    )
+    runner.install("-r", "requirements.txt", key="setup:0")
+    assert len(commands) == 1
+    assert not runner.is_outdated()
+
+    tmp_path.joinpath("requirements.txt").write_text("pytest==7.0\n")
+    assert runner.is_outdated()
@@ -0,0 +1,165 @@
+from datetime import timedelta
+from typing import Dict, List
+
+from wast._scheduler import Scheduler, compute_priorities
+
+
+def test_priorities_follow_the_slowest_dependent_chain():
+    graph = {
+        "package": [],
+        "lint": [],
+        "pytest": ["package"],
+        "coverage": ["pytest"],
+    }
+    estimates = {
+        "package": timedelta(seconds=10),
+        "lint": timedelta(seconds=30),
+        "pytest": timedelta(seconds=60),
+        "coverage": timedelta(seconds=5),
+    }
+
+    assert compute_priorities(graph, estimates) == {
+        "coverage": timedelta(seconds=5),
+        "pytest": timedelta(seconds=65),
+        "package": timedelta(seconds=75),
+        "lint": timedelta(seconds=30),
+    }
+
+
+def test_scheduler_starts_critical_path_first():
+    graph = {"lint": [], "docs": [], "package": [], "pytest": ["package"]}
+    estimates = {
+        "lint": timedelta(seconds=30),
+        "docs": timedelta(seconds=20),
+        "package": timedelta(seconds=10),
+        "pytest": timedelta(seconds=60),
+    }
+    scheduler = Scheduler(graph, estimates)
+
+    assert scheduler.pop_ready(1) == ["package"]
+    assert scheduler.pop_ready(1) == ["lint"]
+
+    scheduler.done("package")
+    # pytest became ready and is more critical than what is left
+    assert scheduler.pop_ready(2) == ["pytest", "docs"]
+    assert not scheduler.pending()
+
+
+def test_scheduler_shares_cores_between_steps():
+    graph: Dict[str, List[str]] = {"pytest": [], "pylint": [], "docs": []}
+    estimates = {
+        "pytest": timedelta(seconds=60),
+        "pylint": timedelta(seconds=30),
+        "docs": timedelta(seconds=20),
+    }
+    scheduler = Scheduler(
+        graph, estimates, {"pytest": 0, "pylint": 2}, n_cores=4
+    )
+
+    # pytest can use all cores, nothing else can start until it is done
+    assert scheduler.pop_ready(3) == ["pytest"]
+    assert scheduler.get_granted_cores("pytest") == 4
+    assert not scheduler.pop_ready(3)
+
+    scheduler.release("pytest")
+    scheduler.done("pytest")
+    assert scheduler.pop_ready(3) == ["pylint", "docs"]
+    assert scheduler.get_granted_cores("pylint") == 2
+    assert scheduler.get_granted_cores("docs") == 1
+
+
+def test_scheduler_only_starts_steps_fitting_in_memory():
+    graph: Dict[str, List[str]] = {"mypy": [], "sphinx": [], "lint": []}
+    estimates = {
+        "mypy": timedelta(seconds=60),
+        "sphinx": timedelta(seconds=30),
+        "lint": timedelta(seconds=20),
+    }
+    scheduler = Scheduler(
+        graph,
+        estimates,
+        memory={"mypy": 3000, "sphinx": 2000, "lint": 500},
+        memory_budget=4000,
+    )
+
+    # sphinx does not fit next to mypy, but lint can start before it
+    assert scheduler.pop_ready(3) == ["mypy", "lint"]
+    assert scheduler.pending() == ["sphinx"]
+
+    scheduler.release("mypy")
+    scheduler.done("mypy")
+    assert scheduler.pop_ready(3) == ["sphinx"]
+
+
+def test_scheduler_starts_steps_bigger_than_the_budget_alone():
+    graph: Dict[str, List[str]] = {"huge": [], "small": []}
+    estimates = {"huge": timedelta(seconds=60), "small": timedelta(seconds=1)}
+    scheduler = Scheduler(
+        graph, estimates, memory={"huge": 5000}, memory_budget=4000
+    )
+
+    assert scheduler.pop_ready(2) == ["huge"]
+    scheduler.release("huge")
+    scheduler.done("huge")
+    assert scheduler.pop_ready(2) == ["small"]
+
+
+def test_scheduler_serializes_steps_conflicting_on_resources():
+    graph: Dict[str, List[str]] = {
+        "isort:fix": [],
+        "black:fix": [],
+        "black": [],
+        "isort": [],
+    }
+    estimates = {
+        "isort:fix": timedelta(seconds=40),
+        "black:fix": timedelta(seconds=30),
+        "black": timedelta(seconds=20),
+        "isort": timedelta(seconds=10),
+    }
+    scheduler = Scheduler(
+        graph,
+        estimates,
+        resources={
+            "isort:fix": {"sources": "exclusive"},
+            "black:fix": {"sources": "exclusive"},
+            "black": {"sources": "shared"},
+            "isort": {"sources": "shared", "port": "exclusive"},
+        },
+    )
+
+    # The steps waiting for the sources must not overtake the fixes
+    assert scheduler.pop_ready(4) == ["isort:fix"]
+    assert scheduler.pending() == ["black:fix", "black", "isort"]
+
+    scheduler.release("isort:fix")
+    scheduler.done("isort:fix")
+    assert scheduler.pop_ready(4) == ["black:fix"]
+
+    scheduler.release("black:fix")
+    scheduler.done("black:fix")
+    assert scheduler.pop_ready(4) == ["black", "isort"]
+
+
+def test_scheduler_runs_steps_not_conflicting_on_resources():
+    graph: Dict[str, List[str]] = {"db-tests": [], "lint": [], "api-tests": []}
+    estimates = {
+        "db-tests": timedelta(seconds=30),
+        "lint": timedelta(seconds=20),
+        "api-tests": timedelta(seconds=10),
+    }
+    scheduler = Scheduler(
+        graph,
+        estimates,
+        resources={
+            "db-tests": {"port 5432": "exclusive"},
+            "api-tests": {"port 5432": "exclusive"},
+        },
+    )
+
+    assert scheduler.pop_ready(3) == ["db-tests", "lint"]
+    assert scheduler.pending() == ["api-tests"]
+
+    scheduler.release("db-tests")
+    scheduler.done("db-tests")
+    assert scheduler.pop_ready(3) == ["api-tests"]
@@ -0,0 +1,182 @@
+# pylint and pytest fixtures dependency injection are not friends
+# pylint: disable=redefined-outer-name
+import os
+import re
+import signal
+import socket
+import stat
+import subprocess
+import sys
+import time
+
+import pytest
+
+WASTFILE = """\
+import wast
+
+@wast.step()
+def hello(step):
+    print("{message}")
+
+@wast.step(run_by_default=False)
+def fail(step):
+    raise Exception("boom")
+
+@wast.step(run_by_default=False, passenv=["GREETING"])
+def greet(step):
+    step.run(
+        ["sh", "-c", "echo greeting: $GREETING"], external_command=True
+    )
+
+@wast.step(run_by_default=False)
+def identity(step):
+    print("identity:", id(step))
+"""
+
+_CLIENT = "import sys; from wast._client import main; main(sys.argv[1:])"
+_CLIENT_AND_SHOW_MODULES = (
+    "import atexit, sys; atexit.register(lambda: print(*sys.modules));"
+    f" {_CLIENT}"
+)
+
+
+def _run_client(tmp_path, *args, code=_CLIENT, env=None):
+    return subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            code,
+            *args,
+            "--no-colors",
+            f"--cache-path={tmp_path / 'cache'}",
+        ],
+        capture_output=True,
+        check=False,
+        cwd=tmp_path,
+        env=env,
+        text=True,
+    )
+
+
+@pytest.fixture
+def server(tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text(
+        WASTFILE.format(message="hello")
+    )
+    with subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            _CLIENT,
+            "--server",
+            f"--cache-path={tmp_path / 'cache'}",
+        ],
+        cwd=tmp_path,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    ) as proc:
+        deadline = time.monotonic() + 10
+        assert proc.stdout is not None
+        while not tmp_path.joinpath("cache/server.sock").exists():
+            assert proc.poll() is None, proc.stdout.read()
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+
+        yield proc
+
+        proc.send_signal(signal.SIGINT)
+        proc.wait(10)
+
+    assert not tmp_path.joinpath("cache/server.sock").exists()
+
+
+@pytest.mark.usefixtures("server")
+def test_server_runs_invocations_of_clients(tmp_path):
+    result = _run_client(tmp_path, "-s", "hello")
+    assert result.returncode == 0, result
+    assert "hello\n" in result.stdout
+
+    result = _run_client(tmp_path, "-s", "fail")
+    assert result.returncode == 1
+    assert "Step fail failed: boom" in result.stderr
+
+    # The pipeline is not loaded by the client itself
+    result = _run_client(tmp_path, "--list", code=_CLIENT_AND_SHOW_MODULES)
+    assert result.returncode == 0
+    assert re.search(r"\* hello$", result.stderr, re.MULTILINE)
+    assert "wast._pipeline" not in result.stdout.split()
+
+
+@pytest.mark.usefixtures("server")
+def test_server_runs_invocations_in_the_environment_of_clients(tmp_path):
+    for greeting in ["hello", "bonjour"]:
+        result = _run_client(
+            tmp_path, "-s", "greet", env={**os.environ, "GREETING": greeting}
+        )
+        assert result.returncode == 0, result
+        assert f"greeting: {greeting}\n" in result.stdout
+
+
+@pytest.mark.usefixtures("server")
+def test_server_reuses_pipelines_across_unrelated_environments(tmp_path):
+    outputs = []
+    for value in ["1", "2"]:
+        result = _run_client(
+            tmp_path, "-s", "identity", env={**os.environ, "UNRELATED": value}
+        )
+        assert result.returncode == 0, result
+        outputs.append(re.findall(r"^identity: \d+$", result.stdout, re.M))
+
+    assert outputs[0] and outputs[0] == outputs[1]
+
+
+@pytest.mark.usefixtures("server")
+def test_server_reloads_changed_definition(tmp_path):
+    assert "hello\n" in _run_client(tmp_path, "-s", "hello").stdout
+
+    tmp_path.joinpath("wastfile.py").write_text(
+        WASTFILE.format(message="changed")
+    )
+
+    result = _run_client(tmp_path, "-s", "hello")
+    assert result.returncode == 0, result
+    assert "The pipeline definition changed" in result.stderr
+    assert "changed\n" in result.stdout
+
+
+@pytest.mark.usefixtures("server")
+def test_socket_is_only_accessible_to_its_owner(tmp_path):
+    mode = tmp_path.joinpath("cache/server.sock").stat().st_mode
+    assert stat.S_IMODE(mode) & 0o077 == 0
+
+
+@pytest.mark.parametrize(
+    "request_line",
+    [
+        b"not json\n",
+        b"[]\n",
+        b'{"args": []}\n',
+        b'{"args": [], "cwd": "/", "environ": [], "isatty": false}\n',
+    ],
+)
+def test_server_survives_invalid_requests(server, tmp_path, request_line):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(str(tmp_path / "cache/server.sock"))
+        client.sendall(request_line)
+        assert client.recv(1024) == b""
+
+    assert server.poll() is None
+    result = _run_client(tmp_path, "-s", "hello")
+    assert result.returncode == 0, result
+    assert "hello\n" in result.stdout
+
+
+def test_client_runs_locally_without_server(tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text(
+        WASTFILE.format(message="hello")
+    )
+
+    result = _run_client(tmp_path, "-s", "hello")
+    assert result.returncode == 0, result
+    assert "hello\n" in result.stdout
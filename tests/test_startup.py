@@ -0,0 +1,114 @@
+import subprocess
+import sys
+import time
+from importlib.metadata import version
+
+# We aim at listing steps in under 100ms, with some leeway for slow machines
+IMPORT_TIME_BUDGET_US = 100_000
+LIST_TIME_BUDGET_S = 0.2
+
+WASTFILE = """\
+import wast
+import wast.predefined
+
+wast.register_managed_step(wast.predefined.black())
+"""
+
+_MAIN = "import sys; from wast.__main__ import main; main(sys.argv[1:])"
+_MAIN_AND_SHOW_MODULES = f"{_MAIN}; print(*sys.modules)"
+
+
+def _run(tmp_path, *args):
+    return subprocess.run(
+        [sys.executable, *args],
+        capture_output=True,
+        check=True,
+        cwd=tmp_path,
+        text=True,
+    )
+
+
+def test_loading_the_definition_only_imports_what_it_needs(tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text(WASTFILE)
+
+    result = _run(
+        tmp_path,
+        "-c",
+        _MAIN_AND_SHOW_MODULES,
+        "--list",
+        f"--cache-path={tmp_path / 'cache'}",
+    )
+
+    modules = result.stdout.split()
+    for module in [
+        "asyncio",
+        "multiprocessing",
+        "importlib.metadata",
+        "concurrent.futures.process",
+        "wast.predefined._pytest",
+        "wast._async_subproc",
+    ]:
+        assert module not in modules
+    assert "wast.predefined._black" in modules
+
+
+def test_listing_steps_from_the_index_only_imports_what_it_needs(tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text(WASTFILE)
+    args = ["--list", f"--cache-path={tmp_path / 'cache'}"]
+    # Fill the step index
+    _run(tmp_path, "-c", _MAIN, *args)
+
+    result = _run(
+        tmp_path, "-X", "importtime", "-c", _MAIN_AND_SHOW_MODULES, *args
+    )
+
+    imports = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                imports[name.strip()] = int(cumulative)
+    assert imports["wast.__main__"] < IMPORT_TIME_BUDGET_US
+
+    modules = result.stdout.split()
+    for module in [
+        "colorama",
+        "concurrent.futures",
+        "graphlib",
+        "pty",
+        "selectors",
+        "wast._pipeline",
+        "wast._runners",
+        "wast._steps.handlers",
+        "wast.predefined",
+    ]:
+        assert module not in modules
+
+
+def test_listing_steps_is_fast(tmp_path):
+    tmp_path.joinpath("wastfile.py").write_text(WASTFILE)
+    args = ["-c", _MAIN, "--list", f"--cache-path={tmp_path / 'cache'}"]
+
+    def measure(*args):
+        durations = []
+        for _ in range(3):
+            start = time.perf_counter()
+            _run(tmp_path, *args)
+            durations.append(time.perf_counter() - start)
+        return min(durations)
+
+    overhead = measure(*args) - measure("-c", "pass")
+    assert overhead < LIST_TIME_BUDGET_S
+
+
+def test_version_is_resolved_lazily(tmp_path):
+    result = _run(
+        tmp_path,
+        "-c",
+        "import sys, wast; print('importlib.metadata' in sys.modules);"
+        " print(wast.__version__)",
+    )
+    assert result.stdout.split() == ["False", version("wast")]
+
+    result = _run(tmp_path, "-c", _MAIN, "--version")
+    assert result.stdout == f"-c {version('wast')}\n"
@@ -0,0 +1,80 @@
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+import pytest
+
+from wast._async_subproc import CommandScope
+from wast._log_capture import PipePlexer
+from wast._subproc import (
+    run,
+    set_command_scope,
+    set_subprocess_default_pipes,
+    track_peak_memory,
+)
+
+
+def test_forwards_output_of_concurrent_commands():
+    # Multi-bytes characters ensure we handle reads splitting them
+    expected = "é" * 100_000
+    plexers = [PipePlexer() for _ in range(16)]
+
+    def _run(plexer: PipePlexer) -> None:
+        set_subprocess_default_pipes(plexer.stdout, plexer.stderr)
+        run(
+            [
+                sys.executable,
+                "-c",
+                "import sys; print('é' * 100_000);"
+                " print('err', file=sys.stderr)",
+            ],
+            env=dict(os.environ),
+        )
+
+    with ThreadPoolExecutor(len(plexers)) as executor:
+        list(
+            executor.map(
+                lambda plexer: copy_context().run(_run, plexer), plexers
+            )
+        )
+
+    for plexer in plexers:
+        stdout, stderr = io.StringIO(), io.StringIO()
+        plexer.dump(stdout, stderr)
+        assert stdout.getvalue().strip() == expected
+        assert stderr.getvalue().strip() == "err"
+
+
+@pytest.mark.parametrize("engine", ["threads", "asyncio"])
+def test_tracks_peak_memory_of_commands(engine):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+
+    def _run(size: int) -> None:
+        run(
+            [sys.executable, "-c", f"x = bytearray({size}); exit({size % 2})"],
+            env=dict(os.environ),
+        )
+
+    def _measure():
+        if engine == "asyncio":
+            set_command_scope(CommandScope(loop))
+        peak_memory = track_peak_memory()
+        _run(200 * 1024 * 1024)
+        # The exit code of the commands is still reported
+        with pytest.raises(subprocess.CalledProcessError):
+            _run(1)
+        return peak_memory.value
+
+    try:
+        assert copy_context().run(_measure) > 200 * 1024 * 1024
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
@@ -0,0 +1,62 @@
+import shutil
+import subprocess
+import threading
+
+import pytest
+
+from wast._watch import FileWatcher, compile_input_pattern
+
+
+@pytest.mark.parametrize(
+    ("pattern", "path", "matches"),
+    (
+        ("src/**/*.py", "src/a.py", True),
+        ("src/**/*.py", "src/a/b/c.py", True),
+        ("src/*.py", "src/a/b.py", False),
+        ("./*.py", "setup.py", True),
+        ("**", "any/thing", True),
+        ("file?.[ch]", "file1.c", True),
+        ("file?.[!ch]", "file1.c", False),
+        ("*.py", "file.pyc", False),
+    ),
+)
+def test_compile_input_pattern(pattern, path, matches):
+    assert bool(compile_input_pattern(pattern).match(path)) == matches
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="requires git")
+@pytest.mark.parametrize("use_inotify", (True, False))
+def test_watcher_reports_changed_files(monkeypatch, tmp_path, use_inotify):
+    if not use_inotify:
+
+        def _init_inotify(self):
+            raise OSError("disabled")
+
+        monkeypatch.setattr(FileWatcher, "_init_inotify", _init_inotify)
+
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    tmp_path.joinpath(".gitignore").write_text("ignored/\n*.log\n")
+    for directory in ["src", "ignored", "cache"]:
+        tmp_path.joinpath(directory).mkdir()
+
+    watcher = FileWatcher(tmp_path, [tmp_path / "cache"])
+
+    def change_files():
+        tmp_path.joinpath("src/a.py").write_text("a")
+        tmp_path.joinpath("ignored/b.py").write_text("b")
+        tmp_path.joinpath("cache/c.py").write_text("c")
+        tmp_path.joinpath("d.log").write_text("d")
+        tmp_path.joinpath("src/new").mkdir()
+        tmp_path.joinpath("src/new/e.py").write_text("e")
+
+    try:
+        assert watcher.wait(timeout=0.1) == set()
+
+        thread = threading.Thread(target=change_files)
+        thread.start()
+        changes = watcher.wait(timeout=10)
+        thread.join()
+
+        assert changes == {"src/a.py", "src/new/e.py"}
+    finally:
+        watcher.close()
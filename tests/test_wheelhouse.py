@@ -0,0 +1,15 @@
+from wast._wheelhouse import Wheelhouse
+
+
+def test_does_not_fetch_local_directories(sample_config):
+    wheelhouse = Wheelhouse(sample_config)
+    wheelhouse.fill([("python3", (".",))])
+
+    assert not wheelhouse.get_install_options("python3", (".",))
+    assert not sample_config.venvs_path.exists()
+
+
+def test_unknown_requirements_are_installed_from_the_index(sample_config):
+    wheelhouse = Wheelhouse(sample_config)
+
+    assert not wheelhouse.get_install_options("python3", ("pytest",))
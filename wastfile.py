@@ -19,10 +19,20 @@ ARTIFACTS_PATH = ROOT_PATH / "_artifacts"
 ##
 # Formatting
 ##
-wast.register_managed_step(wast.predefined.unimport())
-wast.register_managed_step(wast.predefined.isort(files=PYTHON_FILES))
-wast.register_managed_step(wast.predefined.docformatter(files=PYTHON_FILES))
-wast.register_managed_step(wast.predefined.black())
+# Steps checking the formatting only read the sources, and can run together,
+# while the ones fixing it rewrite them, and must run alone. The fixes still
+# need to run in order, each formatting the output of the previous one
+READ_SOURCES = {"source tree": "shared"}
+WRITE_SOURCES = {"source tree": "exclusive"}
+
+wast.register_managed_step(wast.predefined.unimport(), resources=READ_SOURCES)
+wast.register_managed_step(
+    wast.predefined.isort(files=PYTHON_FILES), resources=READ_SOURCES
+)
+wast.register_managed_step(
+    wast.predefined.docformatter(files=PYTHON_FILES), resources=READ_SOURCES
+)
+wast.register_managed_step(wast.predefined.black(), resources=READ_SOURCES)
 
 # With auto fix
 wast.register_managed_step(
@@ -31,6 +41,7 @@ wast.register_managed_step(
     ),
     name="unimport:fix",
     run_by_default=False,
+    resources=WRITE_SOURCES,
 )
 wast.register_managed_step(
     wast.predefined.isort(
@@ -39,6 +50,7 @@ wast.register_managed_step(
     name="isort:fix",
     run_by_default=False,
     requires=["unimport:fix"],
+    resources=WRITE_SOURCES,
 )
 wast.register_managed_step(
     wast.predefined.docformatter(
@@ -47,12 +59,14 @@ wast.register_managed_step(
     name="docformatter:fix",
     run_by_default=False,
     requires=["isort:fix"],
+    resources=WRITE_SOURCES,
 )
 wast.register_managed_step(
     wast.predefined.black(additional_arguments=[]),
     name="black:fix",
     requires=["isort:fix", "docformatter:fix"],
     run_by_default=False,
+    resources=WRITE_SOURCES,
 )
 wast.register_step_group(
     name="fix",